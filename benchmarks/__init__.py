@@ -0,0 +1,2 @@
+"""Benchmarks of the simulator: synthetic workloads (workloads.py), a runner writing the results
+to a JSON file (run.py) and a comparison of two result files (compare.py)."""
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""Measures the start-up of the command line simulator, and guards it against regressions.
+
+Each case runs python -X importtime -m tomasulo_simulator on a small program, in a fresh interpreter:
+ - no stats:  --quiet --no-stats, what CI loops over the examples run
+ - stats:     --quiet, the statistics load pandas and NumPy
+For each case the median wall time and import time are printed, with the modules taking the longest to import.
+The run fails (exit status 1) if the no stats case imports one of the LAZY_MODULES, which are only
+needed by features it doesn't use, or if it takes longer than --max-ms."""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# Imported only when their features are used: the statistics, the IPython shell and the logo
+LAZY_MODULES = ("pandas", "numpy", "IPython", "pyfiglet")
+
+CASES = {
+    "no stats": ["--quiet", "--no-stats"],
+    "stats": ["--quiet"],
+}
+
+
+def run_cli(program, options, engine):
+    """Returns the wall time of a run, the cumulative import time of each top-level module (in seconds)
+    and the names of all the modules imported"""
+    command = [sys.executable, "-X", "importtime", "-m", "tomasulo_simulator", program, "--engine", engine,
+               "--log-level", "off", "--no-cache"] + options
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    start = time.perf_counter()
+    result = subprocess.run(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                            check=True)
+    elapsed = time.perf_counter() - start
+    return (elapsed,) + parse_importtime(result.stderr.decode())
+
+
+def parse_importtime(output):
+    """Top-level module -> cumulative import time, and all the modules, from the output of -X importtime"""
+    top_level = {}
+    imported = set()
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        imported.add(name.strip())
+        # Nested imports are indented
+        if not name.startswith("  "):
+            top_level[name.strip()] = int(cumulative) / 1e6
+    return top_level, imported
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    argparser.add_argument("program", nargs="?", default=os.path.join(ROOT, "examples", "loop.asm"))
+    argparser.add_argument("--engine", "-e", default="cycle")
+    argparser.add_argument("--repeat", "-r", type=int, default=5)
+    argparser.add_argument("--top", type=int, default=5, help="Modules listed per case (default: %(default)s)")
+    argparser.add_argument("--max-ms", type=float, help="Fail if the no stats case takes longer (median)")
+    args = argparser.parse_args()
+
+    interpreter = statistics.median(
+        timed(lambda: subprocess.run([sys.executable, "-c", "pass"], check=True)) for _ in range(args.repeat))
+    print("Empty interpreter: {:.1f} ms\n".format(interpreter * 1000))
+
+    failures = []
+    print("{:<10} {:>10} {:>12}   {}".format("case", "wall (ms)", "imports (ms)", "slowest imports (ms)"))
+    for case, options in CASES.items():
+        runs = [run_cli(args.program, options, args.engine) for _ in range(args.repeat)]
+        wall_time = statistics.median(elapsed for elapsed, _, _ in runs)
+        _, modules, imported = runs[-1]
+        slowest = sorted(modules.items(), key=lambda item: item[1], reverse=True)[:args.top]
+        print("{:<10} {:>10.1f} {:>12.1f}   {}".format(
+            case, wall_time * 1000, sum(modules.values()) * 1000,
+            ", ".join("{} {:.1f}".format(name, seconds * 1000) for name, seconds in slowest)))
+
+        if case == "no stats":
+            loaded = [module for module in LAZY_MODULES if module in imported]
+            if loaded:
+                failures.append("{} imported without using them".format(", ".join(loaded)))
+            if args.max_ms is not None and wall_time * 1000 > args.max_ms:
+                failures.append("{:.1f} ms, more than {:.1f} ms".format(wall_time * 1000, args.max_ms))
+
+    for failure in failures:
+        print("FAIL: {}".format(failure))
+    sys.exit(1 if failures else 0)
+
+
+def timed(function):
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    main()
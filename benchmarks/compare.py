@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""Compares two result files of run.py (e.g. of two commits), and exits with status 1 if the
+second one has regressed: lower throughput, more SimPy events per instruction or a higher peak RSS
+beyond the threshold. A different number of simulated cycles is also reported, since the
+timings of the simulation are not supposed to change with a performance improvement."""
+import argparse
+import json
+import sys
+
+# Metric -> True if higher is better
+METRICS = {
+    "instructions_per_sec": True,
+    "events_per_instruction": False,
+    "peak_rss_mb": False,
+}
+
+
+def load_results(path):
+    with open(path) as f:
+        results = json.load(f)["results"]
+    return {(row["workload"], row["engine"], row["config"], row["dynamic_length"]): row for row in results}
+
+
+def compare(baseline, current, threshold):
+    """Returns the rows of the comparison (case, metric, baseline, current, change, regressed)
+    for the cases in both the results"""
+    rows = []
+    for case in baseline:
+        if case not in current:
+            continue
+        old, new = baseline[case], current[case]
+        if old["cycles"] != new["cycles"]:
+            rows.append((case, "cycles", old["cycles"], new["cycles"], None, True))
+        for metric, higher_is_better in METRICS.items():
+            if old[metric] is None or new[metric] is None or not old[metric]:
+                continue
+            change = (new[metric] - old[metric]) / old[metric]
+            worse = -change if higher_is_better else change
+            rows.append((case, metric, old[metric], new[metric], change, worse > threshold))
+    return rows
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument("baseline", help="Results of the reference commit")
+    argparser.add_argument("current", help="Results to compare with the reference")
+    argparser.add_argument("--threshold", "-t", type=float, default=10,
+                           help="Relative change (in %%) considered a regression, default 10")
+    args = argparser.parse_args()
+
+    baseline = load_results(args.baseline)
+    current = load_results(args.current)
+    rows = compare(baseline, current, args.threshold / 100)
+
+    print("{:<36} {:<22} {:>12} {:>12} {:>8}".format("case", "metric", "baseline", "current", "change"))
+    for case, metric, old, new, change, regressed in rows:
+        print("{:<36} {:<22} {:>12.4g} {:>12.4g} {:>8} {}".format(
+            "/".join(str(c) for c in case), metric, old, new,
+            "-" if change is None else "{:+.1%}".format(change), "REGRESSION" if regressed else ""))
+
+    missing = set(baseline) ^ set(current)
+    if missing:
+        print("{} cases are only in one of the files".format(len(missing)))
+    regressions = sum(1 for row in rows if row[-1])
+    print("{} regressions".format(regressions))
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
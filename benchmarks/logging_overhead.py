@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""Measures the cost of logging on the simulation throughput.
+
+The same program is simulated with logging off, to an in-memory ring buffer and to stdout
+(redirected to /dev/null). To compare "off" with a build without any logging, the number of
+log calls is counted and multiplied by the cost of a call to a disabled logger."""
+import argparse
+import contextlib
+import os
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from tomasulo_simulator import Parser, assemble, CpuConfig, ENGINES  # noqa: E402
+from tomasulo_simulator import log_utils  # noqa: E402
+
+# Copies a block of memory, N times
+PROGRAM = """
+.mem_size 512
+.alu_rs 3
+.mem_rs 2
+ADD R3, R0, {iterations}
+OUTER:
+ADD R1, R0, 250
+LOOP:
+    BLE R1, R0, END
+    ADD R2, R1, 2
+    LD R4, [R2 + 3]
+    ST R4, [R2 + 4]
+    SUB R1, R1, 1
+    JMP LOOP
+END:
+SUB R3, R3, 1
+BGT R3, R0, OUTER
+HLT
+"""
+
+
+class CountingSink:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, record):
+        self.count += 1
+
+    def close(self):
+        pass
+
+
+def simulate(engine, instructions, config, level, sinks):
+    log_utils.configure(level, sinks=sinks)
+    environment_class, cpu_class = ENGINES[engine]
+    env = environment_class()
+    cpu = cpu_class(env, instructions, config)
+    env.process(cpu.run())
+
+    start = time.perf_counter()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        env.run()
+    elapsed = time.perf_counter() - start
+    return elapsed, len(cpu.executed_instructions)
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument("--engine", "-e", choices=ENGINES.keys(), default="cycle")
+    argparser.add_argument("--iterations", "-n", type=int, default=20)
+    argparser.add_argument("--repeat", "-r", type=int, default=3)
+    args = argparser.parse_args()
+
+    directives, code = Parser().parse_code(PROGRAM.format(iterations=args.iterations))
+    instructions = assemble(code)
+    config = CpuConfig(directives)
+
+    counter = CountingSink()
+    simulate(args.engine, instructions, config, log_utils.DEBUG, [counter])
+    call_cost = min(timeit.repeat(lambda: log_utils._disabled("{} {}", 1, 2), number=100000, repeat=5)) / 100000
+
+    setups = [
+        ("off", log_utils.OFF, lambda: []),
+        ("ring buffer", log_utils.DEBUG, lambda: [log_utils.RingBufferSink()]),
+        ("stdout", log_utils.DEBUG, lambda: [log_utils.StdoutSink()]),
+    ]
+    print("engine: {}, log calls: {}".format(args.engine, counter.count))
+    print("{:<12} {:>10} {:>12}".format("logging", "time (s)", "instr/s"))
+    off_time = None
+    for name, level, sinks in setups:
+        elapsed, executed = min(simulate(args.engine, instructions, config, level, sinks())
+                                for _ in range(args.repeat))
+        if off_time is None:
+            off_time = elapsed
+        print("{:<12} {:>10.3f} {:>12.0f}".format(name, elapsed, executed / elapsed))
+
+    disabled_time = counter.count * call_cost
+    print("Estimated time spent in disabled log calls: {:.3f}s ({:.1%} of the run with logging off)"
+          .format(disabled_time, disabled_time / off_time))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Measures the parser throughput on generated programs of growing size.
+
+The time per line should stay the same as the program grows. For comparison, the same programs are
+also parsed to a tree first, and then transformed (what an inline transformer avoids)."""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from tomasulo_simulator import Parser  # noqa: E402
+from tomasulo_simulator.parser.parser import get_lark, grammar  # noqa: E402
+
+
+def generate_program(lines, seed=0):
+    """A program with every kind of instruction, labels and constants"""
+    rng = random.Random(seed)
+
+    def reg():
+        return "R{}".format(rng.randrange(1, 16))
+
+    def operand():
+        return reg() if rng.random() < 0.6 else str(rng.randrange(-100, 100))
+
+    code = [".alu_rs 3", ".mem_rs 2", ".const !SIZE 64", "L0:"]
+    labels = 1
+    while len(code) < lines - 1:
+        kind = rng.random()
+        if kind < 0.35:
+            code.append("{} {}, {}, {}".format(rng.choice(["ADD", "SUB", "AND", "OR", "ANDL", "ORL"]),
+                                               reg(), operand(), operand()))
+        elif kind < 0.45:
+            code.append("{} F{}, F{}, {}".format(rng.choice(["FADD", "FSUB"]), rng.randrange(8), rng.randrange(8),
+                                                 rng.randrange(10)))
+        elif kind < 0.6:
+            code.append("LD {}, [{} + {}]".format(reg(), reg(), rng.randrange(64)))
+        elif kind < 0.7:
+            code.append("ST {}, [{} + !SIZE]".format(reg(), reg()))
+        elif kind < 0.8:
+            code.append("{} {}, {}, L{}".format(rng.choice(["BEQ", "BNE", "BLT", "BLE", "BGT", "BGE"]),
+                                                reg(), operand(), rng.randrange(labels)))
+        elif kind < 0.85:
+            code.append("JMP L{}".format(rng.randrange(labels)))
+        elif kind < 0.9:
+            code.append("L{}:".format(labels))
+            labels += 1
+        else:
+            code.append("ADD {}, {}, 1 ; comment".format(reg(), reg()))
+    code.append("HLT")
+    return "\n".join(code) + "\n"
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    args = argparser.parse_args()
+
+    from lark import Lark
+    from tomasulo_simulator.parser.transformer import ProgramTransformer
+    get_lark()
+    tree_parser = Lark(grammar, parser="lalr")
+
+    print("{:>8} {:>12} {:>12} {:>16}".format("lines", "time (s)", "us/line", "tree+transform"))
+    for size in args.sizes:
+        program = generate_program(size)
+
+        start = time.perf_counter()
+        Parser().parse_code(program)
+        elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        ProgramTransformer().transform(tree_parser.parse(program))
+        tree_elapsed = time.perf_counter() - start
+
+        print("{:>8} {:>12.3f} {:>12.1f} {:>15.3f}s".format(size, elapsed, elapsed / size * 1e6, tree_elapsed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""Measures the simulator throughput and memory on the synthetic workloads.
+
+Each workload is simulated by each engine with each configuration, in a fresh process, so the
+peak RSS of a run isn't inflated by the previous ones. For each run the results have:
+ - wall_time:                 seconds spent simulating (the best of --repeat runs), parsing excluded
+ - cycles, instructions:      simulated clock cycles and executed instructions
+ - cycles_per_sec:            simulated cycles per second of wall time
+ - instructions_per_sec:      executed instructions per second of wall time
+ - events_per_instruction:    SimPy events scheduled per instruction (null for the cycle engine)
+ - peak_rss_mb:               peak resident set size of the process
+
+The results are written to a JSON file, to be compared with the results of another commit
+by compare.py."""
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from benchmarks.workloads import KERNELS, DEFAULT_DYNAMIC_LENGTH, generate  # noqa: E402
+
+# Configuration name -> CpuConfig overrides, applied over the directives of the workload
+CONFIGS = {
+    "default": {},
+    "wide": {"alu_rs": 6, "alu_fu": 3, "mem_rs": 4, "mem_fu": 2, "cdb_width": 2},
+    # Many accesses in flight, to measure the memory disambiguation
+    "deep_memory": {"mem_rs": 16, "mem_fu": 8, "mem_access_queue_size": 32},
+}
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes elsewhere
+    if sys.platform == "darwin":
+        return peak / 2 ** 20
+    return peak / 2 ** 10
+
+
+def run_case(workload, dynamic_length, engine, config, repeat):
+    """Simulates the workload and returns the row of the results. Meant to run in its own process"""
+    from tomasulo_simulator import Parser, assemble, CpuConfig, ENGINES
+    from tomasulo_simulator import log_utils
+
+    log_utils.configure(log_utils.OFF)
+    program = generate(workload, dynamic_length)
+    directives, code = Parser().parse_code(program.source)
+    instructions = assemble(code)
+    environment_class, cpu_class = ENGINES[engine]
+
+    best = None
+    for _ in range(repeat):
+        cpu_config = CpuConfig(directives)
+        cpu_config.apply_config(CONFIGS[config])
+        env = environment_class()
+        cpu = cpu_class(env, instructions, cpu_config)
+        env.process(cpu.run())
+        start = time.perf_counter()
+        env.run()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+
+    executed = len(cpu.executed_instructions)
+    events = None
+    # SimPy numbers the scheduled events with a counter: the next id is how many were scheduled
+    if hasattr(env, "_eid"):
+        events = next(env._eid)
+    return {
+        "workload": workload,
+        "engine": engine,
+        "config": config,
+        "dynamic_length": dynamic_length,
+        "wall_time": best,
+        "cycles": env.now,
+        "instructions": executed,
+        "cycles_per_sec": env.now / best,
+        "instructions_per_sec": executed / best,
+        "events_per_instruction": events / executed if events is not None else None,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def run_isolated(*args):
+    """Runs run_case in a new process"""
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        return executor.submit(run_case, *args).result()
+
+
+def git_commit():
+    try:
+        output = subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=ROOT, stderr=subprocess.DEVNULL)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.decode().strip()
+
+
+def metadata():
+    return {
+        "commit": git_commit(),
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+    }
+
+
+def main():
+    from tomasulo_simulator import ENGINES
+
+    argparser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    argparser.add_argument("--workloads", "-W", nargs="+", choices=list(KERNELS), default=list(KERNELS))
+    argparser.add_argument("--engines", "-e", nargs="+", choices=list(ENGINES), default=list(ENGINES))
+    argparser.add_argument("--configs", "-c", nargs="+", choices=list(CONFIGS), default=list(CONFIGS))
+    argparser.add_argument("--length", "-n", type=int, default=DEFAULT_DYNAMIC_LENGTH,
+                           help="Dynamic instructions per workload (approximate)")
+    argparser.add_argument("--repeat", "-r", type=int, default=3,
+                           help="Simulations per run, the fastest one is reported")
+    argparser.add_argument("--output", "-o", help="Write the results to this JSON file")
+    args = argparser.parse_args()
+
+    results = []
+    print("{:<18} {:<6} {:<11} {:>9} {:>10} {:>10} {:>12} {:>8} {:>8}".format(
+        "workload", "engine", "config", "time (s)", "cycles", "cycles/s", "instr/s", "ev/instr", "RSS (MB)"))
+    for workload in args.workloads:
+        for engine in args.engines:
+            for config in args.configs:
+                row = run_isolated(workload, args.length, engine, config, args.repeat)
+                results.append(row)
+                events = row["events_per_instruction"]
+                print("{:<18} {:<6} {:<11} {:>9.3f} {:>10} {:>10.0f} {:>12.0f} {:>8} {:>8.1f}".format(
+                    workload, engine, config, row["wall_time"], row["cycles"], row["cycles_per_sec"],
+                    row["instructions_per_sec"], "-" if events is None else "{:.1f}".format(events),
+                    row["peak_rss_mb"]))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"metadata": metadata(), "results": results}, f, indent=2)
+            f.write("\n")
+
+
+if __name__ == "__main__":
+    main()
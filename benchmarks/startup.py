@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""Measures the time needed to load a program in a new process: importing the simulator,
+parsing and assembling, with and without the grammar and program caches.
+
+Each case runs in a fresh interpreter, with an empty temporary cache directory:
+ - no cache:        the LALR tables are computed and the program is parsed
+ - grammar cached:  the LALR tables are loaded from disk, the program is parsed
+ - program cached:  the assembled program is unpickled, Lark is not even imported"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+LOADER = """
+import sys, time
+start = time.perf_counter()
+from tomasulo_simulator.program_cache import load_program
+with open(sys.argv[1]) as f:
+    source = f.read() + sys.argv[3]
+load_program(source, sys.argv[2] or None)
+print(time.perf_counter() - start, "lark" in sys.modules)
+"""
+
+
+def load_time(program, cache_dir, salt=""):
+    output = subprocess.check_output([sys.executable, "-c", LOADER, program, cache_dir or "", salt], cwd=ROOT)
+    elapsed, lark_imported = output.decode().split()
+    return float(elapsed), lark_imported == "True"
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    argparser.add_argument("program", nargs="?", default=os.path.join(ROOT, "examples", "exam_2017_06_30.asm"))
+    argparser.add_argument("--repeat", "-r", type=int, default=5)
+    args = argparser.parse_args()
+
+    results = {"no cache": [], "grammar cached": [], "program cached": []}
+    lark_imported = {}
+    for i in range(args.repeat):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            results["no cache"].append(load_time(args.program, None)[0])
+            # Fills the cache
+            load_time(args.program, cache_dir)
+            # A comment makes a different source, which has to be parsed again
+            elapsed, _ = load_time(args.program, cache_dir, "\n; {}".format(i))
+            results["grammar cached"].append(elapsed)
+            elapsed, lark_imported["program cached"] = load_time(args.program, cache_dir)
+            results["program cached"].append(elapsed)
+
+    baseline = statistics.median(results["no cache"])
+    print("{:<16} {:>10} {:>9}".format("case", "median (ms)", "speedup"))
+    for case, times in results.items():
+        median = statistics.median(times)
+        print("{:<16} {:>10.1f} {:>8.1f}x".format(case, median * 1000, baseline / median))
+    print("Lark imported on a program cache hit: {}".format(lark_imported["program cached"]))
+
+
+if __name__ == "__main__":
+    main()
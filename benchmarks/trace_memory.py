@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""Measures the memory used by the execution traces, per retired instruction.
+
+The traces of a simulation are measured in the ExecutionTraceStore, and then as a list of
+ExecutionTrace objects (what the CPU used to keep) rebuilt from the store."""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from tomasulo_simulator import Parser, assemble, CpuConfig, ENGINES  # noqa: E402
+from tomasulo_simulator import log_utils  # noqa: E402
+
+# Copies a block of memory, N times
+PROGRAM = """
+.mem_size 512
+.alu_rs 3
+.mem_rs 2
+ADD R3, R0, {iterations}
+OUTER:
+ADD R1, R0, 250
+LOOP:
+    BLE R1, R0, END
+    ADD R2, R1, 2
+    LD R4, [R2 + 3]
+    ST R4, [R2 + 4]
+    SUB R1, R1, 1
+    JMP LOOP
+END:
+SUB R3, R3, 1
+BGT R3, R0, OUTER
+HLT
+"""
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument("--engine", "-e", choices=ENGINES.keys(), default="cycle")
+    argparser.add_argument("--iterations", "-n", type=int, default=50)
+    args = argparser.parse_args()
+
+    directives, code = Parser().parse_code(PROGRAM.format(iterations=args.iterations))
+    instructions = assemble(code)
+    config = CpuConfig(directives)
+
+    log_utils.configure(log_utils.OFF)
+    environment_class, cpu_class = ENGINES[args.engine]
+    env = environment_class()
+    cpu = cpu_class(env, instructions, config)
+    env.process(cpu.run())
+    start = time.perf_counter()
+    env.run()
+    elapsed = time.perf_counter() - start
+
+    store = cpu.executed_instructions
+    executed = len(store)
+    print("engine: {}, {} instructions in {:.2f}s, {} hazards".format(args.engine, executed, elapsed, len(store.hazards)))
+    print("ExecutionTraceStore:      {:>8.1f} bytes per instruction".format(store.bytes_per_instruction()))
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    traces = list(store)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print("list of ExecutionTrace:   {:>8.1f} bytes per instruction".format((after - before) / len(traces)))
+
+
+if __name__ == "__main__":
+    main()
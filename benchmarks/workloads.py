@@ -0,0 +1,136 @@
+"""Synthetic workloads for the benchmarks.
+
+Each kernel is a loop, repeated as many times as needed to execute (about) the requested number
+of dynamic instructions:
+ - loop:             independent ALU instructions, limited only by the available RS and FU
+ - dependency_chain: every instruction depends on the previous one (RAW hazards)
+ - memory:           loads and stores over an array, sharing addresses between iterations
+ - branch:           data-dependent branches, taken every other iteration"""
+from collections import namedtuple
+
+Workload = namedtuple("Workload", "name source dynamic_length")
+
+DEFAULT_DYNAMIC_LENGTH = 10000
+
+
+# Registers are 8 bits wide: longer loops are nested, counting down R1 and then these registers
+MAX_COUNT = 255
+OUTER_COUNTERS = ("R15", "R14", "R13")
+
+
+def _split(iterations):
+    """Splits a number of iterations into the counts of nested loops (innermost first)"""
+    counts = []
+    while iterations > MAX_COUNT and len(counts) < len(OUTER_COUNTERS):
+        outer = -(-iterations // MAX_COUNT)
+        counts.append(round(iterations / outer))
+        iterations = outer
+    if iterations > MAX_COUNT:
+        raise ValueError("Too many iterations for the loop counters")
+    return counts + [iterations]
+
+
+def _loop(body, iterations, directives=()):
+    """Wraps the body (list of lines) in a loop counting down R1, nested in outer loops if
+    iterations don't fit in a register.
+    Returns the source, the number of instructions executed and the count of each loop (innermost first)"""
+    counts = _split(iterations)
+    counters = ["R1"] + list(OUTER_COUNTERS[:len(counts) - 1])
+    labels = ["LOOP"] + ["OUTER{}".format(level) for level in range(1, len(counts))]
+
+    lines = list(directives)
+    for level in reversed(range(len(counts))):
+        lines += ["ADD {}, R0, {}".format(counters[level], counts[level]), labels[level] + ":"]
+    lines += ["    " + line for line in body]
+    for level in range(len(counts)):
+        lines += ["    SUB {0}, {0}, 1".format(counters[level]),
+                  "    BGT {}, R0, {}".format(counters[level], labels[level])]
+    lines.append("HLT")
+
+    # Body (labels aren't instructions), counter and branch of each loop, setup of the inner loop
+    instructions = sum(1 for line in body if not line.endswith(":"))
+    dynamic_length = counts[0] * (instructions + 2)
+    for count in counts[1:]:
+        dynamic_length = count * (1 + dynamic_length + 2)
+    return "\n".join(lines) + "\n", 1 + dynamic_length, counts
+
+
+def _iterations(dynamic_length, body):
+    return max(1, dynamic_length // (len(body) + 2))
+
+
+def loop(dynamic_length=DEFAULT_DYNAMIC_LENGTH):
+    body = [
+        "ADD R2, R0, 1",
+        "ADD R3, R0, 2",
+        "SUB R4, R0, 3",
+        "OR R5, R0, 4",
+        "AND R6, R1, 7",
+        "ADD R7, R0, 5",
+    ]
+    source, length, _ = _loop(body, _iterations(dynamic_length, body), [".alu_rs 4", ".alu_fu 2"])
+    return source, length
+
+
+def dependency_chain(dynamic_length=DEFAULT_DYNAMIC_LENGTH):
+    body = [
+        "ADD R2, R2, 1",
+        "ADD R2, R2, R1",
+        "SUB R2, R2, 1",
+        "OR R3, R2, 1",
+        "ADD R2, R3, R2",
+        "AND R2, R2, 255",
+    ]
+    source, length, _ = _loop(body, _iterations(dynamic_length, body), [".alu_rs 4", ".alu_fu 2"])
+    return source, length
+
+
+def memory(dynamic_length=DEFAULT_DYNAMIC_LENGTH):
+    # R2 walks over a 64 words array
+    body = [
+        "AND R2, R1, 63",
+        "LD R3, [R2 + 0]",
+        "ADD R3, R3, 1",
+        "ST R3, [R2 + 0]",
+        "LD R4, [R2 + 64]",
+        "ST R4, [R2 + 1]",
+    ]
+    source, length, _ = _loop(body, _iterations(dynamic_length, body),
+                              [".mem_size 256", ".mem_rs 3", ".mem_fu 2", ".alu_rs 2"])
+    return source, length
+
+
+def branch(dynamic_length=DEFAULT_DYNAMIC_LENGTH):
+    # Skips the ADD on odd iterations
+    body = [
+        "AND R2, R1, 1",
+        "BEQ R2, 0, EVEN",
+        "ADD R3, R3, 1",
+        "EVEN:",
+        "ADD R4, R4, R2",
+        "BLT R4, 0, EVEN",
+    ]
+    source, length, counts = _loop(body, _iterations(dynamic_length, body), [".alu_rs 3"])
+    # The ADD is skipped when R1 is even, in every run of the inner loop
+    runs = 1
+    for count in counts[1:]:
+        runs *= count
+    return source, length - runs * (counts[0] // 2)
+
+
+KERNELS = {
+    "loop": loop,
+    "dependency_chain": dependency_chain,
+    "memory": memory,
+    "branch": branch,
+}
+
+
+def generate(name, dynamic_length=DEFAULT_DYNAMIC_LENGTH):
+    """Returns the workload with the given name, executing about dynamic_length instructions"""
+    try:
+        kernel = KERNELS[name]
+    except KeyError:
+        raise ValueError("Unknown workload {} (available: {})".format(name, ", ".join(KERNELS)))
+    source, length = kernel(dynamic_length)
+    return Workload(name, source, length)
@@ -9,10 +9,28 @@ setuptools.setup(
     long_description="",
     long_description_content_type="text/markdown",
     url="https://github.com/fcremo/tomasulo-simulator",
-    packages=setuptools.find_packages(),
+    packages=setuptools.find_packages(exclude=["benchmarks", "tests", "tests.*"]),
+    install_requires=[
+        "simpy>=3.0.11",
+        "lark-parser>=0.6.4",
+    ],
+    # Imported only by the features that use them
+    extras_require={
+        "stats": ["numpy>=1.15.1", "pandas>=0.23.4"],
+        "parquet": ["pandas>=0.23.4", "pyarrow>=0.10.0"],
+        "shell": ["ipython>=6.5.0"],
+        "logo": ["pyfiglet>=0.7.5"],
+        "all": ["numpy>=1.15.1", "pandas>=0.23.4", "pyarrow>=0.10.0", "ipython>=6.5.0", "pyfiglet>=0.7.5"],
+    },
     classifiers=[
         "Programming Language :: Python :: 3",
     ],
+    entry_points={
+        "console_scripts": [
+            "tomasulo-simulator = tomasulo_simulator.cli.simulation:main",
+            "tomasulo-sweep = tomasulo_simulator.cli.sweep:main",
+        ]
+    },
     include_package_data=True,
     package_data={
         '': ["*.lark"]
@@ -0,0 +1,6 @@
+#!/usr/bin/env python3
+# Runs the sweeps from a checkout, like the installed tomasulo-sweep command
+from tomasulo_simulator.cli.sweep import main
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from tomasulo_simulator.cli.simulation import main, parse_args
+
+
+def run_cli(source, *options):
+    """Runs the simulator on the source, and returns what it printed"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "program.asm")
+        with open(path, "w") as f:
+            f.write(source)
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            main([path, "--quiet", "--no-stats", "--no-cache", "--log-level", "off"] + list(options))
+    return output.getvalue()
+
+
+class SwitchBackTest(unittest.TestCase):
+    def test_switches_back_at_a_break(self):
+        for engine in ("simpy", "cycle"):
+            with self.subTest(engine=engine):
+                output = run_cli("ADD R1, R0, 1\nBREAK\nADD R4, R0, 9\nHLT\n", "--switch-back", "--engine", engine)
+                self.assertIn("Executed the remaining 1 instructions functionally", output)
+                self.assertIn("R4: 9", output)
+
+    def test_doesnt_execute_the_code_after_a_halt(self):
+        for engine in ("simpy", "cycle"):
+            with self.subTest(engine=engine):
+                output = run_cli("ADD R1, R0, 1\nHLT\nADD R4, R0, 9\nHLT\n", "--switch-back", "--engine", engine)
+                self.assertIn("The program ended before a BREAK", output)
+                self.assertNotIn("R4: 9", output)
+
+
+class EngineArgumentTest(unittest.TestCase):
+    def test_default_engine(self):
+        self.assertEqual(parse_args(["program.asm"]).engine, "simpy")
+        self.assertEqual(parse_args(["--restore", "warm.ckpt"]).engine, "cycle")
+
+    def test_restore_rejects_the_simpy_engine(self):
+        with contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+            parse_args(["--restore", "warm.ckpt", "--engine", "simpy"])
+
+
+class LogArgumentTest(unittest.TestCase):
+    def test_unwritable_log_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            log_file = os.path.join(directory, "missing", "log.jsonl")
+            with contextlib.redirect_stderr(io.StringIO()) as error, self.assertRaises(SystemExit):
+                run_cli("HLT\n", "--log-file", log_file)
+            self.assertIn("Can't write the log", error.getvalue())
+
+    def test_invalid_level_doesnt_create_the_log_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            log_file = os.path.join(directory, "log.jsonl")
+            for level in ("bogus", "CDB=bogus"):
+                with self.subTest(level=level):
+                    with contextlib.redirect_stderr(io.StringIO()) as error, self.assertRaises(SystemExit):
+                        run_cli("HLT\n", "--log-file", log_file, "--log-level", level)
+                    self.assertIn("Unknown log level bogus", error.getvalue())
+                    self.assertFalse(os.path.exists(log_file))
+
+
+class SampleArgumentTest(unittest.TestCase):
+    def test_rejects_the_options_of_a_detailed_simulation(self):
+        for options in (["--checkpoint", "warm.ckpt", "-e", "cycle"], ["-o", "trace.jsonl"], ["--profile"],
+                        ["--switch-back"], ["--fast-forward", "100"], ["--step-by-step"]):
+            with self.subTest(options=options):
+                with contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+                    parse_args(["program.asm", "--sample", "3000"] + options)
+
+
+if __name__ == "__main__":
+    unittest.main()
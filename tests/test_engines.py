@@ -0,0 +1,36 @@
+import unittest
+
+from tomasulo_simulator import simulate, SimulationOptions
+from tests.test_simulation import read_example
+
+
+def timeline(result):
+    """The timings of the executed instructions, with the RS and FU each one got"""
+    return sorted((trace.issued, str(trace.instruction), trace.start_execution, trace.write_result,
+                   trace.written_result, str(trace.rs), str(trace.fu)) for trace in result.traces)
+
+
+class EnginesTest(unittest.TestCase):
+    def assertSameTimeline(self, name):
+        source = read_example(name)
+        simpy_result = simulate(source, options=SimulationOptions(engine="simpy"))
+        cycle_result = simulate(source, options=SimulationOptions(engine="cycle"))
+        self.assertEqual(cycle_result.cycles, simpy_result.cycles)
+        self.assertEqual(timeline(cycle_result), timeline(simpy_result))
+
+    def test_examples(self):
+        for name in ("loop.asm", "load_store.asm", "exam_2017_07_18.asm"):
+            with self.subTest(name=name):
+                self.assertSameTimeline(name)
+
+    def test_stations_released_in_the_same_cycle(self):
+        # ST R1, [R6+20] is issued in the cycle MemRS1 (a load) and MemRS2 (a store) finish their writeback:
+        # the store releases its station first, as in SimPy, so it gets MemRS2
+        self.assertSameTimeline("exam_2017_06_30.asm")
+        result = simulate(read_example("exam_2017_06_30.asm"))
+        store = [trace for trace in result.traces if str(trace.instruction) == "ST R1, [R6+20]"][0]
+        self.assertEqual((str(store.rs), str(store.fu)), ("MemRS2", "MEM2"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,22 @@
+import unittest
+
+from tomasulo_simulator import simulate, SimulationOptions
+from tomasulo_simulator.log_utils import LogConfig, RingBufferSink
+
+
+class RingBufferSinkTest(unittest.TestCase):
+    def test_breakpoint_logs_the_registers_when_hit(self):
+        source = "ADD R1, R0, 1\nBREAK\nADD R1, R0, 9\nHLT\n"
+        for engine in ("simpy", "cycle"):
+            with self.subTest(engine=engine):
+                sink = RingBufferSink()
+                result = simulate(source, options=SimulationOptions(engine=engine, log_config=LogConfig(sinks=[sink])))
+                self.assertEqual(result.cpu.reg_file["R1"], 9)
+                breakpoint_lines = [line for line in sink.lines() if "Breakpoint hit" in line]
+                self.assertEqual(len(breakpoint_lines), 1)
+                self.assertIn("R1: AluRS1,", breakpoint_lines[0])
+                self.assertIn("PC: 2", breakpoint_lines[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,15 @@
+import unittest
+
+from tomasulo_simulator.sampling import _normal_quantile
+
+
+class NormalQuantileTest(unittest.TestCase):
+    def test_known_values(self):
+        for p, z in ((0.5, 0), (0.9, 1.281552), (0.95, 1.644854), (0.975, 1.959964), (0.995, 2.575829)):
+            with self.subTest(p=p):
+                self.assertAlmostEqual(_normal_quantile(p), z, places=6)
+                self.assertAlmostEqual(_normal_quantile(1 - p), -z, places=6)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,36 @@
+import os
+import unittest
+
+from tomasulo_simulator import simulate, SimulationOptions
+
+EXAMPLES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "examples")
+
+
+def read_example(name):
+    with open(os.path.join(EXAMPLES, name)) as f:
+        return f.read()
+
+
+class MaxCyclesTest(unittest.TestCase):
+    def test_cap_after_the_end_doesnt_change_the_result(self):
+        source = read_example("loop.asm")
+        for engine in ("simpy", "cycle"):
+            with self.subTest(engine=engine):
+                uncapped = simulate(source, options=SimulationOptions(engine=engine))
+                capped = simulate(source, options=SimulationOptions(engine=engine, max_cycles=1000))
+                self.assertEqual(capped[:5], uncapped[:5])
+                self.assertEqual(capped.cycles, 47)
+                self.assertFalse(capped.stopped)
+
+    def test_cap_before_the_end_stops_the_simulation(self):
+        source = read_example("loop.asm")
+        for engine in ("simpy", "cycle"):
+            with self.subTest(engine=engine):
+                result = simulate(source, options=SimulationOptions(engine=engine, max_cycles=10))
+                self.assertTrue(result.stopped)
+                self.assertEqual(result.cycles, 10)
+                self.assertLess(result.instructions, 14)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,41 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from tomasulo_simulator.program_cache import load_program
+from tomasulo_simulator.sweep import run_sweep, simulate_config
+
+from tests.test_simulation import read_example
+
+
+class SimulateConfigTest(unittest.TestCase):
+    def test_max_cycles_after_the_end_of_the_program(self):
+        directives, instructions = load_program(read_example("loop.asm"))
+        for engine in ("simpy", "cycle"):
+            with self.subTest(engine=engine):
+                row = simulate_config(instructions, directives, {"alu_rs": 1}, engine, max_cycles=500)
+                self.assertEqual(row["cycles"], 47)
+                self.assertEqual(row["instructions"], 14)
+                self.assertIsNone(row["error"])
+
+    def test_max_cycles_before_the_end_of_the_program(self):
+        directives, instructions = load_program(read_example("loop.asm"))
+        row = simulate_config(instructions, directives, {"alu_rs": 1}, "simpy", max_cycles=20)
+        self.assertEqual(row["cycles"], 20)
+        self.assertEqual(row["error"], "Stopped after 20 cycles")
+
+
+class RunSweepTest(unittest.TestCase):
+    def test_parquet_without_an_engine_fails_before_simulating(self):
+        directives, instructions = load_program(read_example("loop.asm"))
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, "results.parquet")
+            with mock.patch("importlib.util.find_spec", return_value=None):
+                with self.assertRaisesRegex(ValueError, "pyarrow"):
+                    run_sweep(instructions, directives, [{"alu_rs": 1}], output=output)
+            self.assertEqual(os.listdir(directory), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
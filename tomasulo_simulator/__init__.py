@@ -2,5 +2,17 @@ from .parser import Parser
 from .assembler import assemble
 from .cpu_config import CpuConfig
 from .cpu import CPU
+from .cycle import CycleEnvironment, CycleCPU
+
+import simpy
+
+# Simulation engines: environment and CPU classes
+ENGINES = {
+    "simpy": (simpy.Environment, CPU),
+    "cycle": (CycleEnvironment, CycleCPU),
+}
+
+# After ENGINES, which it uses
+from .simulation import simulate, SimulationOptions, SimulationResult
 
 name = "tomasulo_simulator"
@@ -0,0 +1,4 @@
+from tomasulo_simulator.cli.simulation import main
+
+if __name__ == "__main__":
+    main()
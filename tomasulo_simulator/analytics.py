@@ -0,0 +1,158 @@
+"""Statistics of a simulation, computed in bulk on the columns of an ExecutionTraceStore.
+
+Everything is done with NumPy on the arrays of the store (see ExecutionTraceStore.to_numpy), without
+rebuilding the ExecutionTrace objects, so it takes a fraction of a second on millions of instructions:
+ - throughput:          IPC and CPI of the whole program
+ - windowed_ipc:        IPC in consecutive windows of cycles, to see the phases of the program
+ - stall_breakdown:     hazards of each type, the cycles instructions were stalled by them and the cycles
+                        in which at least one instruction was
+ - utilization:         busy cycles of each reservation station and functional unit
+ - latency_statistics:  mean and percentiles of the time spent in each stage by the instructions
+ - served_by:           memory accesses served by each level of the cache hierarchy
+
+An instruction retires when it commits (CPUs with a reorder buffer) or when its result has been written.
+Reservation stations are busy from the issue of an instruction until its result has been written, functional
+units from the start of its execution until then.
+Unless given (e.g. env.now), the length of the simulation is taken to be the cycle after the last retirement."""
+from collections import namedtuple
+
+import numpy as np
+
+from tomasulo_simulator import execution_trace as etrace
+from tomasulo_simulator.cache import LEVEL_NAMES
+from tomasulo_simulator.trace_store import NONE
+
+Throughput = namedtuple("Throughput", "instructions cycles ipc cpi")
+WindowedIPC = namedtuple("WindowedIPC", "start instructions ipc")
+# stall_cycles is summed over the instructions (stalls of different instructions may overlap),
+# cycles counts the cycles in which at least one instruction was stalled, share is their fraction of the total
+HazardStalls = namedtuple("HazardStalls", "hazard count stall_cycles cycles share")
+Utilization = namedtuple("Utilization", "resource kind instructions busy_cycles utilization")
+LatencyStatistics = namedtuple("LatencyStatistics", "latency count mean p50 p90 p99 max")
+# share is the fraction of the memory accesses served by the level
+ServedBy = namedtuple("ServedBy", "level accesses share")
+
+# Stages measured by latency_statistics: name, start and end columns
+LATENCIES = [
+    ("issue_to_execution", "issued", "start_execution"),
+    ("execution", "start_execution", "write_result"),
+    ("write_result", "write_result", "written_result"),
+    ("issue_to_written_result", "issued", "written_result"),
+    ("issue_to_commit", "issued", "committed"),
+]
+
+
+def retirement_cycles(traces):
+    """Cycle in which each instruction retired, in retirement order"""
+    columns = traces.to_numpy()
+    return np.where(columns["committed"] != NONE, columns["committed"], columns["written_result"])
+
+
+def _total_cycles(traces, cycles):
+    if cycles is not None:
+        return cycles
+    return int(retirement_cycles(traces).max()) + 1 if len(traces) else 0
+
+
+def throughput(traces, cycles=None):
+    """Returns the IPC and CPI of the simulation (None if nothing was executed)"""
+    cycles = _total_cycles(traces, cycles)
+    instructions = len(traces)
+    return Throughput(instructions, cycles,
+                      instructions / cycles if cycles else None,
+                      cycles / instructions if instructions else None)
+
+
+def windowed_ipc(traces, window, cycles=None):
+    """Returns the instructions retired and the IPC in each window of the given number of cycles, as arrays
+    (WindowedIPC). The last window may be shorter"""
+    if window < 1:
+        raise ValueError("The window must be at least one cycle")
+    cycles = _total_cycles(traces, cycles)
+    windows = -(-cycles // window)
+    retired = retirement_cycles(traces)
+    # With a reorder buffer the simulation ends in the cycle of the last commit: it goes in the last window
+    retired = np.minimum(retired[retired != NONE], cycles - 1)
+    counts = np.bincount(retired // window, minlength=windows)[:windows]
+    start = np.arange(windows, dtype=np.int64) * window
+    lengths = np.minimum(start + window, cycles) - start
+    return WindowedIPC(start, counts, counts / lengths)
+
+
+def stall_breakdown(traces, cycles=None):
+    """Returns the hazards of each type (HazardStalls, in the order of etrace.HAZARD_TYPES)"""
+    cycles = _total_cycles(traces, cycles)
+    hazards = traces.hazards.to_numpy()
+    types = hazards["type"].astype(np.intp)
+    detected_at = hazards["detected_at"]
+    solved_at = hazards["solved_at"]
+    durations = solved_at - detected_at
+    counts = np.bincount(types, minlength=len(etrace.HAZARD_TYPES))
+    stall_cycles = np.bincount(types, weights=durations, minlength=len(etrace.HAZARD_TYPES))
+
+    stalls = []
+    for index, hazard_type in enumerate(etrace.HAZARD_TYPES):
+        selected = types == index
+        covered = _union_length(detected_at[selected], solved_at[selected])
+        stalls.append(HazardStalls(hazard_type.__name__, int(counts[index]), int(stall_cycles[index]), covered,
+                                   covered / cycles if cycles else None))
+    return stalls
+
+
+def _union_length(starts, ends):
+    """Length of the union of the intervals [start, end)"""
+    if not len(starts):
+        return 0
+    order = np.argsort(starts, kind="stable")
+    starts, ends = starts[order], ends[order]
+    # Every interval only adds what lies after the end of all the ones starting before it
+    covered_until = np.maximum.accumulate(ends)
+    previous_end = np.concatenate(([starts[0]], covered_until[:-1]))
+    return int(np.maximum(ends - np.maximum(starts, previous_end), 0).sum())
+
+
+def utilization(traces, cycles=None):
+    """Returns the busy cycles of every reservation station and functional unit used by the instructions
+    (Utilization, RS before FU, sorted by name)"""
+    cycles = _total_cycles(traces, cycles)
+    columns = traces.to_numpy()
+    names = traces.resources.names()
+    result = []
+    for kind, column, start in (("RS", "rs", "issued"), ("FU", "fu", "start_execution")):
+        resources = columns[column]
+        used = (resources != NONE) & (columns[start] != NONE) & (columns["written_result"] != NONE)
+        resources = resources[used]
+        busy = columns["written_result"][used] - columns[start][used]
+        instructions = np.bincount(resources, minlength=len(names))
+        busy_cycles = np.bincount(resources, weights=busy, minlength=len(names))
+        for index in sorted(np.flatnonzero(instructions), key=lambda i: names[i]):
+            result.append(Utilization(names[index], kind, int(instructions[index]), int(busy_cycles[index]),
+                                      busy_cycles[index] / cycles if cycles else None))
+    return result
+
+
+def latency_statistics(traces):
+    """Returns the mean, median, 90th and 99th percentile and maximum of the cycles spent by the instructions in
+    each stage (LatencyStatistics, in the order of LATENCIES). Stages no instruction went through are left out
+    (e.g. the commit without a reorder buffer)"""
+    columns = traces.to_numpy()
+    result = []
+    for name, start, end in LATENCIES:
+        measured = (columns[start] != NONE) & (columns[end] != NONE)
+        if not measured.any():
+            continue
+        latencies = columns[end][measured] - columns[start][measured]
+        p50, p90, p99 = np.percentile(latencies, (50, 90, 99))
+        result.append(LatencyStatistics(name, len(latencies), float(latencies.mean()), float(p50), float(p90),
+                                        float(p99), int(latencies.max())))
+    return result
+
+
+def served_by(traces):
+    """Returns the loads and stores served by each level of the cache hierarchy (ServedBy, from the L1 to the
+    memory). Levels which served no access are left out, and so is everything without a cache hierarchy"""
+    levels = traces.to_numpy()["served_by"]
+    levels = levels[levels != NONE].astype(np.intp)
+    counts = np.bincount(levels, minlength=max(LEVEL_NAMES) + 1)
+    return [ServedBy(name, int(counts[level]), counts[level] / len(levels))
+            for level, name in sorted(LEVEL_NAMES.items()) if counts[level]]
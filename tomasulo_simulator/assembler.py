@@ -14,6 +14,8 @@ class Assembler:
                     i.address = self.labels[i.label]
                 except KeyError:
                     raise RuntimeError("Label {} is not declared".format(i.label))
+            # Registers are looked up by their slot in the register file, computed once here
+            instruction.resolve_registers(i)
 
             assembled.append(i)
 
@@ -29,6 +31,7 @@ class Assembler:
 
         elif isinstance(code, instruction.Instruction):
             self.code.append(code)
+            code.id = len(self.code)
 
         return self
 
@@ -0,0 +1,175 @@
+"""Branch predictors, consulted by CPUs with a reorder buffer when they issue a control flow instruction.
+
+Predictors guess the direction of the branches, whose target is known as soon as they are decoded.
+Jumps are always taken: with a branch target buffer (btb_size > 0) their target is known only if the BTB
+holds it, otherwise the fall-through instruction is fetched and the jump is mispredicted.
+Predictors and BTB are trained when the instructions commit, so only by the right path. The global history
+of gshare is updated speculatively, with the predicted outcomes, and repaired after a misprediction: the CPU
+takes a checkpoint() of the predictor before each prediction, to recover() and update() it.
+
+The predictor is chosen with the .branch_predictor directive (see PREDICTORS), the size of its table of
+counters with .predictor_size and the global history of gshare with .history_bits."""
+from collections import namedtuple
+
+from tomasulo_simulator import execution_trace as etrace
+from tomasulo_simulator.cpu_config import CpuConfig
+from tomasulo_simulator.instruction import ControlFlowInstruction
+
+# States of the 2-bit saturating counters
+STRONGLY_NOT_TAKEN = 0
+WEAKLY_NOT_TAKEN = 1
+WEAKLY_TAKEN = 2
+STRONGLY_TAKEN = 3
+
+
+class BranchPredictor:
+    name = None
+
+    def predict(self, pc, target):
+        """Returns True if the branch at pc, jumping to target, is predicted taken"""
+        raise NotImplementedError()
+
+    def checkpoint(self):
+        """Returns the speculative state of the predictor, taken before a prediction"""
+        return None
+
+    def recover(self, checkpoint, taken):
+        """Restores the state from before a mispredicted branch, which turned out taken or not"""
+        pass
+
+    def update(self, pc, target, taken, checkpoint):
+        """Trains the predictor with the outcome of a committed branch"""
+        pass
+
+    def __repr__(self):
+        return self.name
+
+
+class NotTakenPredictor(BranchPredictor):
+    name = "not_taken"
+
+    def predict(self, pc, target):
+        return False
+
+
+class BackwardTakenPredictor(BranchPredictor):
+    """Backward branches (loops) taken, forward ones not taken"""
+    name = "backward_taken"
+
+    def predict(self, pc, target):
+        return target <= pc
+
+
+class BimodalPredictor(BranchPredictor):
+    """A table of 2-bit saturating counters indexed by the PC"""
+    name = "bimodal"
+
+    def __init__(self, size):
+        if size < 1:
+            raise ValueError("The predictor needs at least one counter")
+        self.counters = [WEAKLY_NOT_TAKEN] * size
+
+    def predict(self, pc, target):
+        return self.counters[pc % len(self.counters)] >= WEAKLY_TAKEN
+
+    def update(self, pc, target, taken, checkpoint):
+        self._train(pc % len(self.counters), taken)
+
+    def _train(self, index, taken):
+        counter = self.counters[index]
+        if taken:
+            self.counters[index] = min(counter + 1, STRONGLY_TAKEN)
+        else:
+            self.counters[index] = max(counter - 1, STRONGLY_NOT_TAKEN)
+
+
+class GSharePredictor(BimodalPredictor):
+    """2-bit counters indexed by the PC xor the outcomes of the last branches (global history)"""
+    name = "gshare"
+
+    def __init__(self, size, history_bits):
+        super().__init__(size)
+        self.history_mask = (1 << history_bits) - 1
+        self.history = 0
+
+    def _shift(self, history, taken):
+        return ((history << 1) | taken) & self.history_mask
+
+    def predict(self, pc, target):
+        taken = self.counters[(pc ^ self.history) % len(self.counters)] >= WEAKLY_TAKEN
+        self.history = self._shift(self.history, taken)
+        return taken
+
+    def checkpoint(self):
+        return self.history
+
+    def recover(self, checkpoint, taken):
+        self.history = self._shift(checkpoint, taken)
+
+    def update(self, pc, target, taken, checkpoint):
+        # The counter used by the prediction, indexed with the history of that time
+        self._train((pc ^ checkpoint) % len(self.counters), taken)
+
+
+class BranchTargetBuffer:
+    """Direct-mapped cache of the targets of the jumps, indexed by their PC"""
+    def __init__(self, size):
+        self.tags = [None] * size
+        self.targets = [None] * size
+
+    def lookup(self, pc):
+        """Returns the target of the jump at pc, or None if the BTB doesn't hold it"""
+        index = pc % len(self.tags)
+        if self.tags[index] == pc:
+            return self.targets[index]
+        return None
+
+    def update(self, pc, target):
+        index = pc % len(self.tags)
+        self.tags[index] = pc
+        self.targets[index] = target
+
+
+PREDICTORS = {
+    NotTakenPredictor.name: lambda config: NotTakenPredictor(),
+    BackwardTakenPredictor.name: lambda config: BackwardTakenPredictor(),
+    BimodalPredictor.name: lambda config: BimodalPredictor(config.predictor_size),
+    GSharePredictor.name: lambda config: GSharePredictor(config.predictor_size, config.history_bits),
+}
+
+
+def make_predictor(config: CpuConfig):
+    """Returns the branch predictor selected by the configuration"""
+    try:
+        factory = PREDICTORS[config.branch_predictor]
+    except KeyError:
+        raise ValueError("Unknown branch predictor {} (available: {})"
+                         .format(config.branch_predictor, ", ".join(PREDICTORS)))
+    return factory(config)
+
+
+def make_btb(config: CpuConfig):
+    """Returns the branch target buffer of the configuration, None if jump targets are known at decode"""
+    if config.btb_size > 0:
+        return BranchTargetBuffer(config.btb_size)
+    return None
+
+
+BranchStatistics = namedtuple("BranchStatistics", "pc instruction executions mispredictions accuracy penalty")
+
+
+def branch_statistics(traces):
+    """Returns the prediction accuracy of every control flow instruction in the traces (BranchStatistics,
+    sorted by PC). penalty is the number of cycles spent fetching down the wrong path"""
+    stats = {}
+    for trace in traces:
+        if not isinstance(trace.instruction, ControlFlowInstruction):
+            continue
+        instruction, executions, mispredictions, penalty = stats.get(trace.pc, (trace.instruction, 0, 0, 0))
+        for hazard in trace.hazards:
+            if type(hazard) is etrace.BranchMispredictionHazard:
+                mispredictions += 1
+                penalty += hazard.solved_at - hazard.detected_at
+        stats[trace.pc] = (instruction, executions + 1, mispredictions, penalty)
+    return [BranchStatistics(pc, instruction, executions, mispredictions, 1 - mispredictions / executions, penalty)
+            for pc, (instruction, executions, mispredictions, penalty) in sorted(stats.items())]
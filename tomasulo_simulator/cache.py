@@ -0,0 +1,201 @@
+"""Cache hierarchy in front of the memory: an L1 data cache and an optional L2, which give the latency of every
+memory access (in place of the flat memfu_execution_latency) when .l1_size isn't 0.
+
+Every level has a size and a line size (.line_size, shared by the levels) in words, an associativity and a hit
+latency; a miss in the last level costs .memory_latency more. Lines are replaced in LRU or tree pseudo-LRU order
+(.cache_replacement), stores are written back when their line is evicted or written through to the next level
+(.cache_write_policy), and a store which misses brings its line into the cache or not (.cache_write_allocate).
+There's no write buffer: write-backs of dirty lines and write-throughs add to the latency of the access.
+
+Only the timing is modeled: the values are always read from and written to the memory. The engines access
+the hierarchy when a load or a store starts executing, and record in its trace the level which served it
+(served_by: L1, L2 or MEMORY)."""
+from tomasulo_simulator.cpu_config import CpuConfig
+
+LRU = "lru"
+PLRU = "plru"
+REPLACEMENT_POLICIES = (LRU, PLRU)
+
+WRITE_BACK = "write_back"
+WRITE_THROUGH = "write_through"
+WRITE_POLICIES = (WRITE_BACK, WRITE_THROUGH)
+
+# Level which served an access (ExecutionTrace.served_by)
+L1 = 1
+L2 = 2
+MEMORY = 3
+LEVEL_NAMES = {L1: "L1", L2: "L2", MEMORY: "MEM"}
+
+
+class CacheLevel:
+    """A set-associative cache holding the tags of the lines, their dirty bits and their replacement state"""
+    def __init__(self, name, size, associativity, line_size, latency, replacement):
+        if associativity < 1 or size < line_size * associativity or size % (line_size * associativity):
+            raise ValueError("The size of {} ({} words) must be a multiple of line size * associativity ({} * {})"
+                             .format(name, size, line_size, associativity))
+        if replacement == PLRU and associativity & (associativity - 1):
+            raise ValueError("Pseudo-LRU replacement needs a power of two associativity ({} has {})"
+                             .format(name, associativity))
+        self.name = name
+        self.associativity = associativity
+        self.latency = latency
+        self.replacement = replacement
+        self.sets = size // (line_size * associativity)
+        # Set -> tag of the line in each way (None if empty), dirty bits and LRU timestamps or PLRU tree bits
+        self.tags = [[None] * associativity for _ in range(self.sets)]
+        self.dirty = [[False] * associativity for _ in range(self.sets)]
+        if replacement == LRU:
+            self.state = [[0] * associativity for _ in range(self.sets)]
+        else:
+            self.state = [[0] * (associativity - 1) for _ in range(self.sets)]
+        self._clock = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.writebacks = 0
+
+    def lookup(self, line):
+        """Returns the way holding the line, None if it misses"""
+        tags = self.tags[line % self.sets]
+        tag = line // self.sets
+        for way in range(self.associativity):
+            if tags[way] == tag:
+                return way
+        return None
+
+    def touch(self, line, way):
+        """Records an access to the way, for the replacement policy"""
+        state = self.state[line % self.sets]
+        if self.replacement == LRU:
+            self._clock += 1
+            state[way] = self._clock
+            return
+        # Every node of the tree points to the half which was used less recently
+        node = 0
+        span = self.associativity
+        while span > 1:
+            span //= 2
+            right = way & span != 0
+            state[node] = 0 if right else 1
+            node = 2 * node + (2 if right else 1)
+
+    def victim(self, line):
+        index = line % self.sets
+        tags = self.tags[index]
+        if None in tags:
+            return tags.index(None)
+        state = self.state[index]
+        if self.replacement == LRU:
+            return state.index(min(state))
+        node = 0
+        way = 0
+        span = self.associativity
+        while span > 1:
+            span //= 2
+            if state[node]:
+                way += span
+                node = 2 * node + 2
+            else:
+                node = 2 * node + 1
+        return way
+
+    def fill(self, line, dirty):
+        """Brings the line into the cache, and returns the evicted line if it was dirty (None otherwise)"""
+        index = line % self.sets
+        way = self.victim(line)
+        tags, dirty_bits = self.tags[index], self.dirty[index]
+        evicted = None
+        if tags[way] is not None and dirty_bits[way]:
+            evicted = tags[way] * self.sets + index
+            self.writebacks += 1
+        tags[way] = line // self.sets
+        dirty_bits[way] = dirty
+        self.touch(line, way)
+        return evicted
+
+
+class CacheHierarchy:
+    def __init__(self, config: CpuConfig):
+        if config.cache_replacement not in REPLACEMENT_POLICIES:
+            raise ValueError("Unknown cache replacement policy {} (available: {})"
+                             .format(config.cache_replacement, ", ".join(REPLACEMENT_POLICIES)))
+        if config.cache_write_policy not in WRITE_POLICIES:
+            raise ValueError("Unknown cache write policy {} (available: {})"
+                             .format(config.cache_write_policy, ", ".join(WRITE_POLICIES)))
+        self.line_size = config.line_size
+        self.levels = [CacheLevel("L1", config.l1_size, config.l1_associativity, config.line_size,
+                                  config.l1_latency, config.cache_replacement)]
+        if config.l2_size > 0:
+            self.levels.append(CacheLevel("L2", config.l2_size, config.l2_associativity, config.line_size,
+                                          config.l2_latency, config.cache_replacement))
+        self.memory_latency = config.memory_latency
+        self.write_back = config.cache_write_policy == WRITE_BACK
+        self.write_allocate = bool(config.cache_write_allocate)
+
+    def access(self, address, store):
+        """Returns the latency of a load or store and the level which served it"""
+        return self._access(0, address // self.line_size, store)
+
+    def _access(self, depth, line, store):
+        if depth == len(self.levels):
+            return self.memory_latency, MEMORY
+        level = self.levels[depth]
+        latency = level.latency
+        way = level.lookup(line)
+        if way is not None:
+            level.hits += 1
+            level.touch(line, way)
+            if store:
+                if self.write_back:
+                    level.dirty[line % level.sets][way] = True
+                else:
+                    latency += self._write(depth + 1, line)[0]
+            return latency, depth + 1
+
+        level.misses += 1
+        if store and not self.write_allocate:
+            next_latency, served_by = self._write(depth + 1, line)
+            return latency + next_latency, served_by
+
+        next_latency, served_by = self._access(depth + 1, line, False)
+        latency += next_latency
+        evicted = level.fill(line, store and self.write_back)
+        if evicted is not None:
+            latency += self._write(depth + 1, evicted)[0]
+        if store and not self.write_back:
+            latency += self._write(depth + 1, line)[0]
+        return latency, served_by
+
+    def _write(self, depth, line):
+        """Writes a line evicted from, or a store written through, the level above.
+        Returns the latency and the level which took the write"""
+        if depth == len(self.levels):
+            return self.memory_latency, MEMORY
+        level = self.levels[depth]
+        if not self.write_back:
+            next_latency, served_by = self._write(depth + 1, line)
+            way = level.lookup(line)
+            if way is not None:
+                level.touch(line, way)
+            return level.latency + next_latency, served_by
+
+        latency = level.latency
+        way = level.lookup(line)
+        if way is not None:
+            level.touch(line, way)
+            level.dirty[line % level.sets][way] = True
+        else:
+            # The whole line is written: it doesn't need to be read first
+            evicted = level.fill(line, True)
+            if evicted is not None:
+                latency += self._write(depth + 1, evicted)[0]
+        return latency, depth + 1
+
+
+def make_caches(config: CpuConfig):
+    """Returns the cache hierarchy of the configuration, None if the memory is accessed directly"""
+    if config.l1_size > 0:
+        return CacheHierarchy(config)
+    if config.l2_size > 0:
+        raise ValueError("An L2 cache needs an L1 cache (.l1_size)")
+    return None
@@ -1,5 +1,3 @@
-from collections import namedtuple
-
 import simpy
 
 from tomasulo_simulator.execution_trace import CDBUnavailableHazard
@@ -7,13 +5,22 @@ from tomasulo_simulator.log_utils import get_logger
 
 
 class CDB(simpy.Resource):
-    def __init__(self, env, width):
+    """Common data bus. Consumers subscribe to the tag (reservation station) of the value they need,
+    and each write calls the subscribers of its tag in a single pass, then forgets the tag
+    so the reservation station can be reused as a tag right away."""
+    def __init__(self, env, width, log_config=None):
         super().__init__(env, width)
         self.env = env
-        self.waiting = {}
+        # Tag -> list of (callback, depth)
+        self._subscribers = {}
+
+        # Counters
+        self.writes = 0
+        self.subscriptions = 0
+        self.deliveries = 0
 
         self.id = "CDB"
-        self._log = get_logger(env, self.id)
+        self._log = get_logger(env, self.id, config=log_config)
 
     def write(self, tag, value):
         """Returns a Simpy process that writes a value to the CDB."""
@@ -33,35 +40,48 @@ class CDB(simpy.Resource):
             detected_at = self.env.now
             yield req
             if rs is not None:
-                rs.instruction.stats.hazards.append(CDBUnavailableHazard(detected_at, self.env.now))
+                rs.trace.hazards.append(CDBUnavailableHazard(detected_at, self.env.now))
 
         self._log("Writing {}: {}", tag, value)
         # TODO: make CDB latency configurable
         yield self.env.timeout(1)
-        events = self.waiting.get(tag, [])
-        for event in events:
-            event.succeed(CDBWrite(tag, value))
-        self.waiting[tag] = []
+        self.writes += 1
+        subscribers = self._subscribers.pop(tag, ())
+        self.deliveries += len(subscribers)
+        for callback, depth in subscribers:
+            if depth:
+                self._call_later(depth, callback, value)
+            else:
+                callback(value)
 
         self.release(req)
 
-    def snoop(self, tag):
-        """Returns a Simpy process that waits until a value with the given tag is written to the CDB.
-        The returned process yields the value written to the CDB."""
-        events = self.waiting.get(tag, [])
+    def subscribe(self, tag, callback, depth=0):
+        """Calls callback(value) when a value with the given tag is written to the CDB.
+        With depth > 0 the callback is called that many events after the write, in the same clock cycle:
+        the order of simultaneous events decides who gets a contended resource first, so consumers which
+        replaced a chain of processes keep its depth and the timings don't change."""
+        self.subscriptions += 1
+        subscribers = self._subscribers.get(tag)
+        if subscribers is None:
+            self._subscribers[tag] = [(callback, depth)]
+        else:
+            subscribers.append((callback, depth))
+
+    def _call_later(self, depth, callback, value):
         event = simpy.Event(self.env)
-        events.append(event)
-        self.waiting[tag] = events
-
-        def _snoop():
-            write = yield event
-            return write.value
+        if depth == 1:
+            event.callbacks.append(lambda _: callback(value))
+        else:
+            event.callbacks.append(lambda _: self._call_later(depth - 1, callback, value))
+        event.succeed()
 
-        return self.env.process(_snoop())
+    def snoop(self, tag):
+        """Returns a Simpy event triggered with the value written to the CDB with the given tag."""
+        event = simpy.Event(self.env)
+        self.subscribe(tag, event.succeed, 1)
+        return event
 
     @property
     def busy(self):
         return self.count >= self.capacity
-
-
-CDBWrite = namedtuple("CDBWrite", ["tag", "value"])
@@ -0,0 +1,90 @@
+"""Checkpoints of a running simulation, to pause and resume it or to fork experiments from a warmed-up state.
+
+A checkpoint holds the whole state of a cycle engine CPU between two cycles: the program, register values
+and producer tags, memory, reservation stations and their operands, functional units, the memory access
+queue, the stations waiting for the CDB and for each other's results, the reorder buffer and branch
+predictor, the PC and the dispatcher, and the traces of the retired instructions (unless they were streamed
+to a trace sink). The file is the pickled CPU, compressed:
+
+    env.run(until=1000)
+    save_checkpoint(cpu, "warm.ckpt")
+    ...
+    env, cpu = load_checkpoint("warm.ckpt", {"cdb_width": 2})
+    env.run()
+
+The restored CPU continues from the next cycle with the same timings as the original one.
+Directives which don't size any table (ADJUSTABLE_DIRECTIVES) can be changed when restoring; instructions
+already issued keep the latency they were issued with.
+
+The SimPy engine keeps its state in suspended generators, which can't be saved: only CycleCPU is supported."""
+import os
+import pickle
+import tempfile
+import zlib
+
+from tomasulo_simulator.cycle import CycleCPU, CycleEnvironment
+from tomasulo_simulator.decoder import decode_program
+
+MAGIC = b"TOMCKPT4\n"
+
+# Directives which can be overridden when restoring a checkpoint
+ADJUSTABLE_DIRECTIVES = ("cdb_width", "fetch_latency",
+                         "alufu_execution_latency", "alurs_execution_latency",
+                         "fpalufu_execution_latency", "fpalurs_execution_latency",
+                         "memfu_execution_latency", "memrs_execution_latency")
+
+
+def save_checkpoint(cpu, path):
+    """Writes the state of the CPU, and the clock of its environment, to a file"""
+    if not isinstance(cpu, CycleCPU):
+        raise TypeError("Only the CPUs of the cycle engine can be checkpointed")
+    if cpu.bus is not None:
+        raise TypeError("The cores of a multi-core system can't be checkpointed")
+    state = {"now": cpu.env.now, "started": cpu.env._started, "cpu": cpu}
+    data = MAGIC + zlib.compress(pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL))
+
+    # Written to a temporary file and renamed, so a crash never leaves a partial checkpoint
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def load_checkpoint(path, overrides=None, breakpoint_handler=None, trace_sink=None, log_config=None):
+    """Restores a CPU from a checkpoint, with the given directives overridden (see ADJUSTABLE_DIRECTIVES).
+    Returns its environment and the CPU, whose process is already scheduled (unless the simulation was over):
+    call env.run() to continue.
+    New traces go to trace_sink if given, otherwise they are appended to the ones in the checkpoint.
+    The components log with log_config if given, otherwise with the configuration set by log_utils.configure().
+    The checkpoint is unpickled, which can run arbitrary code: only load checkpoints from a trusted source"""
+    with open(path, "rb") as f:
+        data = f.read()
+    if not data.startswith(MAGIC):
+        raise ValueError("{} is not a checkpoint (or is from an incompatible version)".format(path))
+    state = pickle.loads(zlib.decompress(data[len(MAGIC):]))
+
+    cpu = state["cpu"]
+    if overrides:
+        _apply_overrides(cpu, overrides)
+
+    env = CycleEnvironment(state["now"])
+    env._started = state["started"]
+    cpu._attach(env, breakpoint_handler, trace_sink, log_config)
+    if not cpu.finished:
+        env.process(cpu.resume())
+    return env, cpu
+
+
+def _apply_overrides(cpu, overrides):
+    for name in overrides:
+        if name not in ADJUSTABLE_DIRECTIVES:
+            raise ValueError("{} can't be changed when restoring a checkpoint (only {} can)"
+                             .format(name, ", ".join(ADJUSTABLE_DIRECTIVES)))
+    cpu.config.apply_config(overrides)
+    # Latencies are decoded once per static instruction
+    cpu._decoded = decode_program(cpu._instructions, cpu.config)
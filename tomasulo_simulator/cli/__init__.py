@@ -0,0 +1 @@
+"""Command line interfaces, installed as the tomasulo-simulator and tomasulo-sweep commands"""
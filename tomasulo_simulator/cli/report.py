@@ -0,0 +1,168 @@
+"""Statistics printed by the simulator at the end of a run, as pandas tables.
+
+Imported only when they are printed, so runs without statistics (--no-stats) don't load pandas nor NumPy."""
+import numpy as np
+import pandas as pd
+
+from tomasulo_simulator import analytics
+from tomasulo_simulator.cache import LEVEL_NAMES
+from tomasulo_simulator.execution_trace import HAZARD_TYPES, RAWHazard
+from tomasulo_simulator.trace_sink import read_traces
+
+
+def print_trace_stats(cpu, ipc_window=None):
+    """Prints the execution trace of a CPU which kept it in memory, and its statistics"""
+    traces = cpu.executed_instructions
+    df = traces.to_dataframe()
+    df["hazards"] = hazard_strings(traces)
+    print_stats(df)
+    print_analytics(traces, cpu.env.now, ipc_window, getattr(cpu, "caches", None))
+    if getattr(cpu, "rob", None) is not None:
+        print_branch_stats(traces)
+    print("\nExecution trace: {} instructions, {:.0f} bytes per instruction"
+          .format(len(traces), traces.bytes_per_instruction()))
+
+
+def print_trace_file_stats(path):
+    """Prints an execution trace streamed to a file, reading it back"""
+    df = pd.DataFrame(list(read_traces(path)))
+    df["hazards"] = [" ".join(format_hazard(hazard) for hazard in hazards) for hazards in df["hazards"]]
+    print_stats(df)
+
+
+def print_multicore_stats(system):
+    for core in system.cores:
+        traces = core.executed_instructions
+        df = traces.to_dataframe()
+        df["hazards"] = hazard_strings(traces)
+        print("\nCore {}:".format(core.core_id))
+        print_stats(df)
+        if core.caches is not None:
+            print_cache_stats(traces, core.caches)
+
+    stats = system.statistics()
+    df = pd.DataFrame(stats.cores, columns=stats.cores[0]._fields).set_index("core")
+    print("\nCores:")
+    print(df.to_string(header=["Instructions", "Cycles", "IPC", "Hits", "Misses", "Bus stall cycles"],
+                       formatters={"ipc": "{:.3f}".format}))
+    print("\n{} instructions in {} cycles: aggregate IPC {:.3f}".format(stats.instructions, stats.cycles, stats.ipc))
+    print("Bus: busy {:.1%} of the cycles, {} ({} invalidations, {} flushes)".format(
+        stats.bus_utilization, ", ".join("{} {}".format(count, name) for name, count in stats.transactions.items()),
+        stats.invalidations, stats.flushes))
+
+
+def format_hazard(hazard):
+    """Formats a hazard read from a trace file like the repr of its namedtuple"""
+    fields = ", ".join("{}={}".format(k, v) for k, v in hazard.items() if k != "type")
+    return "{}({})".format(hazard["type"], fields)
+
+
+def print_stats(df):
+    columns = ["Instruction", "Issue", "Start exec.", "Write res.", "Written res.", "Hazards", "RS", "FU"]
+    col_order = ["instruction", "issued", "start_execution", "write_result", "written_result", "hazards", "rs", "fu"]
+    # Only CPUs with a reorder buffer commit instructions (missing values are -1 or None)
+    if (df["committed"].fillna(-1) >= 0).any():
+        columns.insert(5, "Commit")
+        col_order.insert(5, "committed")
+    # Only CPUs with a cache hierarchy record the level which served the memory accesses
+    served_by = df["served_by"].fillna(-1)
+    if (served_by >= 0).any():
+        df = df.assign(served_by=served_by.map(lambda level: LEVEL_NAMES.get(level, "")))
+        columns.append("Cache")
+        col_order.append("served_by")
+    df = df.sort_values(by="issued", kind="stable")[col_order]
+    pd.set_option('display.max_colwidth', None)
+    print("\n")
+    print(df.to_string(header=columns, justify="end"))
+
+
+def hazard_strings(traces):
+    """The hazards of each instruction, formatted like the reprs of their namedtuples and joined by spaces.
+    Built from the columns of the hazard table, without rebuilding the traces"""
+    hazards = traces.hazards
+    templates = []
+    for hazard_type in HAZARD_TYPES:
+        template = hazard_type.__name__ + "(detected_at={0}, solved_at={1}"
+        if hazard_type is RAWHazard:
+            template += ", register='{2}', source_rs={3}"
+        elif len(hazard_type._fields) > 2:
+            template += ", " + hazard_type._fields[2] + "={3}"
+        templates.append(template + ")")
+    # The last name is for a missing register or resource (-1)
+    registers = hazards.registers.names() + [""]
+    resources = hazards.resources.names() + [""]
+    texts = np.array([templates[hazard_type].format(detected_at, solved_at, registers[register], resources[resource])
+                      for hazard_type, detected_at, solved_at, register, resource
+                      in zip(hazards.type, hazards.detected_at, hazards.solved_at, hazards.register, hazards.resource)],
+                     dtype=object)
+
+    starts = np.frombuffer(traces.hazard_start, dtype=np.int64)
+    ends = np.append(starts[1:], len(hazards))
+    counts = ends - starts
+    strings = np.full(len(traces), "", dtype=object)
+    single = counts == 1
+    strings[single] = texts[starts[single]]
+    for row in np.flatnonzero(counts > 1):
+        strings[row] = " ".join(texts[starts[row]:ends[row]])
+    return strings
+
+
+def print_analytics(traces, cycles, ipc_window=None, caches=None):
+    if not len(traces):
+        return
+    stats = analytics.throughput(traces, cycles)
+    print("\n{} instructions in {} cycles: IPC {:.3f}, CPI {:.3f}".format(stats.instructions, stats.cycles,
+                                                                         stats.ipc, stats.cpi))
+    if ipc_window:
+        windows = analytics.windowed_ipc(traces, ipc_window, cycles)
+        df = pd.DataFrame({"start": windows.start, "instructions": windows.instructions, "ipc": windows.ipc})
+        print("\nIPC every {} cycles:".format(ipc_window))
+        print(df.to_string(index=False, header=["From cycle", "Instructions", "IPC"],
+                           formatters={"ipc": "{:.3f}".format}))
+
+    stalls = [stall for stall in analytics.stall_breakdown(traces, cycles) if stall.count]
+    if stalls:
+        df = pd.DataFrame(stalls, columns=analytics.HazardStalls._fields).set_index("hazard")
+        print("\nStalls:")
+        print(df.to_string(header=["Hazards", "Stall cycles", "Cycles", "Of the total"],
+                           formatters={"share": "{:.1%}".format}))
+
+    df = pd.DataFrame(analytics.utilization(traces, cycles), columns=analytics.Utilization._fields)
+    print("\nUtilization:")
+    print(df.set_index("resource").to_string(header=["Kind", "Instructions", "Busy cycles", "Utilization"],
+                                             formatters={"utilization": "{:.1%}".format}))
+
+    df = pd.DataFrame(analytics.latency_statistics(traces), columns=analytics.LatencyStatistics._fields)
+    print("\nLatencies (cycles):")
+    print(df.set_index("latency").to_string(header=["Instructions", "Mean", "Median", "90%", "99%", "Max"],
+                                            float_format="{:.1f}".format))
+
+    if caches is not None:
+        print_cache_stats(traces, caches)
+
+
+def print_cache_stats(traces, caches):
+    df = pd.DataFrame([(level.name, level.hits, level.misses, level.writebacks) for level in caches.levels],
+                      columns=["level", "hits", "misses", "writebacks"]).set_index("level")
+    accesses = df["hits"] + df["misses"]
+    df.insert(2, "hit_rate", (df["hits"] / accesses.where(accesses > 0)).fillna(0))
+    print("\nCaches:")
+    print(df.to_string(header=["Hits", "Misses", "Hit rate", "Write-backs"],
+                       formatters={"hit_rate": "{:.1%}".format}))
+
+    served = analytics.served_by(traces)
+    if served:
+        df = pd.DataFrame(served, columns=analytics.ServedBy._fields).set_index("level")
+        print("\nMemory accesses served by:")
+        print(df.to_string(header=["Accesses", "Of the total"], formatters={"share": "{:.1%}".format}))
+
+
+def print_branch_stats(traces):
+    from tomasulo_simulator.branch_predictor import branch_statistics
+    stats = branch_statistics(traces)
+    if not stats:
+        return
+    df = pd.DataFrame(stats, columns=stats[0]._fields).set_index("pc")
+    print("\nBranch prediction:")
+    print(df.to_string(header=["Instruction", "Executions", "Mispredictions", "Accuracy", "Penalty"],
+                       formatters={"accuracy": "{:.1%}".format}))
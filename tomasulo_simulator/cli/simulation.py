@@ -0,0 +1,322 @@
+"""Command line of the simulator (the tomasulo-simulator command, or python -m tomasulo_simulator).
+
+Only what a run needs is imported: pandas and NumPy when the statistics are printed (see report.py),
+IPython when a shell is spawned, pyfiglet for the logo. benchmarks/cli_startup.py checks the start-up time."""
+import argparse
+
+from simpy.core import EmptySchedule
+
+from tomasulo_simulator import CpuConfig
+from tomasulo_simulator import ENGINES
+from tomasulo_simulator import log_utils
+from tomasulo_simulator.checkpoint import save_checkpoint, load_checkpoint
+from tomasulo_simulator.cycle import CycleEnvironment
+from tomasulo_simulator.functional import FunctionalCPU
+from tomasulo_simulator.sampling import sampled_simulation, DEFAULT_WINDOW, DEFAULT_WARMUP, DEFAULT_CONFIDENCE
+from tomasulo_simulator.program_cache import load_program, default_cache_dir
+from tomasulo_simulator.trace_sink import open_trace_sink, DEFAULT_BUFFER_SIZE
+
+
+def main(argv=None):
+    run(parse_args(argv))
+
+
+def run(args):
+    print_figlet(args)
+
+    if args.restore:
+        log_config = configure_logging(args)
+        trace_sink = open_trace_sink(args.output, args.trace_buffer) if args.output else None
+        env, cpu = load_checkpoint(args.restore, trace_sink=trace_sink)
+        print("Restored the checkpoint at cycle {}".format(env.now))
+    else:
+        with open(args.program) as f:
+            program = f.read()
+
+        directives, instructions = load_program(program, None if args.no_cache else args.cache_dir)
+        config = CpuConfig(directives)
+
+        if args.dump_assembled_instructions:
+            print("Assembled instructions:")
+            print(dump_instructions(instructions))
+
+        log_config = configure_logging(args)
+
+        if args.sample:
+            run_sampled_simulation(args, instructions, config)
+            log_config.close()
+            return
+        if args.cores is not None:
+            run_multicore(args, instructions, config)
+            log_config.close()
+            return
+
+        environment_class, cpu_class = ENGINES[args.engine]
+        env = environment_class()
+        # cpu = CPU(env, code, breakpoint_handler=spawn_ipython_handler)
+        # cpu = CPU(env, code, breakpoint_handler=lambda cpu: print(cpu))
+        trace_sink = open_trace_sink(args.output, args.trace_buffer) if args.output else None
+        breakpoint_handler = stop_fetching_handler if args.switch_back else None
+        cpu = cpu_class(env, instructions, config, breakpoint_handler=breakpoint_handler, trace_sink=trace_sink)
+        if args.fast_forward is not None or args.fast_forward_to is not None or args.fast_forward_break:
+            fast_forward(args, cpu, instructions, config)
+        env.process(cpu.run())
+
+    if args.checkpoint:
+        env.run(until=args.checkpoint_at)
+        save_checkpoint(cpu, args.checkpoint)
+        print("Checkpoint at cycle {} written to {}".format(env.now, args.checkpoint))
+
+    profiler = None
+    if args.profile or args.profile_output:
+        from tomasulo_simulator.profiler import Profiler
+        profiler = Profiler(env)
+        profiler.attach(cpu)
+        profiler.start()
+
+    run_simulation(args, env, cpu)
+    if args.switch_back:
+        # The region of interest ends at a BREAK: if the program halted first, nothing is left to execute
+        if cpu.fetch_stopped:
+            functional = FunctionalCPU.from_cpu(cpu)
+            reason = functional.run(until_breakpoint=False)
+            print("Executed the remaining {} instructions functionally ({})"
+                  .format(functional.executed_instructions, reason))
+            print(functional)
+        else:
+            print("The program ended before a BREAK: nothing left to execute functionally")
+    log_config.close()
+
+    if profiler is not None:
+        profiler.stop()
+        print("\nProfile:")
+        profiler.report()
+        if args.profile_output:
+            profiler.write_collapsed(args.profile_output)
+            print("Collapsed stacks written to {}".format(args.profile_output))
+    collect_statistics(args, cpu)
+
+
+def configure_logging(args):
+    level = log_utils.INFO
+    components = {}
+    try:
+        for option in args.log_level or []:
+            if "=" in option:
+                component, component_level = option.split("=", 1)
+                components[component] = log_utils.parse_level(component_level)
+            else:
+                level = log_utils.parse_level(option)
+    except ValueError as e:
+        argparser.error(str(e))
+
+    # Opened once the levels are known to be valid, so an invalid one doesn't leave the file behind
+    sinks = [log_utils.StdoutSink()]
+    if args.log_file:
+        try:
+            sinks.append(log_utils.JsonlSink(args.log_file))
+        except OSError as e:
+            argparser.error("Can't write the log to {}: {}".format(args.log_file, e.strerror))
+
+    return log_utils.configure(level, components, sinks)
+
+
+def print_figlet(args):
+    if not args.quiet:
+        from pyfiglet import Figlet
+        f = Figlet(font="nancyj-improved")
+        print(f.renderText("Tomasulo simulator"))
+
+
+def fast_forward(args, cpu, instructions, config):
+    functional = FunctionalCPU(instructions, config)
+    reason = functional.run(until_pc=args.fast_forward_to, max_instructions=args.fast_forward,
+                            until_breakpoint=args.fast_forward_break)
+    functional.hand_off(cpu)
+    print("Fast-forwarded {} instructions ({}), the detailed simulation starts at PC {}"
+          .format(functional.executed_instructions, reason, functional.pc))
+
+
+def run_sampled_simulation(args, instructions, config):
+    try:
+        result = sampled_simulation(instructions, config, args.sample, args.sample_window, args.sample_warmup,
+                                    args.engine, args.confidence)
+    except ValueError as e:
+        argparser.error(str(e))
+
+    print("Sampled simulation: a window of {} instructions, after {} of warmup, every {}"
+          .format(args.sample_window, args.sample_warmup, args.sample))
+    print("Instructions: {} ({} simulated in detail, {} samples)"
+          .format(result.instructions, result.detailed_instructions, result.samples))
+    if result.cpi is None:
+        print("The program is too short to take a sample, use a shorter period")
+    elif result.cpi_low is None:
+        print("CPI: {:.3f}, IPC: {:.3f} (a single sample, no confidence interval)".format(result.cpi, result.ipc))
+    else:
+        print("CPI: {:.3f} ± {:.2%} ({:.3f} - {:.3f} with {:.0%} confidence)"
+              .format(result.cpi, result.error, result.cpi_low, result.cpi_high, result.confidence))
+        print("IPC: {:.3f} ({:.3f} - {:.3f})".format(result.ipc, result.ipc_low, result.ipc_high))
+    if result.cycles is not None:
+        print("Estimated cycles: {}".format(result.cycles))
+    if result.speedup is not None:
+        print("Wall-clock time: {:.2f} s, about {:.1f}x faster than a detailed simulation"
+              .format(result.wall_time, result.speedup))
+
+
+def run_multicore(args, instructions, config):
+    from tomasulo_simulator.multicore import MultiCoreSystem
+    env = CycleEnvironment()
+    try:
+        system = MultiCoreSystem(env, [instructions] * args.cores, config, args.start_pc)
+    except ValueError as e:
+        argparser.error(str(e))
+    system.run()
+    env.run()
+    print(system)
+    if not args.no_stats:
+        from tomasulo_simulator.cli import report
+        report.print_multicore_stats(system)
+
+
+def stop_fetching_handler(cpu):
+    cpu._log("Breakpoint hit, switching back to functional simulation")
+    cpu.stop_fetching()
+
+
+def run_simulation(args, env, cpu):
+    if args.step_by_step:
+        while True:
+            try:
+                env.step()
+            except EmptySchedule:
+                break
+            finally:
+                print(cpu)
+
+            if args.interactive:
+                try:
+                    spawn_ipython_handler(cpu)
+                except Exception as e:
+                    print(e)
+    else:
+        env.run()
+        print(cpu)
+
+
+def collect_statistics(args, cpu):
+    traces = cpu.executed_instructions
+    if args.output:
+        traces.close()
+        if not args.no_stats:
+            from tomasulo_simulator.cli import report
+            # Read back from the file, the traces weren't kept in memory
+            report.print_trace_file_stats(args.output)
+        print("\nExecution trace of {} instructions written to {}".format(len(traces), args.output))
+    elif not args.no_stats:
+        from tomasulo_simulator.cli import report
+        report.print_trace_stats(cpu, args.ipc_window)
+
+
+def spawn_ipython_handler(cpu):
+    import IPython
+    header = "The cpu variable contains a reference to the CPU instance.\nUse 'quit' to exit."
+    IPython.embed(header=header)
+
+
+def dump_instructions(instructions):
+    return "\n".join([str(i) for i in instructions]) + "\n"
+
+
+argparser = argparse.ArgumentParser(description="Tomasulo algorithm simulator")
+argparser.add_argument("program", nargs="?", help="the assembly file to execute")
+argparser.add_argument("--output", "-o", help="Stream the execution trace to this file "
+                                               "(.bin: compact binary format, otherwise JSON lines)")
+argparser.add_argument("--trace-buffer", type=int, default=DEFAULT_BUFFER_SIZE,
+                       help="Instructions buffered before writing them to the --output file "
+                            "(default: {})".format(DEFAULT_BUFFER_SIZE))
+argparser.add_argument("--no-stats", "-n", help="Don't output statistics on STDOUT", action="store_true")
+argparser.add_argument("--ipc-window", type=int, metavar="CYCLES",
+                       help="Also print the IPC in windows of this many cycles")
+argparser.add_argument("--interactive", "-i", help="Spawn IPython shell during the simulation", action="store_true")
+argparser.add_argument("--step-by-step", "-s", help="Execute the simulation step by step", action="store_true")
+argparser.add_argument("--dump-assembled-instructions", "-d", help="Print the assembled instructions", action="store_true")
+argparser.add_argument("--quiet", "-q", help="Don't print the program logo", action="store_true")
+argparser.add_argument("--engine", "-e", help="Simulation engine (default: simpy, cycle with --restore). The cycle "
+                                              "engine gives the same timings and RS/FU assignments and is much faster",
+                       choices=ENGINES.keys())
+argparser.add_argument("--log-level", "-l", metavar="[COMPONENT=]LEVEL", action="append",
+                       help="Log level ({}, default: info), for all the components or only for one "
+                            "(e.g. CDB=debug, AluRS=off). Can be repeated".format(", ".join(log_utils.LEVELS)))
+argparser.add_argument("--log-file", help="Also write the log to a file, as JSON lines")
+argparser.add_argument("--cache-dir", default=default_cache_dir(),
+                       help="Where parsed and assembled programs are cached (default: %(default)s)")
+argparser.add_argument("--no-cache", action="store_true", help="Always parse and assemble the program")
+argparser.add_argument("--profile", "-p", action="store_true",
+                       help="Print where the wall-clock time of the simulation goes, per component and phase")
+argparser.add_argument("--profile-output", metavar="PATH",
+                       help="Write the profile as collapsed stacks, for flamegraph.pl (implies --profile)")
+argparser.add_argument("--checkpoint", metavar="PATH",
+                       help="Save the state of the simulation at cycle --checkpoint-at to this file, then continue "
+                            "(cycle engine only)")
+argparser.add_argument("--checkpoint-at", metavar="CYCLE", type=int, default=0,
+                       help="Cycle of the checkpoint (default: 0)")
+argparser.add_argument("--restore", metavar="PATH",
+                       help="Continue the simulation saved to this checkpoint, instead of running a program "
+                            "(cycle engine only). Checkpoints are unpickled: only restore trusted ones")
+argparser.add_argument("--fast-forward", "-f", metavar="N", type=int,
+                       help="Execute the first N instructions functionally, without timing, "
+                            "then simulate the rest in detail")
+argparser.add_argument("--fast-forward-to", metavar="PC", type=int,
+                       help="Execute the instructions functionally until the PC is reached")
+argparser.add_argument("--fast-forward-break", action="store_true",
+                       help="Execute the instructions functionally until the first BREAK")
+argparser.add_argument("--sample", metavar="PERIOD", type=int,
+                       help="Sampled simulation: execute the program functionally and simulate in detail a window "
+                            "of instructions every PERIOD, to estimate the CPI")
+argparser.add_argument("--sample-window", metavar="N", type=int, default=DEFAULT_WINDOW,
+                       help="Instructions measured by each sample (default: %(default)s)")
+argparser.add_argument("--sample-warmup", metavar="N", type=int, default=DEFAULT_WARMUP,
+                       help="Instructions simulated in detail before each window, to warm up the CPU "
+                            "(default: %(default)s)")
+argparser.add_argument("--confidence", type=float, default=DEFAULT_CONFIDENCE,
+                       help="Confidence level of the CPI interval (default: %(default)s)")
+argparser.add_argument("--switch-back", action="store_true",
+                       help="Stop the detailed simulation at the next BREAK and execute the rest of the program "
+                            "functionally")
+argparser.add_argument("--cores", metavar="N", type=int,
+                       help="Run the program on N cores sharing the memory through a coherent bus "
+                            "(cycle engine only)")
+argparser.add_argument("--start-pc", metavar="PC", type=int, action="append",
+                       help="PC the next core starts from (default: 0). Can be repeated, once per core")
+
+
+def parse_args(argv=None):
+    """Parses the command line (sys.argv if argv isn't given), exiting with an error if it's invalid"""
+    args = argparser.parse_args(argv)
+    if args.program is None and args.restore is None:
+        argparser.error("the program is required, unless the simulation is restored from a checkpoint")
+    if args.restore and args.engine not in (None, "cycle"):
+        argparser.error("--restore requires the cycle engine")
+    if args.engine is None:
+        args.engine = "cycle" if args.restore else "simpy"
+    if args.checkpoint and args.engine != "cycle":
+        argparser.error("--checkpoint requires the cycle engine")
+    if args.start_pc and args.cores is None:
+        args.cores = len(args.start_pc)
+    if args.cores is not None:
+        if args.start_pc and len(args.start_pc) != args.cores:
+            argparser.error("--start-pc must be given once per core")
+        for option in ("restore", "checkpoint", "output", "sample", "fast_forward", "fast_forward_to",
+                       "fast_forward_break", "switch_back", "step_by_step", "profile", "profile_output"):
+            if getattr(args, option):
+                argparser.error("--{} can't be used with multiple cores".format(option.replace("_", "-")))
+    if args.sample:
+        for option in ("restore", "checkpoint", "output", "fast_forward", "fast_forward_to", "fast_forward_break",
+                       "switch_back", "step_by_step", "interactive", "profile", "profile_output"):
+            if getattr(args, option):
+                argparser.error("--{} can't be used with --sample".format(option.replace("_", "-")))
+    return args
+
+
+if __name__ == "__main__":
+    main()
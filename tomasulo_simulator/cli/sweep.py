@@ -0,0 +1,96 @@
+"""Command line of the design-space sweeps (the tomasulo-sweep command, see tomasulo_simulator/sweep.py)"""
+import argparse
+import json
+import sys
+
+from tomasulo_simulator import ENGINES
+from tomasulo_simulator.program_cache import load_program, default_cache_dir
+from tomasulo_simulator.sampling import DEFAULT_WINDOW, DEFAULT_WARMUP
+from tomasulo_simulator.sweep import expand_grid, run_sweep, OUTPUT_FORMATS
+
+
+def main(argv=None):
+    run(argparser.parse_args(argv))
+
+
+def run(args):
+    with open(args.program) as f:
+        program = f.read()
+
+    directives, instructions = load_program(program, None if args.no_cache else args.cache_dir)
+
+    configs = []
+    if args.configs:
+        with open(args.configs) as f:
+            configs.extend(json.load(f))
+    if args.set or not configs:
+        configs.extend(expand_grid(parse_grid(args.set or [])))
+
+    sampling = None
+    if args.sample:
+        sampling = {"period": args.sample, "window": args.sample_window, "warmup": args.sample_warmup}
+
+    try:
+        run_sweep(instructions, directives, configs, engine=args.engine, workers=args.workers,
+                  output=args.output, resume=args.resume, max_cycles=args.max_cycles, progress=print_progress,
+                  sampling=sampling)
+    except ValueError as e:
+        argparser.error(str(e))
+    print(file=sys.stderr)
+
+
+def parse_grid(options):
+    """Converts options like alu_rs=1,2,4 to a grid {"alu_rs": [1, 2, 4]}"""
+    grid = {}
+    for option in options:
+        try:
+            name, values = option.split("=", 1)
+            grid[name] = [parse_value(value) for value in values.split(",")]
+        except ValueError:
+            argparser.error("Invalid --set {}, use DIRECTIVE=VALUE[,VALUE...]".format(option))
+    return grid
+
+
+def parse_value(value):
+    """Directive values are numbers, except for names like the branch predictor"""
+    try:
+        return int(value)
+    except ValueError:
+        if not value.isidentifier():
+            raise
+        return value
+
+
+def print_progress(completed, total):
+    print("\r{}/{} configurations simulated".format(completed, total), end="", file=sys.stderr, flush=True)
+
+
+argparser = argparse.ArgumentParser(description="Simulates a program with many CPU configurations in parallel")
+argparser.add_argument("program", help="the assembly file to execute")
+argparser.add_argument("--set", "-s", metavar="DIRECTIVE=VALUE[,VALUE...]", action="append",
+                       help="Values of a directive (e.g. alu_rs=1,2,4). Every combination of the values "
+                            "is simulated. Can be repeated")
+argparser.add_argument("--configs", "-c", help="JSON file with a list of directive overrides to simulate, "
+                                               "in addition to the --set grid")
+argparser.add_argument("--output", "-o", required=True,
+                       help="Results file ({})".format(", ".join(OUTPUT_FORMATS)))
+argparser.add_argument("--resume", "-r", action="store_true", help="Resume an interrupted sweep")
+argparser.add_argument("--workers", "-w", type=int, help="Number of worker processes (default: number of CPUs)")
+argparser.add_argument("--engine", "-e", help="Simulation engine (default: cycle)",
+                       choices=ENGINES.keys(), default="cycle")
+argparser.add_argument("--max-cycles", "-m", type=int,
+                       help="Stop each simulation after this many cycles, reporting an error")
+argparser.add_argument("--sample", metavar="PERIOD", type=int,
+                       help="Estimate the results with sampled simulations, simulating in detail a window of "
+                            "instructions every PERIOD (see tomasulo-simulator --sample)")
+argparser.add_argument("--sample-window", metavar="N", type=int, default=DEFAULT_WINDOW,
+                       help="Instructions measured by each sample (default: %(default)s)")
+argparser.add_argument("--sample-warmup", metavar="N", type=int, default=DEFAULT_WARMUP,
+                       help="Instructions simulated in detail before each window (default: %(default)s)")
+argparser.add_argument("--cache-dir", default=default_cache_dir(),
+                       help="Where parsed and assembled programs are cached (default: %(default)s)")
+argparser.add_argument("--no-cache", action="store_true", help="Always parse and assemble the program")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,50 +1,69 @@
-from copy import deepcopy
-
 import simpy
 
 from tomasulo_simulator import execution_trace as etrace
+from tomasulo_simulator import log_utils
+from tomasulo_simulator.cache import make_caches
 from tomasulo_simulator.cpu_config import CpuConfig
 from tomasulo_simulator.cdb import CDB
+from tomasulo_simulator.decoder import Opcode, MEM_RS, decode_program
 from tomasulo_simulator.functional_unit import AluFU, MemFU
-from tomasulo_simulator.instruction import (
-    HaltInstruction, BreakpointInstruction,
-    ControlFlowInstruction, MemInstruction,
-    AluInstruction, FloatingInstruction
-)
-from tomasulo_simulator.log_utils import get_logger
+from tomasulo_simulator.instruction.register import PC
+from tomasulo_simulator.log_utils import get_logger, WARNING
 from tomasulo_simulator.memory import Memory
 from tomasulo_simulator.registerfile import RegisterFile
 from tomasulo_simulator.reservation_station import ALUReservationStation, MemReservationStation
+from tomasulo_simulator.trace_store import ExecutionTraceStore
 
 
 class CPU:
-    def __init__(self, env: simpy.Environment, instructions, config: CpuConfig, breakpoint_handler=None):
+    def __init__(self, env: simpy.Environment, instructions, config: CpuConfig, breakpoint_handler=None,
+                 trace_sink=None, log_config=None):
+        if config.rob_size:
+            raise ValueError("The reorder buffer is only implemented by the cycle engine")
+        if config.instruction_queue_size:
+            raise ValueError("The instruction queue is only implemented by the cycle engine")
         self._instructions = instructions
         self.config = config
+        # Log levels and sinks of the components, those set by log_utils.configure() if not given
+        self.log_config = log_config if log_config is not None else log_utils.get_config()
 
-        self.memory = Memory(env, config)
-        self.reg_file = RegisterFile(env, self, config.gp_registers, config.fp_registers)
+        self.memory = Memory(env, config, log_config=self.log_config)
+        # Gives the latency of the memory accesses, if the CPU has caches (see cache.py)
+        self.caches = make_caches(config)
+        self.reg_file = RegisterFile(env, self, config.gp_registers, config.fp_registers, log_config=self.log_config)
 
         # Common data bus
-        self.CDB = CDB(env, config.cdb_width)
+        self.CDB = CDB(env, config.cdb_width, log_config=self.log_config)
 
+        # Reservation stations and functional units are numbered from 1 in each CPU, FP after integer ones
         # TODO: distinguish ALU from FPALU
         self.alu_FU = simpy.Store(env)
-        [self.alu_FU.put(AluFU()) for _ in range(config.alu_fu)]
+        [self.alu_FU.put(AluFU(i + 1)) for i in range(config.alu_fu)]
         self.fpalu_FU = simpy.Store(env)
-        [self.fpalu_FU.put(AluFU()) for _ in range(config.fpalu_fu)]
+        [self.fpalu_FU.put(AluFU(config.alu_fu + i + 1)) for i in range(config.fpalu_fu)]
         self.mem_FU = simpy.Store(env)
-        [self.mem_FU.put(MemFU()) for _ in range(config.mem_fu)]
+        [self.mem_FU.put(MemFU(i + 1)) for i in range(config.mem_fu)]
 
         self.alu_RS = simpy.Store(env)
-        [self.alu_RS.put(ALUReservationStation(env, self, self.alu_FU, self.alu_RS)) for _ in range(config.alu_rs)]
+        [self.alu_RS.put(ALUReservationStation(env, self, i + 1, self.alu_FU, self.alu_RS))
+         for i in range(config.alu_rs)]
         self.fpalu_RS = simpy.Store(env)
-        [self.fpalu_RS.put(ALUReservationStation(env, self, self.fpalu_FU, self.fpalu_RS)) for _ in range(config.fpalu_rs)]
+        [self.fpalu_RS.put(ALUReservationStation(env, self, config.alu_rs + i + 1, self.fpalu_FU, self.fpalu_RS))
+         for i in range(config.fpalu_rs)]
         self.mem_RS = simpy.Store(env)
-        [self.mem_RS.put(MemReservationStation(env, self, self.mem_FU, self.mem_RS)) for _ in range(config.mem_rs)]
-
-        # This list will hold the executed instructions
-        self.executed_instructions = []
+        [self.mem_RS.put(MemReservationStation(env, self, i + 1, self.mem_FU, self.mem_RS))
+         for i in range(config.mem_rs)]
+
+        # Execution traces of the retired instructions, kept in memory unless a trace sink (see trace_sink.py)
+        # is given to stream them to a file
+        self.executed_instructions = trace_sink if trace_sink is not None else ExecutionTraceStore(instructions)
+        # Number of instructions fetched so far, used as sequence number of the dynamic instructions
+        self.fetched_instructions = 0
+        # DecodedInstruction of each instruction (see decoder.py), and its reservation stations by rs_class
+        self._decoded = decode_program(instructions, config)
+        self._rs_stores = (self.alu_RS, self.fpalu_RS, self.mem_RS)
+        # Whether the registers of the instruction at each address have been checked
+        self._checked = [False] * len(instructions)
 
         self.env = env
 
@@ -53,62 +72,84 @@ class CPU:
         else:
             self.breakpoint_handler = breakpoint_handler
 
-        self._log = get_logger(env, "CPU")
+        self._log = get_logger(env, "CPU", config=self.log_config)
+        self._warn = get_logger(env, "CPU", WARNING, config=self.log_config)
+        self._fetch_stopped = False
+
+    def load_state(self, registers, memory):
+        """Starts from the given register values and memory contents (e.g. after a functional fast-forward)"""
+        self.reg_file.values[:] = registers
+        self.memory._memory[:] = memory
+
+    def stop_fetching(self):
+        """Stops fetching new instructions: the ones in flight are completed and the simulation ends.
+        Meant to be called by a breakpoint handler, to end a region of interest"""
+        self._fetch_stopped = True
+
+    @property
+    def fetch_stopped(self):
+        """True if stop_fetching() ended the simulation, rather than a HLT or the end of the program"""
+        return self._fetch_stopped
 
     def _dispatch(self):
+        registers = self.reg_file.values
         while True:
-            self._log("Fetching instruction at PC {}", self.reg_file["PC"])
+            self._log("Fetching instruction at PC {}", registers[PC])
             yield self.env.timeout(self.config.fetch_latency)
 
-            # TODO: find a better way to log execution traces without deepcopying the instruction object
-            # Right now the object is copied so stats can be saved directly into it, and it works even for
-            # tight loops where the same instruction may be executing many times simultaneously
+            # The static instruction is shared, everything about this execution goes in its trace.
+            # This works even for tight loops where the same instruction may be executing many times simultaneously
+            pc = registers[PC]
             try:
-                next_instruction = deepcopy(self._instructions[self.reg_file["PC"]])
+                next_instruction = self._instructions[pc]
             except IndexError:
-                self._log("WARNING: PC {} is out of range", self.reg_file["PC"])
-                self._log("Use HLT instructions")
+                self._warn("WARNING: PC {} is out of range", pc)
+                self._warn("Use HLT instructions")
                 return
 
             self._log("Fetched {}", next_instruction)
-            self.reg_file["PC"] += 1
+            registers[PC] = pc + 1
 
-            if isinstance(next_instruction, HaltInstruction):
+            # Registers are accessed by slot from now on: check once that this CPU has them
+            if not self._checked[pc]:
+                self.reg_file.check_registers(next_instruction)
+                self._checked[pc] = True
+
+            decoded = self._decoded[pc]
+            if decoded.opcode is Opcode.HALT:
                 return
 
-            if isinstance(next_instruction, BreakpointInstruction):
+            if decoded.opcode is Opcode.BREAKPOINT:
                 if next_instruction.handler is not None:
                     next_instruction.handler(self)
                 self.breakpoint_handler(self)
+                if self._fetch_stopped:
+                    return
                 continue
 
+            trace = etrace.ExecutionTrace(next_instruction, self.fetched_instructions, pc)
+            self.fetched_instructions += 1
+
             # Get an appropriate reservation station
-            rs = yield self.env.process(self.get_reservation_station(next_instruction))
+            rs = yield self.env.process(self.get_reservation_station(trace, decoded))
 
             # Loads and stores also need a spot in the memory access queue
-            if isinstance(rs, MemReservationStation):
-                yield self.env.process(self.memory.enqueue_memory_access(rs, next_instruction))
+            if decoded.rs_class == MEM_RS:
+                yield self.env.process(self.memory.enqueue_memory_access(rs, trace))
 
             # Issue the instruction to the reservation station
             self._log("Issuing {} to {}", next_instruction, rs)
-            self.env.process(rs.issue(next_instruction))
+            self.env.process(rs.issue(trace, decoded))
 
             # TODO: log fetch stall (as conflict)
             # TODO: implement speculative execution
-            if isinstance(next_instruction, ControlFlowInstruction):
+            if decoded.is_control_flow:
                 self._log("Stalling fetches until the new PC is available")
-                self.reg_file.values["PC"] = yield self.CDB.snoop(rs)
-
-    def get_reservation_station(self, instruction):
-        if isinstance(instruction, AluInstruction):
-            if isinstance(instruction, FloatingInstruction):
-                rs_store = self.fpalu_RS
-            else:
-                rs_store = self.alu_RS
-        elif isinstance(instruction, MemInstruction):
-            rs_store = self.mem_RS
-        else:
-            raise Exception("Unrecognized instruction: {}".format(instruction))
+                registers[PC] = yield self.CDB.snoop(rs)
+
+    def get_reservation_station(self, trace, decoded):
+        instruction = trace.instruction
+        rs_store = self._rs_stores[decoded.rs_class]
 
         # FIXME
         # this code sucks a bit, but it's necessary to detect
@@ -136,7 +177,7 @@ class CPU:
 
         if hazard:
             self._log("Structural hazard solved: obtained {} for {}", obtained_rs, instruction)
-            instruction.stats.hazards.append(etrace.RSUnavailableHazard(store_req_start, self.env.now, obtained_rs))
+            trace.hazards.append(etrace.RSUnavailableHazard(store_req_start, self.env.now, obtained_rs))
 
         return obtained_rs
 
@@ -152,7 +193,7 @@ class CPU:
 
     @staticmethod
     def _default_breakpoint_handler(cpu):
-        cpu._log("Breakpoint hit, registers: {}", cpu.reg_file)
+        cpu._log("Breakpoint hit, registers: {}", str(cpu.reg_file))
 
     def __repr__(self):
         return "CLK {:>3n} | CPU Registers: {}".format(self.env.now, self.reg_file)
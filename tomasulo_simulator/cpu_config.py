@@ -18,6 +18,41 @@ DEFAULT_MEM_SIZE = 0x50
 
 DEFAULT_FETCH_LATENCY = 1
 
+# 0: no instruction queue, each instruction is fetched once the previous one is issued
+DEFAULT_INSTRUCTION_QUEUE_SIZE = 0
+# Used only with an instruction queue: instructions fetched and issued per cycle
+DEFAULT_FETCH_WIDTH = 1
+DEFAULT_ISSUE_WIDTH = 1
+
+# 0: no reorder buffer, fetches stall on every branch and jump until its target is known
+DEFAULT_ROB_SIZE = 0
+
+# Used only with a reorder buffer, see branch_predictor.py
+DEFAULT_BRANCH_PREDICTOR = "not_taken"
+DEFAULT_PREDICTOR_SIZE = 16
+DEFAULT_HISTORY_BITS = 4
+# 0: the targets of the jumps are known when they are fetched
+DEFAULT_BTB_SIZE = 0
+
+# Used only by multi-core systems, see cycle/bus.py
+DEFAULT_BUS_LATENCY = 4
+DEFAULT_BUS_ARBITRATION_LATENCY = 1
+# Words per cache line
+DEFAULT_LINE_SIZE = 4
+
+# Cache hierarchy, see cache.py. 0: no cache, memory accesses take memfu_execution_latency
+DEFAULT_L1_SIZE = 0
+DEFAULT_L1_ASSOCIATIVITY = 2
+DEFAULT_L1_LATENCY = 1
+# 0: no L2 cache
+DEFAULT_L2_SIZE = 0
+DEFAULT_L2_ASSOCIATIVITY = 4
+DEFAULT_L2_LATENCY = 6
+DEFAULT_MEMORY_LATENCY = 20
+DEFAULT_CACHE_REPLACEMENT = "lru"
+DEFAULT_CACHE_WRITE_POLICY = "write_back"
+DEFAULT_CACHE_WRITE_ALLOCATE = 1
+
 
 class CpuConfig:
     def __init__(self, directives={}):
@@ -40,6 +75,27 @@ class CpuConfig:
         self.mem_access_queue_size = DEFAULT_MEM_ACCESS_QUEUE_SIZE
         self.mem_size = DEFAULT_MEM_SIZE
         self.fetch_latency = DEFAULT_FETCH_LATENCY
+        self.instruction_queue_size = DEFAULT_INSTRUCTION_QUEUE_SIZE
+        self.fetch_width = DEFAULT_FETCH_WIDTH
+        self.issue_width = DEFAULT_ISSUE_WIDTH
+        self.rob_size = DEFAULT_ROB_SIZE
+        self.branch_predictor = DEFAULT_BRANCH_PREDICTOR
+        self.predictor_size = DEFAULT_PREDICTOR_SIZE
+        self.history_bits = DEFAULT_HISTORY_BITS
+        self.btb_size = DEFAULT_BTB_SIZE
+        self.bus_latency = DEFAULT_BUS_LATENCY
+        self.bus_arbitration_latency = DEFAULT_BUS_ARBITRATION_LATENCY
+        self.line_size = DEFAULT_LINE_SIZE
+        self.l1_size = DEFAULT_L1_SIZE
+        self.l1_associativity = DEFAULT_L1_ASSOCIATIVITY
+        self.l1_latency = DEFAULT_L1_LATENCY
+        self.l2_size = DEFAULT_L2_SIZE
+        self.l2_associativity = DEFAULT_L2_ASSOCIATIVITY
+        self.l2_latency = DEFAULT_L2_LATENCY
+        self.memory_latency = DEFAULT_MEMORY_LATENCY
+        self.cache_replacement = DEFAULT_CACHE_REPLACEMENT
+        self.cache_write_policy = DEFAULT_CACHE_WRITE_POLICY
+        self.cache_write_allocate = DEFAULT_CACHE_WRITE_ALLOCATE
 
         self.apply_config(directives)
 
@@ -52,8 +108,11 @@ class CpuConfig:
     def __getattr__(self, item):
         if item.endswith("_execution_latency"):
             return self.__dict__.get(item, None)
-        else:
+        try:
             return self.__dict__[item]
+        except KeyError:
+            # AttributeError is what pickle and copy expect
+            raise AttributeError(item)
 
     def __getitem__(self, item):
         return self.__getattr__(item)
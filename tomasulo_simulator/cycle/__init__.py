@@ -0,0 +1,2 @@
+from .environment import CycleEnvironment
+from .cpu import CycleCPU
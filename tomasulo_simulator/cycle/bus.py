@@ -0,0 +1,151 @@
+"""Shared bus of a multi-core system, keeping the private caches of the cores coherent with the MSI protocol.
+
+The cores share one memory (the same list), so the values they load and store are always coherent: the
+protocol models the traffic, and so the timing, of the accesses. Every core keeps the MSI state of the lines
+(line_size consecutive words) it accessed, in a cache of unbounded capacity; the lines it doesn't have are Invalid.
+ - a load hits if the line is Shared or Modified, a store if it's Modified: the access takes its usual latency
+ - otherwise the access requests a bus transaction when it starts executing: BusRd for loads (the line becomes
+   Shared, a Modified copy in another core is flushed and becomes Shared), BusRdX for stores to an Invalid
+   line and BusUpgr for stores to a Shared one (the line becomes Modified, the other copies are invalidated,
+   a Modified one after being flushed)
+ - requests are arbitrated bus_arbitration_latency cycles after they are made, one core after the other
+   (round robin), and the transaction holds the bus for bus_latency cycles. Then the access takes its usual latency
+
+The usual latency is the one given by the cache hierarchy of the core if it has one (see cache.py): its capacity
+is modeled there, independently of the coherence states kept here.
+
+Cycles spent waiting for the bus held by other transactions are recorded as a BusContentionHazard.
+The bus is arbitrated at the beginning of every cycle by the first core to run it (see CycleCPU.resume)."""
+from collections import deque
+
+from tomasulo_simulator import execution_trace as etrace
+from tomasulo_simulator.cpu_config import CpuConfig
+from tomasulo_simulator.decoder import Opcode
+
+# States of the lines in the caches of the cores (absent lines are Invalid)
+MODIFIED = "M"
+SHARED = "S"
+
+# Bus transactions
+BUS_READ = "BusRd"
+BUS_READ_EXCLUSIVE = "BusRdX"
+BUS_UPGRADE = "BusUpgr"
+TRANSACTIONS = (BUS_READ, BUS_READ_EXCLUSIVE, BUS_UPGRADE)
+
+
+class Bus:
+    def __init__(self, config: CpuConfig):
+        for directive in ("bus_latency", "bus_arbitration_latency", "line_size"):
+            if config[directive] < 1:
+                raise ValueError("{} must be at least 1".format(directive))
+        self.id = "BUS"
+        self.latency = config.bus_latency
+        self.arbitration_latency = config.bus_arbitration_latency
+        self.line_size = config.line_size
+        # The memory shared by all the cores
+        self.memory = [0] * config.mem_size
+
+        # For each core: line -> MSI state, requests (station, line, is store, latency, cycle) in the order they
+        # were made
+        self.lines = []
+        self._requests = []
+        self._next_core = 0
+        self._arbitrated_at = None
+        self.free_at = 0
+
+        self.busy_cycles = 0
+        self.transactions = dict.fromkeys(TRANSACTIONS, 0)
+        self.invalidations = 0
+        self.flushes = 0
+        # Accesses of each core which hit or needed a transaction
+        self.hits = []
+        self.misses = []
+
+    def attach(self):
+        """Adds a core, and returns its index"""
+        self.lines.append({})
+        self._requests.append(deque())
+        self.hits.append(0)
+        self.misses.append(0)
+        return len(self.lines) - 1
+
+    def access(self, core, station, now, latency):
+        """Returns True if the access of the station hits in the cache of the core. Otherwise requests
+        a transaction: the done_at of the station is set when it's granted, latency cycles after its end"""
+        line = station.address // self.line_size
+        state = self.lines[core].get(line)
+        store = station.decoded.opcode is Opcode.STORE
+        if state is MODIFIED or (state is SHARED and not store):
+            self.hits[core] += 1
+            return True
+        self.misses[core] += 1
+        self._requests[core].append((station, line, store, latency, now))
+        return False
+
+    def cancel(self, core, station):
+        """Forgets the request of a squashed access, if it's still waiting"""
+        requests = self._requests[core]
+        for request in requests:
+            if request[0] is station:
+                requests.remove(request)
+                return
+
+    def arbitrate(self, now):
+        """Grants the bus, if it's free, to the oldest request of the next core (round robin) which has one.
+        Does nothing if it has already been called in this cycle"""
+        if self._arbitrated_at == now:
+            return
+        self._arbitrated_at = now
+        cores = len(self._requests)
+        offset = 0
+        while self.free_at <= now and offset < cores:
+            core = (self._next_core + offset) % cores
+            requests = self._requests[core]
+            offset += 1
+            if requests and requests[0][4] + self.arbitration_latency <= now:
+                self._grant(core, requests.popleft(), now)
+                self._next_core = (core + 1) % cores
+                offset = 0
+
+    def _grant(self, core, request, now):
+        station, line, store, latency, requested_at = request
+        eligible_at = requested_at + self.arbitration_latency
+        if now > eligible_at:
+            station.trace.hazards.append(etrace.BusContentionHazard(eligible_at, now))
+
+        states = self.lines[core]
+        state = states.get(line)
+        if state is MODIFIED or (state is SHARED and not store):
+            # Another access of the core brought the line in the meantime: no transaction needed
+            station.done_at = now + latency
+            return
+        if not store:
+            transaction = BUS_READ
+        elif state is SHARED:
+            transaction = BUS_UPGRADE
+        else:
+            transaction = BUS_READ_EXCLUSIVE
+
+        for other, other_states in enumerate(self.lines):
+            other_state = other_states.get(line) if other != core else None
+            if other_state is None:
+                continue
+            if other_state is MODIFIED:
+                self.flushes += 1
+            if store:
+                del other_states[line]
+                self.invalidations += 1
+            else:
+                other_states[line] = SHARED
+        states[line] = MODIFIED if store else SHARED
+
+        self.transactions[transaction] += 1
+        self.free_at = now + self.latency
+        self.busy_cycles += self.latency
+        station.done_at = now + self.latency + latency
+
+    def __str__(self):
+        return self.id
+
+    def __repr__(self):
+        return self.__str__()
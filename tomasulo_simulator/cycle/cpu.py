@@ -0,0 +1,899 @@
+from collections import deque
+
+from tomasulo_simulator import execution_trace as etrace
+from tomasulo_simulator import log_utils
+from tomasulo_simulator.branch_predictor import make_predictor, make_btb
+from tomasulo_simulator.cache import make_caches
+from tomasulo_simulator.cpu_config import CpuConfig
+from tomasulo_simulator.cycle.environment import CycleEnvironment
+from tomasulo_simulator.cycle.memory import CycleMemory
+from tomasulo_simulator.cycle.rob import ReorderBuffer, RobEntry
+from tomasulo_simulator.cycle.station import Station, Pool
+from tomasulo_simulator.decoder import Opcode, decode_program
+from tomasulo_simulator.functional_unit import FunctionalUnit
+from tomasulo_simulator.instruction import BranchInstruction
+from tomasulo_simulator.instruction.register import PC, Register
+from tomasulo_simulator.log_utils import get_logger, WARNING
+from tomasulo_simulator.registerfile import RegisterFile
+from tomasulo_simulator.trace_store import ExecutionTraceStore
+
+# Front end states
+FETCHING = "fetching"
+ISSUING = "issuing the fetched instruction"
+WAITING_PC = "waiting for the new PC"
+STOPPED = "stopped"
+
+# Issue stage states, while an instruction waits for the resources it needs
+WAITING_ROB = "waiting for a slot in the reorder buffer"
+WAITING_RS = "waiting for a reservation station"
+WAITING_QUEUE = "waiting for a slot in the memory access queue"
+
+# Depth, in SimPy events, at which a dependency of a reservation station is satisfied within a cycle.
+# The SimPy engine orders simultaneous starts and CDB requests by this depth, and so does this engine.
+OPERAND_READ_LEVEL = 1
+CDB_SNOOP_LEVEL = 3
+FU_FROM_STORE_LEVEL = 4
+FU_FROM_CDB_WRITER_LEVEL = 5
+MEM_CONFLICT_SOLVED_LEVEL = 4
+# The dispatcher issues several instructions per cycle when fetching takes no time, each one deeper than the
+# previous: it fetches FETCH_LEVEL after resuming (at level 0 when the fetch took cycles), and takes a reservation
+# station and a slot in the memory access queue RS_LEVEL and QUEUE_LEVEL later, or right after the one it waited
+# for was released. It resumes at PC_SNOOP_LEVEL when the new PC is broadcast, and jumps, which have no operands,
+# get their FU (if it's free) FU_AT_ISSUE_LEVEL after being issued
+FETCH_LEVEL = 1
+RS_LEVEL = 3
+QUEUE_LEVEL = 3
+QUEUE_FREED_LEVEL = 4
+PC_SNOOP_LEVEL = 2
+FU_AT_ISSUE_LEVEL = 3
+
+# Operations performed by the reservation stations
+ALU = Opcode.ALU
+BRANCH = Opcode.BRANCH
+JUMP = Opcode.JUMP
+LOAD = Opcode.LOAD
+STORE = Opcode.STORE
+HALT = Opcode.HALT
+BREAKPOINT = Opcode.BREAKPOINT
+
+
+class CycleCPU:
+    """Cycle-stepped engine with the same interface and timings as the SimPy CPU.
+
+    Every clock cycle is processed in a fixed order:
+     1. results written on the CDB in the previous cycle are broadcast, their RS and FU released
+     2. stores complete their writeback
+     3. instructions complete execution and request the CDB
+     4. the CDB is granted to the pending requests, in the order they were made
+     5. reservation stations with all their dependencies ready start executing
+     6. the dispatcher fetches and issues instructions
+
+    Since resources released in a cycle are available to the requests made later in the same cycle,
+    the zero-cycles hazards sometimes reported by the SimPy engine are never reported here.
+
+    With a reorder buffer (rob_size > 0) the CPU also speculates past branches instead of stalling:
+    the branch predictor (see branch_predictor.py) is consulted when they are issued. Instructions commit in order at
+    the beginning of the cycle after they write their result (step 0), stores write the memory only then.
+    A mispredicted branch squashes the younger instructions when its result is broadcast and fetching
+    restarts from the right PC. Without it the timings are the same as the SimPy engine's.
+
+    With an instruction queue (instruction_queue_size > 0) the front end is decoupled from issue: every
+    max(fetch_latency, 1) cycles up to fetch_width instructions are fetched into the queue, until a taken
+    control flow instruction (predicted taken with a reorder buffer, any without it), and up to issue_width
+    instructions are issued from it per cycle, in order. Without a reorder buffer fetching stops after a
+    control flow instruction until its target is known; with it, the predictor is consulted at fetch.
+
+    A core of a multi-core system (see multicore.py) shares its memory with the others through a bus:
+    memory accesses which miss in its cache wait for a bus transaction before their execution latency (step 5).
+    With caches (see cache.py) the latency of each memory access is given by the cache hierarchy."""
+    def __init__(self, env: CycleEnvironment, instructions, config: CpuConfig, breakpoint_handler=None,
+                 trace_sink=None, bus=None, log_config=None):
+        self._instructions = instructions
+        self.config = config
+        self.env = env
+
+        self.memory = CycleMemory(config)
+        # Gives the latency of the memory accesses, if the CPU has caches (see cache.py)
+        self.caches = make_caches(config)
+        # In a multi-core system (see multicore.py) the memory is shared with the other cores through the bus
+        self.bus = bus
+        self.core_id = None
+        if bus is not None:
+            self.core_id = bus.attach()
+            self.memory._memory = bus.memory
+        self.reg_file = RegisterFile(env, self, config.gp_registers, config.fp_registers)
+
+        # Functional units and reservation stations are named like in the SimPy engine
+        alu_fus = ["ALU" + str(i + 1) for i in range(config.alu_fu + config.fpalu_fu)]
+        self.alu_FU = Pool(FunctionalUnit(fu_id) for fu_id in alu_fus[:config.alu_fu])
+        self.fpalu_FU = Pool(FunctionalUnit(fu_id) for fu_id in alu_fus[config.alu_fu:])
+        self.mem_FU = Pool(FunctionalUnit("MEM" + str(i + 1)) for i in range(config.mem_fu))
+
+        alu_rs = ["AluRS" + str(i + 1) for i in range(config.alu_rs + config.fpalu_rs)]
+        self.alu_RS = Pool()
+        self.alu_RS.free.extend(Station(rs_id, "AluRS", self.alu_FU, self.alu_RS)
+                                for rs_id in alu_rs[:config.alu_rs])
+        self.fpalu_RS = Pool()
+        self.fpalu_RS.free.extend(Station(rs_id, "AluRS", self.fpalu_FU, self.fpalu_RS)
+                                  for rs_id in alu_rs[config.alu_rs:])
+        self.mem_RS = Pool()
+        self.mem_RS.free.extend(Station("MemRS" + str(i + 1), "MemRS", self.mem_FU, self.mem_RS)
+                                for i in range(config.mem_rs))
+        self.stations = [rs for pool in (self.alu_RS, self.fpalu_RS, self.mem_RS) for rs in pool.free]
+
+        # Stations waiting to start execution (in program order), executing,
+        # waiting for the CDB and writing their result (on the CDB or, for stores, without it)
+        self._waiting = []
+        self._executing = []
+        self._cdb_requests = []
+        self._cdb_writes = []
+        self._store_writebacks = []
+        # Producer station -> list of (consumer station, operand index, register name)
+        self._consumers = {}
+
+        self._state = FETCHING
+        self._fetch_done = None
+        # Depth within the cycle (see _wake) at which the instruction in the issue stage was fetched and issued
+        self._fetch_level = 0
+        self._issue_level = 0
+        self._wakes = 0
+        # The instruction in the issue stage
+        self._issue_state = None
+        self._fetched = None
+        self._fetched_trace = None
+        self._fetched_decoded = None
+        self._fetched_rs = None
+        self._fetched_predicted_pc = None
+        self._fetched_checkpoint = None
+        self._stalled_since = None
+        self._last_issue = None
+        # Number of instructions fetched so far, used as sequence number of the dynamic instructions
+        self.fetched_instructions = 0
+        self._pc_producer = None
+        # DecodedInstruction of each instruction (see decoder.py), and its reservation stations by rs_class
+        self._decoded = decode_program(instructions, config)
+        self._rs_pools = (self.alu_RS, self.fpalu_RS, self.mem_RS)
+        # Whether the registers of the instruction at each address have been checked
+        self._checked = [False] * len(instructions)
+
+        self.rob = None
+        self.branch_predictor = self.btb = None
+        if config.rob_size > 0:
+            self.rob = ReorderBuffer(config.rob_size)
+            self.branch_predictor = make_predictor(config)
+            self.btb = make_btb(config)
+        # Register values as of the last committed instruction, to recover from mispredictions
+        self._committed = list(self.reg_file.values)
+        self.mispredictions = 0
+        self.squashed_instructions = 0
+        self.finished = False
+        self._fetch_stopped = False
+
+        # Fetched instructions waiting to be issued: (trace, decoded, predicted PC, predictor checkpoint)
+        self.instruction_queue = None
+        if config.instruction_queue_size > 0:
+            self.instruction_queue = deque()
+        elif config.fetch_width != 1 or config.issue_width != 1:
+            raise ValueError("Fetching or issuing more than one instruction per cycle needs an instruction queue "
+                             "(.instruction_queue_size)")
+        # First cycle in which nothing could be issued because the instruction queue was empty
+        self._starved_since = None
+
+        # Execution traces of the retired instructions, kept in memory unless a trace sink (see trace_sink.py)
+        # is given to stream them to a file
+        self.executed_instructions = None
+        self._attach(env, breakpoint_handler, trace_sink, log_config)
+
+    def _attach(self, env, breakpoint_handler=None, trace_sink=None, log_config=None):
+        """Connects the CPU to its environment, breakpoint handler and loggers, when it's built
+        or restored from a checkpoint (see checkpoint.py)"""
+        self.env = env
+        # Log levels and sinks of the components, those set by log_utils.configure() if not given
+        self.log_config = log_config if log_config is not None else log_utils.get_config()
+        if trace_sink is not None:
+            self.executed_instructions = trace_sink
+        elif self.executed_instructions is None:
+            self.executed_instructions = ExecutionTraceStore(self._instructions)
+
+        if breakpoint_handler is None:
+            self.breakpoint_handler = self._default_breakpoint_handler
+        else:
+            self.breakpoint_handler = breakpoint_handler
+
+        log_config = self.log_config
+        self._log = get_logger(env, "CPU", config=log_config)
+        self._warn = get_logger(env, "CPU", WARNING, config=log_config)
+        self._log_cdb = get_logger(env, "CDB", config=log_config)
+        self._log_rs = {rs.id: get_logger(env, rs.id, config=log_config) for rs in self.stations}
+        self.reg_file.env = env
+        self.reg_file._log = get_logger(env, self.reg_file.id, config=log_config)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for name in ("env", "breakpoint_handler", "log_config", "_log", "_warn", "_log_cdb", "_log_rs"):
+            del state[name]
+        # Traces streamed to a file stay there
+        if not isinstance(self.executed_instructions, ExecutionTraceStore):
+            state["executed_instructions"] = None
+        return state
+
+    def run(self):
+        self._log("Starting instruction dispatch")
+        self._start_fetch(self.env.now)
+        yield from self.resume()
+
+    def resume(self):
+        """The process of a CPU restored from a checkpoint: continues from the next cycle"""
+        if self.finished:
+            return
+        if self._fetch_done is None:
+            # Checkpointed before it started
+            yield from self.run()
+            return
+        while True:
+            now = self.env.now
+            if self.bus is not None:
+                self.bus.arbitrate(now)
+            if self.rob is not None:
+                self._commit(now)
+            # The stores release their station and FU before the CDB writers, as in SimPy
+            self._complete_writebacks(now)
+            self._broadcast(now)
+            self._complete_execution(now)
+            self._arbitrate_cdb(now)
+            self._start_execution(now)
+            self._dispatch(now)
+            if not self._has_pending_work(now):
+                break
+            yield
+        self.finished = True
+        self._log("Stopped instruction dispatch")
+
+    def _has_pending_work(self, now):
+        """True if something is scheduled to happen in a future cycle.
+        When nothing is, the simulation is over (or deadlocked, like the SimPy engine would be)."""
+        if self.rob is not None and self.rob.entries and self.rob.entries[0].completed_at is not None:
+            return True
+        if self._state == FETCHING and self.instruction_queue is not None:
+            # Fetching is blocked while the queue is full
+            fetching = len(self.instruction_queue) < self.config.instruction_queue_size
+        else:
+            fetching = self._state == FETCHING
+        return (fetching
+                or self._last_issue == now
+                or bool(self._executing or self._cdb_writes or self._store_writebacks))
+
+    # ------------------------------------------------------------------ commit
+    def _commit(self, now):
+        entries = self.rob.entries
+        while entries and entries[0].completed_at is not None and entries[0].completed_at < now:
+            entry = entries.popleft()
+            if entry.fault is not None:
+                raise entry.fault
+            trace = entry.trace
+            trace.committed = now
+            self.executed_instructions.append(trace)
+            if entry.dst_index is not None:
+                self._committed[entry.dst_index] = entry.result
+
+            if entry.predicted_pc is not None:
+                self._train_predictor(entry)
+
+            station = entry.station
+            if station.rob_entry is entry:
+                # A store: the memory is written now that it's no longer speculative
+                memory = self.memory
+                memory._memory[station.address] = station.values[1]
+                memory.complete_access(station)
+                station._reset()
+                station.rs_pool.put(station, now, 0)
+
+    def _train_predictor(self, entry):
+        pc, instruction = entry.trace.pc, entry.trace.instruction
+        if isinstance(instruction, BranchInstruction):
+            self.branch_predictor.update(pc, instruction.address, entry.result != pc + 1, entry.checkpoint)
+        elif self.btb is not None:
+            self.btb.update(pc, entry.result)
+
+    # ------------------------------------------------------------------ writeback
+    def _broadcast(self, now):
+        writes, self._cdb_writes = self._cdb_writes, []
+        for station in writes:
+            if station.trace is None:
+                # Squashed by a mispredicted branch broadcast before it
+                continue
+            value = station.result
+            self._log_cdb("Writing {}: {}", station, value)
+
+            dst_index = station.decoded.dst_index
+            if dst_index is not None and self.reg_file.values[dst_index] is station:
+                self.reg_file.values[dst_index] = value
+
+            for consumer, index, reg_name in self._consumers.pop(station, ()):
+                consumer.values[index] = value
+                consumer.pending -= 1
+                self._wake(consumer, now, CDB_SNOOP_LEVEL)
+                consumer.trace.hazards.append(etrace.RAWHazard(consumer.trace.issued, now, reg_name, consumer))
+
+            if self._pc_producer is station:
+                self._pc_producer = None
+                self.reg_file.values[PC] = value
+                self._start_fetch(now, PC_SNOOP_LEVEL)
+
+            entry = station.rob_entry
+            self._complete(station, now, FU_FROM_CDB_WRITER_LEVEL)
+            if entry is not None and entry.predicted_pc is not None and entry.predicted_pc != value:
+                self._recover(entry, value, now)
+
+    def _complete_writebacks(self, now):
+        if not self._store_writebacks:
+            return
+        writebacks, self._store_writebacks = self._store_writebacks, []
+        for station in writebacks:
+            self._complete(station, now, FU_FROM_STORE_LEVEL)
+
+    def _complete(self, station, now, fu_level):
+        station.trace.written_result = now
+        entry = station.rob_entry
+        if entry is None:
+            self.executed_instructions.append(station.trace)
+        else:
+            entry.result = station.result
+            entry.completed_at = now
+
+        fu_pool = station.fu_pool
+        fu_pool.free.append(station.fu)
+        if fu_pool.waiting:
+            waiter = fu_pool.waiting.popleft()
+            self._grant_fu(waiter, now)
+            self._wake(waiter, now, fu_level)
+
+        if entry is not None and station.decoded.opcode is STORE:
+            # Stores keep their station, and their place among the memory accesses, until they commit
+            station.fu = None
+            return
+        station._reset()
+        station.rs_pool.put(station, now, fu_level)
+
+    def _recover(self, entry, pc, now):
+        """Squashes the instructions younger than a mispredicted control flow instruction
+        and restarts fetching from the right PC"""
+        squashed = self.rob.squash_after(entry)
+        self._log("Mispredicted {}: squashing {} instructions, new PC is {}",
+                  entry.trace.instruction, len(squashed), pc)
+        entry.trace.hazards.append(etrace.BranchMispredictionHazard(entry.trace.issued, now))
+        self.mispredictions += 1
+        if isinstance(entry.trace.instruction, BranchInstruction):
+            self.branch_predictor.recover(entry.checkpoint, pc != entry.trace.pc + 1)
+        self.squashed_instructions += len(squashed)
+
+        dirty = set()
+        for squashed_entry in squashed:
+            if squashed_entry.dst_index is not None:
+                dirty.add(squashed_entry.dst_index)
+            station = squashed_entry.station
+            if station.rob_entry is not squashed_entry:
+                # Already completed, the station may even belong to another instruction now
+                continue
+            if station.kind == "MemRS":
+                self.memory.cancel_access(station)
+                if self.bus is not None:
+                    self.bus.cancel(self.core_id, station)
+            self._consumers.pop(station, None)
+            if station.fu is not None:
+                station.fu_pool.free.append(station.fu)
+            station._reset()
+            station.rs_pool.put(station, now, 0)
+
+        # The squashed stations have been reset: drop them from every list
+        live = self._is_live
+        self._waiting = [station for station in self._waiting if live(station)]
+        self._executing = [station for station in self._executing if live(station)]
+        self._cdb_requests = [station for station in self._cdb_requests if live(station)]
+        self._store_writebacks = [station for station in self._store_writebacks if live(station)]
+        for producer, consumers in self._consumers.items():
+            consumers[:] = [consumer for consumer in consumers if live(consumer[0])]
+        for fu_pool in (self.alu_FU, self.fpalu_FU, self.mem_FU):
+            fu_pool.waiting = deque(station for station in fu_pool.waiting if live(station))
+            while fu_pool.free and fu_pool.waiting:
+                waiter = fu_pool.waiting.popleft()
+                self._grant_fu(waiter, now)
+                self._wake(waiter, now, FU_FROM_CDB_WRITER_LEVEL)
+
+        # Each register written by a squashed instruction goes back to the youngest older producer
+        registers = self.reg_file.values
+        for dst_index in dirty:
+            value = self._committed[dst_index]
+            for older in self.rob.entries:
+                if older.dst_index == dst_index:
+                    value = older.result if older.completed_at is not None else older.station
+            registers[dst_index] = value
+
+        # The instructions waiting to be issued are on the wrong path too
+        if self._fetched is not None:
+            self.squashed_instructions += 1
+            if self._fetched_rs is not None:
+                self._fetched_rs.rs_pool.put(self._fetched_rs, now, 0)
+            self._clear_fetched()
+            self._stalled_since = None
+        if self.instruction_queue:
+            self.squashed_instructions += len(self.instruction_queue)
+            self.instruction_queue.clear()
+
+        registers[PC] = pc
+        # A BREAK fetched down the wrong path doesn't end the region of interest
+        self._fetch_stopped = False
+        self._start_fetch(now)
+
+    @staticmethod
+    def _is_live(station):
+        return station.trace is not None
+
+    # ------------------------------------------------------------------ execution
+    def _complete_execution(self, now):
+        if not self._executing:
+            return
+        executing = []
+        requests = []
+        for station in self._executing:
+            if station.done_at != now:
+                executing.append(station)
+                continue
+
+            decoded = station.decoded
+            opcode = decoded.opcode
+            if opcode is ALU:
+                station.result = decoded.result(station.values[0], station.values[1])
+            elif opcode is BRANCH:
+                # The PC of the next instruction, if the branch isn't taken
+                station.result = decoded.result(station.values[0], station.values[1], station.trace.pc + 1)
+            elif opcode is JUMP:
+                station.result = decoded.base
+            else:
+                memory = self.memory
+                if opcode is LOAD:
+                    try:
+                        station.result = memory._memory[station.address]
+                    except IndexError as e:
+                        if station.rob_entry is None:
+                            raise
+                        # Maybe a load on a wrong path: fail only if it commits
+                        station.rob_entry.fault = e
+                        station.result = 0
+                    memory.complete_access(station)
+                elif station.rob_entry is None:
+                    memory._memory[station.address] = station.values[1]
+                    memory.complete_access(station)
+
+            station.trace.write_result = now
+            if station.result is not None:
+                station.cdb_requested_at = now
+                requests.append(station)
+            else:
+                self._store_writebacks.append(station)
+        self._executing = executing
+
+        # Simultaneous requests are served in the order the SimPy engine would make them:
+        # loads and control flow instructions take more events than ALU ones to get from the end
+        # of the execution to the CDB request, then the first to start executing goes first.
+        # Among the ones starting at the same depth, those woken by reading their operands come last:
+        # the reads were scheduled at issue, after the CDB writes of the previous cycle
+        requests.sort(key=lambda station: (station.kind == "MemRS" or station.decoded.is_control_flow,
+                                           station.trace.start_execution, station.start_level,
+                                           station.wake_level == OPERAND_READ_LEVEL, station.wake_order))
+        self._cdb_requests.extend(requests)
+
+    def _arbitrate_cdb(self, now):
+        requests = self._cdb_requests
+        if not requests:
+            return
+        width = self.config.cdb_width
+        granted, self._cdb_requests = requests[:width], requests[width:]
+        for station in granted:
+            if station.cdb_requested_at != now:
+                station.trace.hazards.append(etrace.CDBUnavailableHazard(station.cdb_requested_at, now))
+        for station in self._cdb_requests:
+            if station.cdb_requested_at == now:
+                self._log_cdb("Conflict: not immediately available for writing result of {} ({})",
+                              station, station.instruction)
+        self._cdb_writes.extend(granted)
+
+    def _start_execution(self, now):
+        waiting = []
+        memory = self.memory
+        for station in self._waiting:
+            if station.pending or station.fu is None or station.ready_at > now:
+                waiting.append(station)
+                continue
+
+            if station.kind == "MemRS":
+                if not station.resolved:
+                    if memory.queue[0] is not station:
+                        waiting.append(station)
+                        continue
+                    station.address = station.values[0] + station.decoded.base
+                    if memory.queue_full:
+                        # The dispatcher may be waiting for this slot
+                        memory.dequeued_at = now
+                        memory.dequeued_level = station.wake_level + QUEUE_FREED_LEVEL
+                    memory.queue.popleft()
+                    memory.start_access(station)
+                    station.resolved = True
+                    # The next access in the queue can resolve its address in this same cycle
+                    if memory.queue:
+                        self._wake(memory.queue[0], now, station.wake_level + 5)
+                    start_level = station.wake_level + 6
+                else:
+                    start_level = MEM_CONFLICT_SOLVED_LEVEL
+                if memory.has_to_wait(station):
+                    waiting.append(station)
+                    continue
+            else:
+                start_level = station.wake_level + 2
+
+            station.start_level = start_level
+            self._start(station, now)
+        self._waiting = waiting
+
+    def _wake(self, station, now, level):
+        """Records that a dependency of the station was satisfied in this cycle at the given depth"""
+        if station.woken_at != now or level >= station.wake_level:
+            station.woken_at = now
+            station.wake_level = level
+            # Stations woken at the same depth start in the order they were woken
+            self._wakes += 1
+            station.wake_order = self._wakes
+
+    def _start(self, station, now):
+        trace = station.trace
+        trace.start_execution = now
+        trace.fu = station.fu
+        latency = station.decoded.latency
+        if station.kind == "MemRS":
+            if self.caches is not None:
+                latency, trace.served_by = self.caches.access(station.address, station.decoded.opcode is STORE)
+            if self.bus is not None and not self.bus.access(self.core_id, station, now, latency):
+                # A coherence miss: done_at is set when the bus is granted
+                station.done_at = None
+                self._executing.append(station)
+                return
+        station.done_at = now + latency
+        self._executing.append(station)
+
+    def _grant_fu(self, station, now):
+        fu = station.fu_pool.free.popleft()
+        station.fu = fu
+        if station.fu_requested_at is not None:
+            station.trace.hazards.append(etrace.FUUnavailableHazard(station.fu_requested_at, now, fu))
+
+    # ------------------------------------------------------------------ dispatch
+    def _start_fetch(self, now, level=0):
+        """Starts fetching the instruction at the PC: level is the depth at which the dispatcher resumes"""
+        self._log("Fetching instruction at PC {}", self.reg_file.values[PC])
+        self._state = FETCHING
+        self._fetch_done = now + self.config.fetch_latency
+        self._fetch_level = level + FETCH_LEVEL if self.config.fetch_latency == 0 else 0
+
+    def _dispatch(self, now):
+        if self.instruction_queue is not None:
+            if self._state == FETCHING and self._fetch_done <= now:
+                self._fetch_group(now)
+            self._issue_group(now)
+            return
+
+        while True:
+            if self._state == FETCHING:
+                if self._fetch_done > now:
+                    return
+                fetched = self._fetch(now)
+                if fetched is None:
+                    if self._state == FETCHING:
+                        # A breakpoint
+                        self._start_fetch(now, self._fetch_level)
+                    continue
+                self._set_fetched(*fetched)
+                self._state = ISSUING
+            elif self._state == ISSUING:
+                if not self._try_issue(now):
+                    return
+            else:
+                return
+
+    def _fetch(self, now):
+        """Fetches the instruction at the PC and returns its trace and DecodedInstruction.
+        Returns None for HLT and addresses out of range (fetching stops) and for BREAK"""
+        pc = self.reg_file.values[PC]
+        try:
+            instruction = self._instructions[pc]
+        except IndexError:
+            if not self._speculating():
+                self._warn("WARNING: PC {} is out of range", pc)
+                self._warn("Use HLT instructions")
+            self._state = STOPPED
+            return None
+
+        self._log("Fetched {}", instruction)
+        self.reg_file.values[PC] = pc + 1
+
+        # Registers are accessed by slot from now on: check once that this CPU has them
+        if not self._checked[pc]:
+            self.reg_file.check_registers(instruction)
+            self._checked[pc] = True
+        decoded = self._decoded[pc]
+
+        if decoded.opcode is HALT:
+            self._state = STOPPED
+            return None
+
+        if decoded.opcode is BREAKPOINT:
+            if instruction.handler is not None:
+                instruction.handler(self)
+            self.breakpoint_handler(self)
+            if self._fetch_stopped:
+                self._state = STOPPED
+            return None
+
+        trace = etrace.ExecutionTrace(instruction, self.fetched_instructions, pc)
+        self.fetched_instructions += 1
+        return trace, decoded
+
+    def _fetch_group(self, now):
+        """Fetches up to fetch_width instructions into the instruction queue"""
+        queue = self.instruction_queue
+        for _ in range(self.config.fetch_width):
+            if len(queue) == self.config.instruction_queue_size:
+                break
+            fetched = self._fetch(now)
+            if fetched is None:
+                if self._state == FETCHING:
+                    # A breakpoint
+                    continue
+                return
+            trace, decoded = fetched
+            if not decoded.is_control_flow:
+                queue.append((trace, decoded, None, None))
+            elif self.rob is None:
+                queue.append((trace, decoded, None, None))
+                self._log("Stalling fetches until the new PC is available")
+                self._state = WAITING_PC
+                return
+            else:
+                checkpoint = self.branch_predictor.checkpoint()
+                predicted_pc = self._predict(trace, decoded)
+                queue.append((trace, decoded, predicted_pc, checkpoint))
+                self.reg_file.values[PC] = predicted_pc
+                if predicted_pc != trace.pc + 1:
+                    self._log("Speculating past {}, fetching from PC {}", trace.instruction, predicted_pc)
+                    break
+        self._fetch_done = now + max(self.config.fetch_latency, 1)
+
+    def _issue_group(self, now):
+        """Issues up to issue_width instructions from the instruction queue, in order"""
+        queue = self.instruction_queue
+        issued = 0
+        while issued < self.config.issue_width:
+            if self._fetched is None:
+                if not queue:
+                    if issued == 0 and self._starved_since is None and self._state != STOPPED:
+                        self._starved_since = now
+                    return
+                trace, decoded, predicted_pc, checkpoint = queue.popleft()
+                self._set_fetched(trace, decoded)
+                self._fetched_predicted_pc = predicted_pc
+                self._fetched_checkpoint = checkpoint
+                if self._starved_since is not None:
+                    trace.hazards.append(etrace.FetchStallHazard(self._starved_since, now))
+                    self._starved_since = None
+            if not self._try_issue(now):
+                return
+            issued += 1
+
+    def _set_fetched(self, trace, decoded):
+        """Moves a fetched instruction to the issue stage"""
+        self._fetched = trace.instruction
+        self._fetched_trace = trace
+        self._fetched_decoded = decoded
+        self._issue_state = WAITING_RS if self.rob is None else WAITING_ROB
+
+    def _clear_fetched(self):
+        self._fetched = self._fetched_trace = self._fetched_decoded = self._fetched_rs = None
+        self._fetched_predicted_pc = self._fetched_checkpoint = None
+        self._issue_state = None
+
+    def _try_issue(self, now):
+        """Takes the resources needed by the instruction in the issue stage, and issues it.
+        Returns False if it has to wait for them"""
+        if self._issue_state == WAITING_ROB and not self._get_rob_slot(now):
+            return False
+        if self._issue_state == WAITING_RS and not self._get_reservation_station(now):
+            return False
+        if self._issue_state == WAITING_QUEUE and not self._enqueue_memory_access(now):
+            return False
+        self._issue_fetched(now)
+        return True
+
+    def _speculating(self):
+        """True if a control flow instruction in the reorder buffer hasn't been resolved yet"""
+        if self.rob is None:
+            return False
+        return any(entry.predicted_pc is not None and entry.completed_at is None for entry in self.rob.entries)
+
+    def _get_rob_slot(self, now):
+        # The slot is taken at issue: only the dispatcher fills the reorder buffer, so it can't be taken meanwhile
+        if self.rob.full:
+            if self._stalled_since is None:
+                self._log("Structural hazard: reorder buffer full, cannot issue {}", self._fetched)
+                self._stalled_since = now
+            return False
+
+        if self._stalled_since is not None:
+            self._log("Structural hazard solved: a slot in the reorder buffer is free")
+            self._fetched_trace.hazards.append(etrace.ROBFullHazard(self._stalled_since, now))
+            self._stalled_since = None
+        self._issue_state = WAITING_RS
+        return True
+
+    def _get_reservation_station(self, now):
+        rs_pool = self._rs_pools[self._fetched_decoded.rs_class]
+        if not rs_pool.free:
+            if self._stalled_since is None:
+                self._log("Structural hazard: no RS available for {}", self._fetched)
+                self._stalled_since = now
+            return False
+
+        rs = rs_pool.free.popleft()
+        if self._stalled_since is not None:
+            self._log("Structural hazard solved: obtained {} for {}", rs, self._fetched)
+            self._fetched_trace.hazards.append(etrace.RSUnavailableHazard(self._stalled_since, now, rs))
+            self._stalled_since = None
+            self._issue_level = rs_pool.released_level
+        elif rs_pool.released_at == now:
+            # Released in this cycle, maybe after the request (a zero-cycles hazard for the SimPy engine)
+            self._issue_level = max(self._fetch_level + RS_LEVEL, rs_pool.released_level)
+        else:
+            self._issue_level = self._fetch_level + RS_LEVEL
+
+        self._fetched_rs = rs
+        # Loads and stores also need a spot in the memory access queue
+        self._issue_state = WAITING_QUEUE if rs.kind == "MemRS" else None
+        return True
+
+    def _enqueue_memory_access(self, now):
+        if self.memory.queue_full:
+            if self._stalled_since is None:
+                self._log("Structural hazard: no slots in the memory access queue available for {}", self._fetched)
+                self._stalled_since = now
+            return False
+
+        self.memory.queue.append(self._fetched_rs)
+        if self._stalled_since is not None:
+            self._log("Structural hazard solved, found a slot in the mem access queue")
+            self._fetched_trace.hazards.append(etrace.MemQueueSlotUnavailableHazard(self._stalled_since, now))
+            self._stalled_since = None
+            self._issue_level = self.memory.dequeued_level
+        elif self.memory.dequeued_at == now:
+            self._issue_level = max(self._issue_level + QUEUE_LEVEL, self.memory.dequeued_level)
+        else:
+            self._issue_level += QUEUE_LEVEL
+        self._issue_state = None
+        return True
+
+    def _issue_fetched(self, now):
+        trace, rs = self._fetched_trace, self._fetched_rs
+        decoded = self._fetched_decoded
+        predicted_pc, checkpoint = self._fetched_predicted_pc, self._fetched_checkpoint
+        self._issue(rs, trace, decoded, now)
+        self._clear_fetched()
+
+        if self.instruction_queue is not None:
+            # The front end goes on by itself: it only needs the producer of the PC it's waiting for
+            if self.rob is not None:
+                rs.rob_entry = RobEntry(trace, rs, decoded.dst_index, predicted_pc, checkpoint)
+                self.rob.append(rs.rob_entry)
+            elif decoded.is_control_flow:
+                self._pc_producer = rs
+        elif self.rob is not None:
+            predicted_pc = checkpoint = None
+            if decoded.is_control_flow:
+                checkpoint = self.branch_predictor.checkpoint()
+                predicted_pc = self._predict(trace, decoded)
+                self.reg_file.values[PC] = predicted_pc
+                self._log("Speculating past {}, fetching from PC {}", trace.instruction, predicted_pc)
+            rs.rob_entry = RobEntry(trace, rs, decoded.dst_index, predicted_pc, checkpoint)
+            self.rob.append(rs.rob_entry)
+            self._start_fetch(now, self._issue_level)
+        elif decoded.is_control_flow:
+            self._log("Stalling fetches until the new PC is available")
+            self._pc_producer = rs
+            self._state = WAITING_PC
+        else:
+            self._start_fetch(now, self._issue_level)
+
+    def _predict(self, trace, decoded):
+        """Returns the PC to fetch after a control flow instruction"""
+        pc, target = trace.pc, decoded.base
+        if decoded.opcode is BRANCH:
+            if self.branch_predictor.predict(pc, target):
+                return target
+            return pc + 1
+        if self.btb is None:
+            return target
+        target = self.btb.lookup(pc)
+        return target if target is not None else pc + 1
+
+    def _issue(self, rs, trace, decoded, now):
+        instruction = trace.instruction
+        self._log("Issuing {} to {}", instruction, rs)
+        trace.issued = now
+        trace.rs = rs
+
+        rs.instruction = instruction
+        rs.trace = trace
+        rs.decoded = decoded
+        self._last_issue = now
+
+        # Read the operands, then associate the destination register with the station.
+        # Reading an operand takes one cycle, unless it has to be snooped from the CDB
+        registers = self.reg_file.values
+        for index, operand in decoded.operands:
+            if operand.__class__ is Register:
+                src = registers[operand.index]
+                if src.__class__ is Station:
+                    self._consumers.setdefault(src, []).append((rs, index, operand))
+                    rs.pending += 1
+                    continue
+                rs.values[index] = src
+            else:
+                rs.values[index] = operand
+        if decoded.dst_index is not None:
+            registers[decoded.dst_index] = rs
+
+        # Request a functional unit
+        fu_pool = rs.fu_pool
+        if fu_pool.free:
+            rs.fu = fu_pool.free.popleft()
+        else:
+            self._log_rs[rs.id]("Structural hazard: no FU available for {}", instruction)
+            rs.fu_requested_at = now
+            fu_pool.waiting.append(rs)
+
+        if decoded.operands:
+            rs.ready_at = now + 1
+            self._wake(rs, now + 1, OPERAND_READ_LEVEL)
+        else:
+            # Instructions without operands (jumps) can start executing right away
+            rs.ready_at = now
+            self._wake(rs, now, self._issue_level + FU_AT_ISSUE_LEVEL)
+            if rs.fu is not None:
+                rs.start_level = rs.wake_level + 2
+                self._start(rs, now)
+                return
+        self._waiting.append(rs)
+
+    def load_state(self, registers, memory):
+        """Starts from the given register values and memory contents (e.g. after a functional fast-forward)"""
+        self.reg_file.values[:] = registers
+        self._committed = list(registers)
+        self.memory._memory[:] = memory
+
+    def stop_fetching(self):
+        """Stops fetching new instructions: the ones in flight are completed and the simulation ends.
+        Meant to be called by a breakpoint handler, to end a region of interest"""
+        self._fetch_stopped = True
+
+    @property
+    def fetch_stopped(self):
+        """True if stop_fetching() ended the simulation, rather than a HLT or the end of the program"""
+        return self._fetch_stopped
+
+    def dump_memory(self):
+        for addr in range(0, len(self.memory._memory), 4):
+            contents = ["0x{:0>2x}".format(m) for m in self.memory._memory[addr:addr + 4]]
+            print("0x{:x}: ".format(addr).ljust(6) + " ".join(contents))
+
+    @staticmethod
+    def _default_breakpoint_handler(cpu):
+        cpu._log("Breakpoint hit, registers: {}", str(cpu.reg_file))
+
+    def __repr__(self):
+        return "CLK {:>3n} | CPU Registers: {}".format(self.env.now, self.reg_file)
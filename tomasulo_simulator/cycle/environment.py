@@ -0,0 +1,50 @@
+from simpy.core import EmptySchedule
+
+
+class CycleEnvironment:
+    """Clock used by the cycle-stepped engine in place of a simpy.Environment.
+
+    Processes are generators which yield once per clock cycle: every step
+    advances each of them by exactly one cycle."""
+    def __init__(self, initial_time=0):
+        self.now = initial_time
+        self._processes = []
+        # True once the cycle "now" has been processed
+        self._started = False
+
+    def process(self, generator):
+        self._processes.append(generator)
+        return generator
+
+    def step(self):
+        if not self._processes:
+            raise EmptySchedule()
+
+        if self._started:
+            self.now += 1
+        self._started = True
+
+        alive = []
+        for process in self._processes:
+            try:
+                next(process)
+                alive.append(process)
+            except StopIteration:
+                pass
+        self._processes = alive
+
+    def peek(self):
+        """Returns the cycle processed by the next step, infinity if nothing is left to run
+        (like simpy.Environment.peek)"""
+        if not self._processes:
+            return float("inf")
+        return self.now + 1 if self._started else self.now
+
+    def run(self, until=None):
+        while self._processes:
+            if until is not None and self.now + 1 >= until and self._started:
+                # Cycle until hasn't been processed yet: it will be by the next step
+                self.now = until
+                self._started = False
+                return
+            self.step()
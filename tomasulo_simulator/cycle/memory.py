@@ -0,0 +1,63 @@
+from collections import deque
+
+from tomasulo_simulator.cpu_config import CpuConfig
+from tomasulo_simulator.decoder import Opcode
+
+
+class CycleMemory:
+    """Memory and memory access queue of the cycle-stepped engine.
+
+    Accesses enter the queue when they are issued and leave it, in order, when their
+    address is resolved. From then on they are "in execution" until the access completes,
+    indexed by address in program order."""
+    def __init__(self, config: CpuConfig, default_val=0):
+        self.id = "MEM"
+        self.queue_size = config.mem_access_queue_size
+        self.queue = deque()
+        # Cycle in which an access last left the full queue, and the depth within it (see CycleCPU._wake)
+        self.dequeued_at = None
+        self.dequeued_level = None
+        # Address -> stations accessing it, in program order
+        self.in_execution = {}
+        self._memory = [default_val] * config.mem_size
+
+    @property
+    def queue_full(self):
+        return len(self.queue) >= self.queue_size
+
+    def start_access(self, station):
+        self.in_execution.setdefault(station.address, []).append(station)
+
+    def complete_access(self, station):
+        accesses = self.in_execution[station.address]
+        accesses.remove(station)
+        if not accesses:
+            del self.in_execution[station.address]
+
+    def cancel_access(self, station):
+        """Forgets a squashed access, wherever it is"""
+        if not station.resolved:
+            self.queue.remove(station)
+            return
+        accesses = self.in_execution.get(station.address, ())
+        if station in accesses:
+            self.complete_access(station)
+
+    def has_to_wait(self, station):
+        """Same policy as the SimPy Memory: loads wait for older stores to the same address,
+        stores wait for any older access to the same address."""
+        accesses = self.in_execution[station.address]
+        if station.decoded.opcode is Opcode.STORE:
+            return accesses[0] is not station
+        for other in accesses:
+            if other is station:
+                return False
+            if other.decoded.opcode is Opcode.STORE:
+                return True
+        return False
+
+    def __str__(self):
+        return self.id
+
+    def __repr__(self):
+        return self.__str__()
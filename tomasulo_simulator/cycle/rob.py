@@ -0,0 +1,50 @@
+from collections import deque
+
+
+class RobEntry:
+    """An instruction issued and not committed yet.
+
+    The station is released when the result is broadcast (for stores, when they commit),
+    after that the entry keeps the result until the instruction commits or is squashed."""
+    __slots__ = ("trace", "station", "dst_index", "predicted_pc", "checkpoint", "result", "completed_at", "fault")
+
+    def __init__(self, trace, station, dst_index, predicted_pc, checkpoint=None):
+        self.trace = trace
+        self.station = station
+        self.dst_index = dst_index
+        # Control flow instructions only: the PC fetched after them, checked against their result
+        self.predicted_pc = predicted_pc
+        # Branches only: state of the branch predictor before the prediction
+        self.checkpoint = checkpoint
+        self.result = None
+        self.completed_at = None
+        # Exception raised while executing on a possibly wrong path, raised again if the instruction commits
+        self.fault = None
+
+    def __repr__(self):
+        return "RobEntry({}, completed_at={})".format(self.trace.instruction, self.completed_at)
+
+
+class ReorderBuffer:
+    """The in-flight instructions in program order, committed from the head"""
+    def __init__(self, size):
+        self.size = size
+        self.entries = deque()
+
+    @property
+    def full(self):
+        return len(self.entries) >= self.size
+
+    def append(self, entry):
+        self.entries.append(entry)
+
+    def squash_after(self, entry):
+        """Removes the entries younger than the given one, returns them from the youngest"""
+        squashed = []
+        entries = self.entries
+        while entries[-1] is not entry:
+            squashed.append(entries.pop())
+        return squashed
+
+    def __len__(self):
+        return len(self.entries)
@@ -0,0 +1,73 @@
+from collections import deque
+
+
+class Station:
+    """A reservation station of the cycle-stepped engine.
+
+    Unlike the SimPy reservation stations it holds no behaviour: the CPU reads and
+    updates its fields every cycle."""
+    __slots__ = ("id", "kind", "fu_pool", "rs_pool",
+                 "instruction", "trace", "decoded", "fu", "result", "address",
+                 "values", "pending", "ready_at", "resolved",
+                 "done_at", "fu_requested_at", "cdb_requested_at",
+                 "woken_at", "wake_level", "wake_order", "start_level", "rob_entry")
+
+    def __init__(self, id, kind, fu_pool, rs_pool):
+        self.id = id
+        self.kind = kind
+        self.fu_pool = fu_pool
+        self.rs_pool = rs_pool
+        self._reset()
+
+    def _reset(self):
+        # Static instruction and its dynamic instance
+        self.instruction = None
+        self.trace = None
+        self.decoded = None
+        self.fu = None
+        self.result = None
+        self.address = None
+        # Operand values (OP1, OP2 for ALU stations, offset and source register for memory stations)
+        # and number of operands still waiting for a CDB broadcast
+        self.values = [None, None]
+        self.pending = 0
+        self.ready_at = None
+        # Memory stations only: the address has been resolved and the access left the queue
+        self.resolved = False
+        self.done_at = None
+        self.fu_requested_at = None
+        self.cdb_requested_at = None
+        # Ordering of the events within a cycle (see CycleCPU._wake)
+        self.woken_at = None
+        self.wake_level = 0
+        self.wake_order = 0
+        self.start_level = 0
+        # Entry in the reorder buffer, if the CPU has one
+        self.rob_entry = None
+
+    def __str__(self):
+        return self.id
+
+    def __repr__(self):
+        return self.__str__()
+
+
+class Pool:
+    """A FIFO pool of identical resources (reservation stations or functional units).
+    Resources are handed out in the order they were returned, requests are served in arrival order."""
+    def __init__(self, items=()):
+        self.free = deque(items)
+        self.waiting = deque()
+        # Cycle in which a resource was returned to the exhausted pool, and the depth of the first return
+        # in it (see CycleCPU._wake): a request made in that cycle is served at that depth at the earliest
+        self.released_at = None
+        self.released_level = None
+
+    def put(self, item, now, level):
+        """Returns a resource, at the given depth within the cycle"""
+        if not self.free:
+            self.released_at = now
+            self.released_level = level
+        elif self.released_at == now and level < self.released_level:
+            self.released_level = level
+        self.free.append(item)
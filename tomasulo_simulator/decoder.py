@@ -0,0 +1,122 @@
+"""Pre-decoding of the static instructions, once per program and configuration.
+
+Every instruction of the program is decoded into a DecodedInstruction, so the engines find what to do with it
+in its record instead of inspecting its class every time it's fetched, issued and executed:
+ - opcode:           what the reservation station does with it (Opcode)
+ - rs_class:         the reservation stations which execute it (ALU_RS, FPALU_RS or MEM_RS, None for HLT and BREAK)
+ - latency:          execution latency, resolved from the configuration
+ - operands:         (index, operand) pairs, in the order the reservation stations read them. An operand is a
+                     Register (its slot in the register file is operand.index) or an immediate int.
+                     ALU instructions and branches read OP1 and OP2 as 0 and 1, loads and stores the offset
+                     register as 0, stores the source register as 1
+ - dst_index:        slot of the destination register, None if the instruction doesn't write one
+ - is_control_flow:  True for branches and jumps
+ - result:           the result method of ALU instructions and branches
+ - base:             target of jumps and branches, base address of loads and stores
+
+decode_program returns the table of a program, indexed by address.
+Registers aren't validated here: the engines check them when an instruction is fetched for the first time,
+so a CPU can run programs with instructions it can't execute, as long as they are never fetched."""
+from collections import namedtuple
+from enum import Enum
+
+from tomasulo_simulator.cpu_config import CpuConfig
+from tomasulo_simulator.instruction import (
+    HaltInstruction, BreakpointInstruction,
+    ControlFlowInstruction, MemInstruction,
+    AluInstruction, FloatingInstruction,
+    IntegerInstruction, LogicInstruction, BitwiseInstruction,
+    BranchInstruction, JumpInstruction,
+    LoadInstruction, StoreInstruction
+)
+from tomasulo_simulator.instruction.register import Register
+
+
+class Opcode(Enum):
+    # Members are singletons, also when unpickled (e.g. from a checkpoint): engines compare them with is
+    ALU = "alu"
+    BRANCH = "branch"
+    JUMP = "jump"
+    LOAD = "load"
+    STORE = "store"
+    HALT = "halt"
+    BREAKPOINT = "breakpoint"
+
+
+# Reservation stations executing the instructions
+ALU_RS = 0
+FPALU_RS = 1
+MEM_RS = 2
+
+# Instructions computing result(OP1, OP2)
+TWO_OPERANDS = (IntegerInstruction, LogicInstruction, BitwiseInstruction, FloatingInstruction)
+
+DecodedInstruction = namedtuple("DecodedInstruction",
+                                "opcode rs_class latency operands dst_index is_control_flow result base")
+
+_HALT = DecodedInstruction(Opcode.HALT, None, None, (), None, False, None, None)
+_BREAKPOINT = DecodedInstruction(Opcode.BREAKPOINT, None, None, (), None, False, None, None)
+
+
+def decode_program(instructions, config: CpuConfig):
+    """Returns the DecodedInstruction of every instruction of the program"""
+    return [decode(instruction, config) for instruction in instructions]
+
+
+def decode(instruction, config: CpuConfig):
+    if isinstance(instruction, HaltInstruction):
+        return _HALT
+    if isinstance(instruction, BreakpointInstruction):
+        return _BREAKPOINT
+
+    if isinstance(instruction, AluInstruction):
+        rs_class = FPALU_RS if isinstance(instruction, FloatingInstruction) else ALU_RS
+        kind = "AluRS"
+    elif isinstance(instruction, MemInstruction):
+        rs_class = MEM_RS
+        kind = "MemRS"
+    else:
+        raise Exception("Unrecognized instruction: {}".format(instruction))
+
+    latency = instruction.latency(config)
+    if latency is None:
+        latency = config[kind.lower() + "_execution_latency"]
+    if latency is None:
+        raise Exception("Latency not defined for instruction {}".format(instruction.mnemonic))
+
+    dst_reg = None
+    result = None
+    base = None
+    if isinstance(instruction, LoadInstruction):
+        opcode = Opcode.LOAD
+        operands = ((0, instruction.offset_reg),)
+        dst_reg = instruction.dst_reg
+        base = instruction.base
+    elif isinstance(instruction, StoreInstruction):
+        opcode = Opcode.STORE
+        operands = ((1, instruction.src_reg), (0, instruction.offset_reg))
+        base = instruction.base
+    elif isinstance(instruction, JumpInstruction):
+        opcode = Opcode.JUMP
+        operands = ()
+        base = instruction.address
+    elif isinstance(instruction, BranchInstruction):
+        opcode = Opcode.BRANCH
+        operands = ((0, instruction.OP1), (1, instruction.OP2))
+        result = instruction.result
+        base = instruction.address
+    elif isinstance(instruction, TWO_OPERANDS):
+        opcode = Opcode.ALU
+        operands = ((0, instruction.OP1), (1, instruction.OP2))
+        dst_reg = instruction.dst_reg
+        result = instruction.result
+    else:
+        raise ValueError("Instruction type unsupported: {}".format(type(instruction)))
+
+    for _, operand in operands:
+        if not isinstance(operand, (Register, int)):
+            raise Exception("Operand type incorrect")
+
+    return DecodedInstruction(opcode, rs_class, latency, operands,
+                              dst_reg.index if dst_reg is not None else None,
+                              isinstance(instruction, ControlFlowInstruction), result, base)
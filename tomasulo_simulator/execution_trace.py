@@ -1,41 +1,70 @@
 from collections import namedtuple
 from json import JSONEncoder
 
-from . import functional_unit, reservation_station
-from .instruction import Instruction
-
 RSUnavailableHazard = namedtuple("RSUnavailableHazard", "detected_at solved_at assigned_rs")
 FUUnavailableHazard = namedtuple("FUUnavailableHazard", "detected_at solved_at assigned_fu")
 CDBUnavailableHazard = namedtuple("CDBUnavailableHazard", "detected_at solved_at")
 MemQueueSlotUnavailableHazard = namedtuple("MemQueueSlotUnavailableHazard", "detected_at solved_at")
 RAWHazard = namedtuple("RAWHazard", "detected_at solved_at register source_rs")
+ROBFullHazard = namedtuple("ROBFullHazard", "detected_at solved_at")
+# Recorded on a mispredicted control flow instruction: from its issue to the fetch of the right path
+BranchMispredictionHazard = namedtuple("BranchMispredictionHazard", "detected_at solved_at")
+# Recorded with an instruction queue on the first instruction issued after cycles in which the queue was empty
+# and nothing was issued: the front end couldn't keep up (fetch latency, or waiting for a branch target)
+FetchStallHazard = namedtuple("FetchStallHazard", "detected_at solved_at")
+# Recorded in multi-core systems on a memory access which waited for the bus held by other transactions,
+# from the cycle it would have been granted on a free bus
+BusContentionHazard = namedtuple("BusContentionHazard", "detected_at solved_at")
+
+# Hazard types, in the order used to encode them as small integers
+HAZARD_TYPES = [RSUnavailableHazard, FUUnavailableHazard, CDBUnavailableHazard, MemQueueSlotUnavailableHazard, RAWHazard,
+                ROBFullHazard, BranchMispredictionHazard, FetchStallHazard, BusContentionHazard]
+HAZARD_TYPE_INDEX = {hazard_type: index for index, hazard_type in enumerate(HAZARD_TYPES)}
 
 
 class ExecutionTrace:
-    def __init__(self, instruction):
-        super().__init__()
+    """A dynamic instance of a static instruction.
+    One is created every time an instruction is fetched: the static instruction is shared
+    and never modified, while the timings of this execution are recorded here.
+    committed is only set by CPUs with a reorder buffer, served_by (the level of the cache hierarchy
+    which served a load or a store, see cache.py) by CPUs with caches."""
+    __slots__ = ("seq", "pc", "instruction", "hazards", "issued", "start_execution",
+                 "write_result", "written_result", "committed", "rs", "fu", "served_by")
+
+    def __init__(self, instruction, seq=None, pc=None):
+        self.seq = seq
+        self.pc = pc
         self.instruction = instruction
         self.hazards = []
         self.issued = None
         self.start_execution = None
         self.write_result = None
         self.written_result = None
+        self.committed = None
         self.rs = None
         self.fu = None
+        self.served_by = None
 
     def to_dict(self):
-        d = {}
-        for k, v in self.__dict__.items():
-            if isinstance(v, (reservation_station.ReservationStation, functional_unit.FunctionalUnit)):
-                d[k] = v.id
-            elif isinstance(v, Instruction):
-                d[k] = str(v)
-            else:
-                d[k] = v
-        return d
+        return {
+            "seq": self.seq,
+            "pc": self.pc,
+            "instruction": str(self.instruction),
+            "hazards": self.hazards,
+            "issued": self.issued,
+            "start_execution": self.start_execution,
+            "write_result": self.write_result,
+            "written_result": self.written_result,
+            "committed": self.committed,
+            "rs": self.rs.id if self.rs is not None else None,
+            "fu": self.fu.id if self.fu is not None else None,
+            "served_by": self.served_by,
+        }
+
+    def __repr__(self):
+        return "#{}: {}".format(self.seq, self.instruction)
 
 
 class ExecutionTraceSerializer(JSONEncoder):
     def default(self, obj):
         return obj.__repr__()
-
@@ -0,0 +1,171 @@
+"""Functional simulation: executes the program instruction by instruction, without any timing.
+
+FunctionalCPU computes the same results as the detailed CPUs (it uses the result() methods of the
+instructions) at millions of instructions per second, to skip the parts of a long program whose timing isn't interesting:
+
+    functional = FunctionalCPU(instructions, config)
+    functional.run(until_pc=..., max_instructions=..., until_breakpoint=True)
+    cpu = CycleCPU(env, instructions, config)
+    functional.hand_off(cpu)              # the detailed simulation starts from the same state
+    ...
+    FunctionalCPU.from_cpu(cpu).run()     # and once it's over (e.g. stopped at a BREAK), back to functional
+
+A BREAK marks a region of interest: run(until_breakpoint=True) stops right after it, and a detailed CPU
+whose breakpoint handler calls cpu.stop_fetching() stops at the next one."""
+import sys
+
+from tomasulo_simulator.cpu_config import CpuConfig
+from tomasulo_simulator.decoder import Opcode, decode_program
+from tomasulo_simulator.instruction.register import PC, Register, register_index
+from tomasulo_simulator.registerfile import RegisterFile
+
+# Why run() stopped
+HALTED = "halt"
+BREAKPOINT = "breakpoint"
+PC_REACHED = "pc"
+COUNT_REACHED = "count"
+OUT_OF_RANGE = "pc out of range"
+
+_ALU = Opcode.ALU
+_BRANCH = Opcode.BRANCH
+_LOAD = Opcode.LOAD
+_STORE = Opcode.STORE
+_JUMP = Opcode.JUMP
+_HALT = Opcode.HALT
+
+
+class FunctionalCPU:
+    """Registers, memory and PC of a CPU, and an interpreter of its program.
+
+    The records of decoder.py are flattened into (opcode, function, a, b, c) tuples. Immediate operands are
+    given a slot of their own after the registers, so every operand is read from the same list."""
+    def __init__(self, instructions, config: CpuConfig):
+        self._instructions = instructions
+        self.config = config
+        # Validates the registers, and gives their names
+        self.reg_file = RegisterFile(None, None, config.gp_registers, config.fp_registers)
+        self.memory = [0] * config.mem_size
+        self.executed_instructions = 0
+
+        self._slots = list(self.reg_file.values)
+        self._constants = {}
+        self._code = [self._decode(instruction, decoded)
+                      for instruction, decoded in zip(instructions, decode_program(instructions, config))]
+
+    @classmethod
+    def from_cpu(cls, cpu):
+        """Takes over from a detailed CPU, once no instruction is in flight"""
+        functional = cls(cpu._instructions, cpu.config)
+        registers = cpu.reg_file.values
+        if not all(isinstance(value, int) for value in registers):
+            raise ValueError("Some registers are still waiting for a reservation station")
+        functional.registers = registers
+        functional.memory = list(cpu.memory._memory)
+        return functional
+
+    def hand_off(self, cpu):
+        """Gives the registers and the memory to a detailed CPU, which hasn't started yet"""
+        cpu.load_state(self.registers, self.memory)
+
+    @property
+    def registers(self):
+        """Values of the register file, indexed like RegisterFile.values"""
+        return self._slots[:len(self.reg_file.values)]
+
+    @registers.setter
+    def registers(self, values):
+        self._slots[:len(values)] = values
+
+    @property
+    def pc(self):
+        return self._slots[PC]
+
+    def _operand(self, operand):
+        """Slot holding the value of the operand"""
+        if isinstance(operand, Register):
+            return operand.index
+        if not isinstance(operand, int):
+            raise Exception("Operand type incorrect")
+        slot = self._constants.get(operand)
+        if slot is None:
+            slot = self._constants[operand] = len(self._slots)
+            self._slots.append(operand)
+        return slot
+
+    def _decode(self, instruction, decoded):
+        opcode = decoded.opcode
+        if opcode is _HALT or opcode is Opcode.BREAKPOINT:
+            return opcode, None, None, None, None
+
+        self.reg_file.check_registers(instruction)
+        # Operands by index: OP1 and OP2, or the offset register and the source register of stores
+        operands = dict(decoded.operands)
+        if opcode is _ALU:
+            return opcode, decoded.result, decoded.dst_index, self._operand(operands[0]), self._operand(operands[1])
+        if opcode is _BRANCH:
+            return opcode, decoded.result, None, self._operand(operands[0]), self._operand(operands[1])
+        if opcode is _JUMP:
+            return opcode, None, decoded.base, None, None
+        if opcode is _LOAD:
+            return opcode, None, decoded.dst_index, self._operand(operands[0]), decoded.base
+        return opcode, None, self._operand(operands[1]), self._operand(operands[0]), decoded.base
+
+    def run(self, until_pc=None, max_instructions=None, until_breakpoint=True):
+        """Executes instructions until the PC is until_pc (before executing it), max_instructions have been
+        executed, a BREAK has been executed (if until_breakpoint) or the program halts.
+        Returns why it stopped (HALTED, BREAKPOINT, PC_REACHED, COUNT_REACHED or OUT_OF_RANGE).
+        Like in the detailed CPUs, the PC is left after a HLT, or on an address outside of the program"""
+        slots = self._slots
+        memory = self.memory
+        code = self._code
+        pc = slots[PC]
+        stop_pc = -1 if until_pc is None else until_pc
+        limit = sys.maxsize if max_instructions is None else max_instructions
+        remaining = limit
+        reason = None
+
+        while True:
+            if pc == stop_pc:
+                reason = PC_REACHED
+                break
+            if remaining == 0:
+                reason = COUNT_REACHED
+                break
+            try:
+                operation, function, a, b, c = code[pc]
+            except IndexError:
+                reason = OUT_OF_RANGE
+                break
+            if operation is _ALU:
+                slots[a] = function(slots[b], slots[c])
+                pc += 1
+            elif operation is _BRANCH:
+                pc = function(slots[b], slots[c], pc + 1)
+            elif operation is _LOAD:
+                slots[a] = memory[slots[b] + c]
+                pc += 1
+            elif operation is _STORE:
+                memory[slots[b] + c] = slots[a]
+                pc += 1
+            elif operation is _JUMP:
+                pc = a
+            elif operation is _HALT:
+                pc += 1
+                reason = HALTED
+                break
+            else:
+                pc += 1
+                if until_breakpoint:
+                    reason = BREAKPOINT
+                    break
+                continue
+            remaining -= 1
+
+        slots[PC] = pc
+        self.executed_instructions += limit - remaining
+        return reason
+
+    def __repr__(self):
+        registers = ", ".join("{}: {}".format(name, self._slots[register_index(name)])
+                              for name in self.reg_file.names)
+        return "Functional CPU | {} instructions | Registers: {}".format(self.executed_instructions, registers)
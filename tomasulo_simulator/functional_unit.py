@@ -13,18 +13,10 @@ class FunctionalUnit(ABC):
 
 
 class AluFU(FunctionalUnit):
-    id_autoincrement = 1
-
-    def __init__(self):
-        id = "ALU" + str(AluFU.id_autoincrement)
-        AluFU.id_autoincrement += 1
-        super().__init__(id)
+    def __init__(self, number):
+        super().__init__("ALU" + str(number))
 
 
 class MemFU(FunctionalUnit):
-    id_autoincrement = 1
-
-    def __init__(self):
-        id = "MEM" + str(MemFU.id_autoincrement)
-        MemFU.id_autoincrement += 1
-        super().__init__(id)
+    def __init__(self, number):
+        super().__init__("MEM" + str(number))
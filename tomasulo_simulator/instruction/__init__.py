@@ -10,3 +10,4 @@ from .integer_instructions import IntegerInstruction, AddInstruction, SubInstruc
 from .label import Label
 from .logic_instructions import LogicInstruction, AndlInstruction, OrlInstruction
 from .mem_instructions import MemInstruction, LoadInstruction, StoreInstruction
+from .register import Register, register_index, resolve_registers
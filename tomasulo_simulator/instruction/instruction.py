@@ -4,16 +4,11 @@ from ..cpu_config import CpuConfig
 
 
 class Instruction(ABC):
-    incremental_id = 1
-
+    """A static instruction, as assembled.
+    It is shared by all of its dynamic instances (see ExecutionTrace) and not modified during the simulation."""
     def __init__(self):
-        from ..execution_trace import ExecutionTrace
-
-        self.id = Instruction.incremental_id
-        Instruction.incremental_id += 1
-
-        # Variables used for execution tracing
-        self.stats = ExecutionTrace(self)
+        # Numbered from 1 in each program, by the assembler
+        self.id = None
 
     @property
     @abstractmethod
@@ -0,0 +1,53 @@
+"""Register operands, resolved by the assembler to their slot in the register file.
+
+The slots don't depend on the number of registers of the CPU, so a program can be assembled once and
+simulated with any configuration: PC is slot 0, then general purpose and floating point registers
+alternate (R0, F0, R1, F1, ...). Whether a register exists in a given CPU is checked by the register file."""
+
+PC = 0
+
+# Operand fields of the instructions which may hold a register name
+REGISTER_FIELDS = ("dst_reg", "OP1", "OP2", "offset_reg", "src_reg")
+
+
+def register_index(reg_name):
+    """Returns the slot of a register (case insensitive name), or raises KeyError"""
+    reg_name = reg_name.upper()
+    if reg_name == "PC":
+        return PC
+    try:
+        number = int(reg_name[1:])
+    except ValueError:
+        raise KeyError("Register {} is not valid".format(reg_name))
+    if number < 0:
+        raise KeyError("Register {} is not valid".format(reg_name))
+    if reg_name[0] == "R":
+        return 1 + 2 * number
+    if reg_name[0] == "F":
+        return 2 + 2 * number
+    raise KeyError("Register {} is not valid".format(reg_name))
+
+
+def register_slots(general_purpose_regs, floating_point_regs):
+    """Number of slots of a register file with the given registers"""
+    return 1 + 2 * max(general_purpose_regs, floating_point_regs)
+
+
+class Register(str):
+    """A register operand: its name, which is what the rest of the simulator sees,
+    and its slot in the register file (index)"""
+    def __new__(cls, reg_name):
+        register = super().__new__(cls, reg_name.upper())
+        register.index = register_index(reg_name)
+        return register
+
+    def __reduce__(self):
+        return Register, (str(self),)
+
+
+def resolve_registers(instruction):
+    """Replaces the register names in the operands of the instruction with Registers"""
+    for field in REGISTER_FIELDS:
+        value = getattr(instruction, field, None)
+        if isinstance(value, str) and not isinstance(value, Register):
+            setattr(instruction, field, Register(value))
@@ -1,15 +1,162 @@
+"""Simulation logging.
+
+Components get a log function with get_logger(env, name). Whether it logs anything is decided
+when it is created, from the level of the component: a disabled logger is a no-op which doesn't
+format its message nor read the simulation time, so the configuration has to be done (with
+configure()) before building the CPU. A CPU can also be given its own LogConfig (log_config=...),
+which its components use instead of the one set by configure().
+
+Log records are handed to one or more sinks: StdoutSink prints them like the simulator always did,
+JsonlSink writes them as JSON lines and RingBufferSink keeps the most recent ones in memory."""
+import json
+import re
+from collections import deque, namedtuple
+from logging import DEBUG, INFO, WARNING, ERROR
+
+OFF = ERROR + 10
+
+LEVELS = {
+    "debug": DEBUG,
+    "info": INFO,
+    "warning": WARNING,
+    "error": ERROR,
+    "off": OFF,
+}
+
+LEVEL_NAMES = {level: name for name, level in LEVELS.items()}
+
+LogRecord = namedtuple("LogRecord", "time component level msg fmtargs")
+
+
 def get_log_str(env, name, msg, *fmtargs):
+    return format_log_line(env.now, name, msg.format(*fmtargs))
+
+
+def format_log_line(time, name, message):
     if name is None:
-        return "CLK {:>3n} | {}".format(env.now, msg.format(*fmtargs))
+        return "CLK {:>3n} | {}".format(time, message)
     else:
-        return "CLK {:>3n} | {:>6s} | {}".format(env.now, name, msg.format(*fmtargs))
+        return "CLK {:>3n} | {:>6s} | {}".format(time, name, message)
 
 
 def log_with_time(env, name, msg, *fmtargs):
     print(get_log_str(env, name, msg, *fmtargs))
 
 
-def get_logger(env, name):
-    def log(msg, *fmtargs):
-        print(get_log_str(env, name, msg, *fmtargs))
-    return log
+def parse_level(level):
+    """Converts a level name (case insensitive) or number to a level number"""
+    if isinstance(level, int):
+        return level
+    try:
+        return LEVELS[level.lower()]
+    except KeyError:
+        raise ValueError("Unknown log level {} (valid levels: {})".format(level, ", ".join(LEVELS)))
+
+
+class StdoutSink:
+    """Prints the records on stdout, as 'CLK <time> | <component> | <message>'"""
+    def __call__(self, record):
+        print(format_log_line(record.time, record.component, record.msg.format(*record.fmtargs)))
+
+    def close(self):
+        pass
+
+
+class JsonlSink:
+    """Writes the records to a file, one JSON object per line"""
+    def __init__(self, path):
+        self._file = open(path, "w")
+
+    def __call__(self, record):
+        self._file.write(json.dumps({
+            "time": record.time,
+            "component": record.component,
+            "level": LEVEL_NAMES.get(record.level, record.level),
+            "message": record.msg.format(*record.fmtargs),
+        }))
+        self._file.write("\n")
+
+    def close(self):
+        self._file.close()
+
+
+class RingBufferSink:
+    """Keeps the last `capacity` records in memory.
+    Messages are only formatted when read, with lines(): log a snapshot of the objects that change
+    during the simulation (e.g. str(cpu.reg_file)), not the objects themselves."""
+    def __init__(self, capacity=10000):
+        self.records = deque(maxlen=capacity)
+
+    def __call__(self, record):
+        self.records.append(record)
+
+    def lines(self):
+        return [format_log_line(r.time, r.component, r.msg.format(*r.fmtargs)) for r in self.records]
+
+    def clear(self):
+        self.records.clear()
+
+    def close(self):
+        pass
+
+
+class LogConfig:
+    """Log levels and sinks.
+
+    Components are matched by name (e.g. "AluRS1"), then by name without the trailing
+    number (e.g. "AluRS"), and fall back to the default level."""
+    def __init__(self, level=INFO, components=None, sinks=None):
+        self.level = parse_level(level)
+        self.components = {name: parse_level(lvl) for name, lvl in (components or {}).items()}
+        self.sinks = [StdoutSink()] if sinks is None else list(sinks)
+
+    def level_of(self, name):
+        if name in self.components:
+            return self.components[name]
+        kind = re.sub(r"\d+$", "", name)
+        return self.components.get(kind, self.level)
+
+    def is_enabled(self, name, level=INFO):
+        return bool(self.sinks) and level >= self.level_of(name)
+
+    def get_logger(self, env, name, level=INFO):
+        if not self.is_enabled(name, level):
+            return _disabled
+
+        sinks = self.sinks
+        if len(sinks) == 1 and isinstance(sinks[0], StdoutSink):
+            def log(msg, *fmtargs):
+                print(get_log_str(env, name, msg, *fmtargs))
+        else:
+            def log(msg, *fmtargs):
+                record = LogRecord(env.now, name, level, msg, fmtargs)
+                for sink in sinks:
+                    sink(record)
+        return log
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+
+
+def _disabled(msg, *fmtargs):
+    pass
+
+
+_config = LogConfig()
+
+
+def configure(level=INFO, components=None, sinks=None):
+    """Sets the log configuration used by the components created from now on, and returns it"""
+    global _config
+    _config = LogConfig(level, components, sinks)
+    return _config
+
+
+def get_config():
+    return _config
+
+
+def get_logger(env, name, level=INFO, config=None):
+    """Returns the log function of a component, from the given LogConfig or the one set by configure()"""
+    return (config if config is not None else _config).get_logger(env, name, level)
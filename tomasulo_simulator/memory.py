@@ -2,23 +2,25 @@ import simpy
 
 from tomasulo_simulator import execution_trace as etrace
 from tomasulo_simulator.cpu_config import CpuConfig
-from tomasulo_simulator.instruction import StoreInstruction
+from tomasulo_simulator.decoder import Opcode
 from tomasulo_simulator.log_utils import get_logger
 
 
 class Memory:
-    def __init__(self, env, config: CpuConfig, default_val=0):
+    def __init__(self, env, config: CpuConfig, default_val=0, log_config=None):
         self.env = env
         self._access_queue = simpy.Store(env, config.mem_access_queue_size)
         self._access_queue_pop_event = simpy.Event(env)
-        self._accesses_in_execution = simpy.FilterStore(env)
-        self._accesses_in_execution_pop_event = simpy.Event(env)
+        # Address -> reservation stations accessing it, in program order (the order their address is resolved)
+        self._accesses_in_execution = {}
+        # Address -> event triggered when an access to it completes, created when someone waits for it
+        self._access_complete_events = {}
 
         self.id = "MEM"
         self._memory = [default_val] * config.mem_size
-        self._log = get_logger(env, self.id)
+        self._log = get_logger(env, self.id, config=log_config)
 
-    def enqueue_memory_access(self, rs, instruction):
+    def enqueue_memory_access(self, rs, trace):
         # FIXME
         # this code sucks a bit, but it's necessary to detect
         # structural hazards immediately to print them in order.
@@ -38,13 +40,13 @@ class Memory:
         if req in results:
             hazard = False
         else:
-            self._log("Structural hazard: no slots in the memory access queue available for {}", instruction)
+            self._log("Structural hazard: no slots in the memory access queue available for {}", trace.instruction)
             hazard = True
             yield req
 
         if hazard:
             self._log("Structural hazard solved, found a slot in the mem access queue")
-            instruction.stats.hazards.append(etrace.MemQueueSlotUnavailableHazard(req_start, self.env.now))
+            trace.hazards.append(etrace.MemQueueSlotUnavailableHazard(req_start, self.env.now))
 
     def wait_for_queue_turn(self, rs):
         current_rs = self._access_queue.items[0]
@@ -58,42 +60,51 @@ class Memory:
             raise Exception("Wrong order!")
 
         ev, self._access_queue_pop_event = self._access_queue_pop_event, simpy.Event(self.env)
-        yield self._accesses_in_execution.put(rs)
+        self._accesses_in_execution.setdefault(rs.address, []).append(rs)
+        # Takes one event, so simultaneous accesses keep their order
+        yield self.env.timeout(0)
         ev.succeed()
 
     def _has_to_wait_for_stores(self, rs):
-        # FIXME: I suspect there's a potential deadlock if more than two dependent instructions get queued up
-        # Should check only the addreses of reservation stations which had their instruction issued before ours
-        for other_rs in self._accesses_in_execution.items:
-            if (other_rs != rs and
-                    isinstance(other_rs.instruction, StoreInstruction) and
-                    other_rs.address == rs.address):
+        """A load waits for the older stores to its address"""
+        for other_rs in self._accesses_in_execution[rs.address]:
+            if other_rs is rs:
+                return False
+            if other_rs.decoded.opcode is Opcode.STORE:
                 return True
         return False
 
     def wait_for_other_stores(self, rs):
-        # FIXME: I suspect there's a potential deadlock if more than two dependent instructions get queued up
-        # Should check only the addreses of reservation stations which had their instruction issued before ours
         while self._has_to_wait_for_stores(rs):
-            yield self._accesses_in_execution_pop_event
+            yield self._access_complete_event(rs.address)
 
     def _has_to_wait_for_other_accesses(self, rs):
-        for other_rs in self._accesses_in_execution.items:
-            if other_rs != rs and other_rs.address == rs.address:
-                return True
-        return False
+        """A store waits for all the older accesses to its address"""
+        return self._accesses_in_execution[rs.address][0] is not rs
 
     def wait_for_other_accesses(self, rs):
         while self._has_to_wait_for_other_accesses(rs):
-            yield self._accesses_in_execution_pop_event
+            yield self._access_complete_event(rs.address)
+
+    def _access_complete_event(self, address):
+        event = self._access_complete_events.get(address)
+        if event is None:
+            event = self._access_complete_events[address] = simpy.Event(self.env)
+        return event
 
     def memory_access_complete(self, rs):
-        if rs not in self._accesses_in_execution.items:
+        accesses = self._accesses_in_execution.get(rs.address)
+        if accesses is None or rs not in accesses:
             raise Exception("Something's wrong, please report this event as a bug")
 
-        ev, self._accesses_in_execution_pop_event = self._accesses_in_execution_pop_event, simpy.Event(self.env)
-        yield self._accesses_in_execution.get(lambda x: x == rs)
-        ev.succeed()
+        accesses.remove(rs)
+        if not accesses:
+            del self._accesses_in_execution[rs.address]
+        # Only the accesses waiting for this address are woken up
+        ev = self._access_complete_events.pop(rs.address, None)
+        yield self.env.timeout(0)
+        if ev is not None:
+            ev.succeed()
 
     def __str__(self):
         return self.id
@@ -0,0 +1,76 @@
+"""Multi-core simulation: cores of the cycle engine, each with its own program or start PC, sharing one memory
+through a bus which keeps their caches coherent with the MSI protocol (see cycle/bus.py):
+
+    env = CycleEnvironment()
+    system = MultiCoreSystem(env, [instructions] * 4, config, start_pcs=[0, 10, 20, 30])
+    system.run()
+    env.run()
+    stats = system.statistics()
+
+The cores run in the same environment, so they share the clock. The bus (latencies and line size) and the
+size of the memory are taken from the configuration of the first core."""
+from collections import namedtuple
+
+from tomasulo_simulator import analytics
+from tomasulo_simulator import execution_trace as etrace
+from tomasulo_simulator.cycle import CycleCPU
+from tomasulo_simulator.cycle.bus import Bus
+from tomasulo_simulator.instruction.register import PC
+
+# cycles is the cycle after the last instruction of the core retired, bus_stall_cycles the cycles its memory
+# accesses waited for the bus held by other transactions
+CoreStatistics = namedtuple("CoreStatistics", "core instructions cycles ipc hits misses bus_stall_cycles")
+# ipc is the aggregate of all the cores, bus_utilization the fraction of the cycles the bus was held
+MultiCoreStatistics = namedtuple("MultiCoreStatistics", "cycles instructions ipc cores bus_utilization "
+                                                        "transactions invalidations flushes")
+
+
+class MultiCoreSystem:
+    def __init__(self, env, programs, configs, start_pcs=None, breakpoint_handler=None, log_config=None):
+        """programs has the instructions of every core, configs is a CpuConfig for every core or one for all
+        of them. The cores start from the PCs in start_pcs (0 by default), and log with log_config if given"""
+        if not programs:
+            raise ValueError("A multi-core system needs at least one core")
+        if not isinstance(configs, (list, tuple)):
+            configs = [configs] * len(programs)
+        if start_pcs is None:
+            start_pcs = [0] * len(programs)
+        if not len(programs) == len(configs) == len(start_pcs):
+            raise ValueError("Every core needs a program, a configuration and a start PC")
+        for config in configs:
+            if config.mem_size != configs[0].mem_size:
+                raise ValueError("The cores must have the same memory size")
+
+        self.env = env
+        self.bus = Bus(configs[0])
+        self.cores = [CycleCPU(env, instructions, config, breakpoint_handler, bus=self.bus, log_config=log_config)
+                      for instructions, config in zip(programs, configs)]
+        for core, pc in zip(self.cores, start_pcs):
+            core.reg_file.values[PC] = pc
+            core._committed[PC] = pc
+
+    def run(self):
+        """Schedules the processes of the cores"""
+        for core in self.cores:
+            self.env.process(core.run())
+
+    def statistics(self):
+        cycles = self.env.now
+        cores = []
+        for core in self.cores:
+            traces = core.executed_instructions
+            throughput = analytics.throughput(traces)
+            core_cycles = min(throughput.cycles, cycles)
+            stalls = analytics.stall_breakdown(traces, cycles)
+            bus_stalls = stalls[etrace.HAZARD_TYPE_INDEX[etrace.BusContentionHazard]]
+            cores.append(CoreStatistics(core.core_id, throughput.instructions, core_cycles,
+                                        throughput.instructions / core_cycles if core_cycles else None,
+                                        self.bus.hits[core.core_id], self.bus.misses[core.core_id],
+                                        bus_stalls.stall_cycles))
+        instructions = sum(core.instructions for core in cores)
+        return MultiCoreStatistics(cycles, instructions, instructions / cycles if cycles else None, cores,
+                                   self.bus.busy_cycles / cycles if cycles else None, dict(self.bus.transactions),
+                                   self.bus.invalidations, self.bus.flushes)
+
+    def __repr__(self):
+        return "\n".join("Core {}: {}".format(core.core_id, core) for core in self.cores)
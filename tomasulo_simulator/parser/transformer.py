@@ -0,0 +1,148 @@
+from lark import Transformer, v_args
+
+from ..instruction import HaltInstruction
+from ..instruction import BreakpointInstruction
+from ..instruction import Label
+from ..instruction.bitwise_instructions import AndInstruction, OrInstruction
+from ..instruction import (
+    BEQInstruction, BNEInstruction,
+    BLTInstruction, BLEInstruction,
+    BGTInstruction, BGEInstruction,
+    JumpInstruction
+)
+from ..instruction.floating_instructions import FAddInstruction, FSubInstruction
+from ..instruction.integer_instructions import AddInstruction, SubInstruction
+from ..instruction.logic_instructions import AndlInstruction, OrlInstruction
+from ..instruction import LoadInstruction, StoreInstruction
+
+# Opcode -> instruction class
+ALU_OPCODES = {
+    "ADD": AddInstruction,
+    "SUB": SubInstruction,
+    "AND": AndInstruction,
+    "OR": OrInstruction,
+    "ANDL": AndlInstruction,
+    "ORL": OrlInstruction,
+}
+
+FP_ALU_OPCODES = {
+    "FADD": FAddInstruction,
+    "FSUB": FSubInstruction,
+}
+
+BRANCH_OPCODES = {
+    "BEQ": BEQInstruction,
+    "BNE": BNEInstruction,
+    "BLT": BLTInstruction,
+    "BLE": BLEInstruction,
+    "BGT": BGTInstruction,
+    "BGE": BGEInstruction,
+}
+
+
+class Constant:
+    """A reference to a constant, replaced by its value by the Parser"""
+    __slots__ = ("name",)
+
+    def __init__(self, name):
+        self.name = name
+
+
+class ConstDeclaration:
+    __slots__ = ("name", "value")
+
+    def __init__(self, name, value):
+        self.name = name
+        self.value = value
+
+
+def _operand(token):
+    if token.type == "IMMEDIATE":
+        return int(token)
+    if token.type == "CONSTNAME":
+        return Constant(str(token))
+    return token.upper()
+
+
+@v_args(inline=True)
+class ProgramTransformer(Transformer):
+    """Turns each rule into its value while the LALR parser reduces it, so no parse tree is built.
+
+    Instructions become (instruction class, constructor arguments) and are instantiated by the Parser,
+    which resolves the constants in program order."""
+    def start(self, directives, instructions):
+        return directives, instructions
+
+    def directives(self, *directives):
+        return dict(directives)
+
+    def directive(self, name, value):
+        # Numbers, or names (e.g. the branch predictor)
+        return name.lstrip("."), int(value) if value.type == "NUMBER" else str(value)
+
+    def instructions(self, *instructions):
+        return list(instructions)
+
+    def alu_instruction(self, operation, dst, op1, op2):
+        return ALU_OPCODES[operation], (dst, op1, op2)
+
+    def fp_alu_instruction(self, operation, dst, op1, op2):
+        return FP_ALU_OPCODES[operation], (dst, op1, op2)
+
+    def branch_instruction(self, operation, op1, op2, label):
+        return BRANCH_OPCODES[operation], (op1, op2, label)
+
+    def jump_instruction(self, label):
+        return JumpInstruction, (label,)
+
+    def load_instruction(self, dst, address):
+        return LoadInstruction, (dst,) + address
+
+    def store_instruction(self, src, address):
+        return StoreInstruction, (src,) + address
+
+    def halt_instruction(self):
+        return HaltInstruction, ()
+
+    def break_instruction(self):
+        return BreakpointInstruction, ()
+
+    def label_declaration(self, label):
+        return Label(str(label))
+
+    def const_declaration(self, name, value):
+        return ConstDeclaration(str(name), int(value))
+
+    # Address: (offset register, base)
+    def immediate_address(self, immediate):
+        return "R0", immediate
+
+    def reg_immediate_address(self, first, second):
+        if isinstance(first, str):
+            return first, second
+        return second, first
+
+    def alu_op(self, token):
+        return token.upper()
+
+    fp_alu_op = alu_op
+    branch_op = alu_op
+
+    def label(self, token):
+        # A plain string, so the assembled program can be unpickled without Lark
+        return str(token)
+
+    def dst_register(self, token):
+        return token.upper()
+
+    src_register = dst_register
+    register = dst_register
+    fp_dst_register = dst_register
+
+    def operand1(self, token):
+        return _operand(token)
+
+    operand2 = operand1
+    fp_operand1 = operand1
+    fp_operand2 = operand1
+    immediate = operand1
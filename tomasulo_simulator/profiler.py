@@ -0,0 +1,301 @@
+"""Profiling of the simulator itself: where the wall-clock time of a simulation goes.
+
+A Profiler attached to a CPU replaces the methods of its components (the CDB, register file,
+memory, reservation stations and the CPU itself) with wrappers that count the calls, the SimPy
+events scheduled and the time spent in them. Generators (SimPy processes) are timed one step at a
+time, so the time they spend waiting for their events isn't counted. Nothing is wrapped on a CPU
+without a Profiler attached, so a normal simulation doesn't pay for any of this.
+
+Every profiled method belongs to a phase of the pipeline: fetch, issue, operand wait, execute or
+writeback. The time spent elsewhere (in SimPy, or in the main loop of the cycle engine) is
+reported as "scheduler".
+
+Usage:
+    profiler = Profiler(env)
+    profiler.attach(cpu)
+    with profiler:
+        env.run()
+    profiler.report()
+    profiler.write_collapsed("profile.folded")  # for flamegraph.pl, speedscope..."""
+import inspect
+import sys
+import time
+from collections import defaultdict
+
+FETCH = "fetch"
+ISSUE = "issue"
+OPERAND_WAIT = "operand wait"
+EXECUTE = "execute"
+WRITEBACK = "writeback"
+SCHEDULER = "scheduler"
+
+PHASES = (FETCH, ISSUE, OPERAND_WAIT, EXECUTE, WRITEBACK, SCHEDULER)
+
+# Method name -> phase, for each component of the SimPy engine
+CPU_METHODS = {
+    "_dispatch": FETCH,
+    "get_reservation_station": ISSUE,
+}
+CDB_METHODS = {
+    "snoop": OPERAND_WAIT,
+    "_write": WRITEBACK,
+}
+REGISTER_FILE_METHODS = {
+    "associate_rs_with_reg": ISSUE,
+    "read_register_with_raw_detection": OPERAND_WAIT,
+}
+MEMORY_METHODS = {
+    "enqueue_memory_access": ISSUE,
+    "wait_for_queue_turn": OPERAND_WAIT,
+    "address_resolution_complete": OPERAND_WAIT,
+    "wait_for_other_stores": OPERAND_WAIT,
+    "wait_for_other_accesses": OPERAND_WAIT,
+    "memory_access_complete": EXECUTE,
+}
+RESERVATION_STATION_METHODS = {
+    "issue": ISSUE,
+    "_decode_operands": ISSUE,
+    "_wait_for_dependencies": OPERAND_WAIT,
+    "_get_functional_unit": OPERAND_WAIT,
+    "_execute": EXECUTE,
+    "_writeback": WRITEBACK,
+    # Its steps start the phases above, and the last one retires the instruction
+    "_execution_process": WRITEBACK,
+    "_reset": WRITEBACK,
+    "_return_to_cpu": WRITEBACK,
+}
+
+# Method name -> phase, for the cycle engine, which does everything in the CPU
+CYCLE_CPU_METHODS = {
+    "_dispatch": FETCH,
+    "_fetch": FETCH,
+    "_fetch_group": FETCH,
+    "_predict": FETCH,
+    "_issue_group": ISSUE,
+    "_try_issue": ISSUE,
+    "_get_rob_slot": ISSUE,
+    "_get_reservation_station": ISSUE,
+    "_enqueue_memory_access": ISSUE,
+    "_issue": ISSUE,
+    "_start_execution": OPERAND_WAIT,
+    "_complete_execution": EXECUTE,
+    "_arbitrate_cdb": WRITEBACK,
+    "_broadcast": WRITEBACK,
+    "_complete_writebacks": WRITEBACK,
+    "_complete": WRITEBACK,
+    "_recover": WRITEBACK,
+    "_commit": WRITEBACK,
+}
+
+
+class _Frame:
+    __slots__ = ("stack", "phase", "start", "events", "child_time", "child_events")
+
+    def __init__(self, stack, phase, start, events):
+        self.stack = stack
+        self.phase = phase
+        self.start = start
+        self.events = events
+        self.child_time = 0.0
+        self.child_events = 0
+
+
+class Profiler:
+    def __init__(self, env):
+        self.env = env
+        # Component (Class.method) -> number of calls
+        self.calls = defaultdict(int)
+        # Stack of components (tuple, outermost first) -> [self time, self events, phase]
+        self.stacks = {}
+        self.events = 0
+        self.wall_time = 0.0
+        self._frames = []
+        self._started_at = None
+        self._cdb = None
+
+        # SimPy schedules every event through env.schedule: count them
+        schedule = getattr(env, "schedule", None)
+        if schedule is not None:
+            def counting_schedule(*args, **kwargs):
+                self.events += 1
+                return schedule(*args, **kwargs)
+            env.schedule = counting_schedule
+        self.counts_events = schedule is not None
+
+    def attach(self, cpu):
+        """Wraps the methods of the components of the CPU (SimPy or cycle engine)"""
+        from .cycle import CycleCPU
+
+        if isinstance(cpu, CycleCPU):
+            self.wrap(cpu, CYCLE_CPU_METHODS)
+            return
+
+        self._cdb = cpu.CDB
+        self.wrap(cpu, CPU_METHODS)
+        self.wrap(cpu.CDB, CDB_METHODS)
+        self.wrap(cpu.reg_file, REGISTER_FILE_METHODS)
+        self.wrap(cpu.memory, MEMORY_METHODS)
+        for rs_store in (cpu.alu_RS, cpu.fpalu_RS, cpu.mem_RS):
+            for rs in rs_store.items:
+                self.wrap(rs, RESERVATION_STATION_METHODS)
+
+    def wrap(self, obj, methods):
+        """Replaces the methods (name -> phase) of a single object with profiled ones"""
+        for name, phase in methods.items():
+            method = getattr(obj, name)
+            component = "{}.{}".format(type(obj).__name__, name)
+            if inspect.isgeneratorfunction(method):
+                wrapper = self._wrap_generator_function(method, component, phase)
+            else:
+                wrapper = self._wrap_function(method, component, phase)
+            setattr(obj, name, wrapper)
+
+    def _wrap_function(self, function, component, phase):
+        calls = self.calls
+        enter, leave = self._enter, self._leave
+
+        def wrapper(*args, **kwargs):
+            calls[component] += 1
+            enter(component, phase)
+            try:
+                return function(*args, **kwargs)
+            finally:
+                leave()
+        return wrapper
+
+    def _wrap_generator_function(self, function, component, phase):
+        calls = self.calls
+        enter, leave = self._enter, self._leave
+
+        def wrapper(*args, **kwargs):
+            calls[component] += 1
+            generator = function(*args, **kwargs)
+            value, error = None, None
+            while True:
+                enter(component, phase)
+                try:
+                    if error is None:
+                        target = generator.send(value)
+                    else:
+                        target = generator.throw(error)
+                except StopIteration as stop:
+                    return stop.value
+                finally:
+                    leave()
+
+                try:
+                    value, error = (yield target), None
+                except GeneratorExit:
+                    generator.close()
+                    raise
+                except BaseException as e:
+                    value, error = None, e
+        return wrapper
+
+    def _enter(self, component, phase):
+        frames = self._frames
+        if frames:
+            stack = frames[-1].stack + (component,)
+        else:
+            stack = (component,)
+        frames.append(_Frame(stack, phase, time.perf_counter(), self.events))
+
+    def _leave(self):
+        frame = self._frames.pop()
+        elapsed = time.perf_counter() - frame.start
+        events = self.events - frame.events
+        self._add(frame.stack, elapsed - frame.child_time, events - frame.child_events, frame.phase)
+        if self._frames:
+            parent = self._frames[-1]
+            parent.child_time += elapsed
+            parent.child_events += events
+
+    def _add(self, stack, elapsed, events, phase):
+        totals = self.stacks.get(stack)
+        if totals is None:
+            self.stacks[stack] = [elapsed, events, phase]
+        else:
+            totals[0] += elapsed
+            totals[1] += events
+
+    def start(self):
+        self._started_at = time.perf_counter()
+
+    def stop(self):
+        """Stops measuring the wall time, and attributes what wasn't spent in a profiled method to the scheduler"""
+        elapsed = time.perf_counter() - self._started_at
+        self.wall_time += elapsed
+        profiled_time = sum(totals[0] for stack, totals in self.stacks.items() if stack != (SCHEDULER,))
+        profiled_events = sum(totals[1] for stack, totals in self.stacks.items() if stack != (SCHEDULER,))
+        self.stacks[(SCHEDULER,)] = [self.wall_time - profiled_time, self.events - profiled_events, SCHEDULER]
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def components(self):
+        """Returns the stats of every component as a list of dicts, the most expensive first.
+        total is the time spent in the component including the profiled methods it called, self excludes them"""
+        stats = {}
+        for stack, (elapsed, events, phase) in self.stacks.items():
+            component = stack[-1]
+            row = stats.get(component)
+            if row is None:
+                row = stats[component] = {"component": component, "phase": phase, "calls": self.calls.get(component, 0),
+                                          "events": 0, "self": 0.0, "total": 0.0}
+            row["events"] += events
+            row["self"] += elapsed
+        # Time of the components (no recursion) including the ones they called
+        for stack, (elapsed, _, _) in self.stacks.items():
+            for component in set(stack):
+                stats[component]["total"] += elapsed
+        return sorted(stats.values(), key=lambda row: row["self"], reverse=True)
+
+    def phases(self):
+        """Returns phase -> (time, events). Methods called by a method of another phase count in their own phase"""
+        phases = {phase: [0.0, 0] for phase in PHASES}
+        for elapsed, events, phase in self.stacks.values():
+            phases[phase][0] += elapsed
+            phases[phase][1] += events
+        return {phase: tuple(totals) for phase, totals in phases.items()}
+
+    def report(self, file=None):
+        """Prints the components, sorted by self time, and the phases"""
+        file = file if file is not None else sys.stdout
+        wall_time = self.wall_time or sum(totals[0] for totals in self.stacks.values()) or 1
+        events = "events" if self.counts_events else ""
+
+        print("{:<56} {:>9} {:>9} {:>11} {:>11} {:>6}".format("component", "calls", events, "self (ms)",
+                                                               "total (ms)", "self %"), file=file)
+        for row in self.components():
+            print("{:<56} {:>9} {:>9} {:>11.1f} {:>11.1f} {:>5.1f}%".format(
+                row["component"], row["calls"], row["events"] if self.counts_events else "",
+                row["self"] * 1000, row["total"] * 1000, row["self"] / wall_time * 100), file=file)
+
+        print("\n{:<56} {:>9} {:>9} {:>11} {:>11} {:>6}".format("phase", "", events, "time (ms)", "", "%"), file=file)
+        for phase, (elapsed, phase_events) in self.phases().items():
+            print("{:<56} {:>9} {:>9} {:>11.1f} {:>11} {:>5.1f}%".format(
+                phase, "", phase_events if self.counts_events else "", elapsed * 1000, "", elapsed / wall_time * 100),
+                file=file)
+        if self._cdb is not None:
+            cdb = self._cdb
+            print("\nCDB: {} writes, {} subscriptions, {} deliveries".format(
+                cdb.writes, cdb.subscriptions, cdb.deliveries), file=file)
+        print("\nWall time: {:.3f}s".format(self.wall_time), file=file)
+
+    def write_collapsed(self, path):
+        """Writes the stacks in the collapsed format of flamegraph.pl ('phase;component;component <microseconds>'),
+        rooted at the phase of the outermost component"""
+        with open(path, "w") as f:
+            for stack, (elapsed, _, _) in sorted(self.stacks.items()):
+                microseconds = int(round(elapsed * 1e6))
+                if microseconds <= 0:
+                    continue
+                if stack == (SCHEDULER,):
+                    line = SCHEDULER
+                else:
+                    line = ";".join((self.stacks[stack[:1]][2],) + stack)
+                f.write("{} {}\n".format(line, microseconds))
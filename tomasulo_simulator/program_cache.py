@@ -0,0 +1,69 @@
+"""On-disk cache of parsed and assembled programs.
+
+Programs are pickled to <cache dir>/<key>.pickle, where the key is a hash of the source code, of
+the grammar and of CACHE_VERSION: running the same source again loads the directives and the
+assembled instructions without parsing nor assembling them.
+When a new program has to be parsed, the parse tables of the grammar are loaded from the same
+directory (see parser.get_lark)."""
+import hashlib
+import os
+import pickle
+import tempfile
+
+from tomasulo_simulator.assembler import assemble
+from tomasulo_simulator.parser import Parser
+from tomasulo_simulator.parser.parser import GRAMMAR_VERSION
+
+# Must be incremented whenever the parser, the assembler or the instruction classes change
+CACHE_VERSION = 4
+
+
+def default_cache_dir():
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "tomasulo_simulator")
+
+
+def program_key(source):
+    key = hashlib.sha256()
+    key.update("{}:{}:".format(CACHE_VERSION, GRAMMAR_VERSION).encode())
+    key.update(source.encode())
+    return key.hexdigest()
+
+
+def load_program(source, cache_dir=None):
+    """Returns the directives and the assembled instructions of a program.
+    If cache_dir is given they are taken from the cache when possible, and stored there otherwise"""
+    if cache_dir is None:
+        return _parse_and_assemble(source, None)
+
+    path = os.path.join(cache_dir, program_key(source) + ".pickle")
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+        pass
+
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+    except OSError:
+        # The cache is an optimization: failing to use it is not an error
+        return _parse_and_assemble(source, None)
+
+    program = _parse_and_assemble(source, os.path.join(cache_dir, "grammar-{}.lark".format(GRAMMAR_VERSION)))
+    # Written to a temporary file and renamed, so concurrent runs never read a partial file
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    except OSError:
+        return program
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(program, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except OSError:
+        os.remove(tmp_path)
+    return program
+
+
+def _parse_and_assemble(source, grammar_cache):
+    directives, code = Parser(grammar_cache).parse_code(source)
+    return directives, assemble(code)
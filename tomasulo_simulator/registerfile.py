@@ -1,30 +1,45 @@
 from tomasulo_simulator import execution_trace as etrace
+from tomasulo_simulator.instruction.register import REGISTER_FIELDS, register_index, register_slots
 from tomasulo_simulator.log_utils import get_logger
 from tomasulo_simulator.reservation_station import ReservationStation
 
 
 class RegisterFile:
     """A CPU has N general purpose integer registers (R1-RN)
-    M floating point registers (F1-FM) and the progam counter (PC)"""
-    def __init__(self, env, cpu, general_purpose_regs, floating_point_regs):
+    M floating point registers (F1-FM) and the progam counter (PC).
+
+    values holds the value of each register, or the reservation station which will produce it, at the slot
+    given by the index of its Register operands (see instruction/register.py). The simulation reads and
+    writes values directly, registers can also be accessed by name (e.g. reg_file["R1"])."""
+    def __init__(self, env, cpu, general_purpose_regs, floating_point_regs, log_config=None):
         self.cpu = cpu
         self.general_purpose_regs = general_purpose_regs
         self.floating_point_regs = floating_point_regs
 
-        self.values = {}
-        for reg_number in range(general_purpose_regs):
-            self.values["R"+str(reg_number)] = 0
-        for reg_number in range(floating_point_regs):
-            self.values["F" + str(reg_number)] = 0
-        self.values["PC"] = 0
+        self.values = [0] * register_slots(general_purpose_regs, floating_point_regs)
+        self.names = (["R" + str(reg_number) for reg_number in range(general_purpose_regs)]
+                      + ["F" + str(reg_number) for reg_number in range(floating_point_regs)]
+                      + ["PC"])
 
         self.env = env
         self.id = "RF"
-        self._log = get_logger(env, self.id)
+        self._log = get_logger(env, self.id, config=log_config)
+
+    def associate_rs_with_reg(self, rs, register):
+        values = self.values
+        index = register.index
+        values[index] = rs
+        instruction = rs.instruction
 
-    def associate_rs_with_reg(self, rs, reg_name):
-        self[reg_name] = rs
-        self.env.process(self._wait_for_result_to_update_register(rs, reg_name))
+        def update_register(value):
+            self._log("Got result of {} ({}) from CDB ({})", instruction, value, rs)
+            if values[index] is rs:
+                self._log("Writing back the result to the RF")
+                values[index] = value
+            else:
+                self._log("Not writing back result (another RS is associated to the register)")
+
+        self.cpu.CDB.subscribe(rs, update_register, 2)
 
     def read_register(self, reg_name):
         src = self[reg_name]
@@ -39,8 +54,8 @@ class RegisterFile:
 
         return self.env.process(_read_register())
 
-    def read_register_with_raw_detection(self, reg_name, rs):
-        src = self[reg_name]
+    def read_register_with_raw_detection(self, register, rs):
+        src = self.values[register.index]
 
         if isinstance(src, int):
             def _read_register():
@@ -50,24 +65,24 @@ class RegisterFile:
             return self.env.process(_read_register())
         elif isinstance(src, ReservationStation):
             detected_at = self.env.now
-            process = self.cpu.CDB.snoop(src)
+            trace = rs.trace
+            event = self.env.event()
 
-            def _read_register():
-                value = yield process
-                rs.instruction.stats.hazards.append(etrace.RAWHazard(detected_at, self.env.now, reg_name, rs))
-                return value
+            def operand_ready(value):
+                trace.hazards.append(etrace.RAWHazard(detected_at, self.env.now, register, rs))
+                event.succeed(value)
 
-            return self.env.process(_read_register())
+            self.cpu.CDB.subscribe(src, operand_ready, 2)
+            return event
 
-    def _wait_for_result_to_update_register(self, rs, reg_name):
-        instruction = rs.instruction
-        value = yield self.cpu.CDB.snoop(rs)
-        self._log("Got result of {} ({}) from CDB ({})", instruction, value, rs)
-        if self[reg_name] is rs:
-            self._log("Writing back the result to the RF")
-            self[reg_name] = value
-        else:
-            self._log("Not writing back result (another RS is associated to the register)")
+    def check_registers(self, instruction):
+        """Raises KeyError if the instruction uses registers this register file doesn't have, or writes R0"""
+        for field in REGISTER_FIELDS:
+            reg_name = getattr(instruction, field, None)
+            if isinstance(reg_name, str):
+                self[reg_name]
+                if field == "dst_reg" and reg_name == "R0":
+                    raise KeyError("Cannot write register R0")
 
     def _is_valid_register(self, reg_name):
         return self._is_valid_integer_register(reg_name) \
@@ -95,17 +110,17 @@ class RegisterFile:
         return True
 
     def __getitem__(self, reg_name):
-        if type(reg_name) is not str:
+        if not isinstance(reg_name, str):
             raise KeyError("Register name must be a string")
 
         reg_name = reg_name.upper()
         if not self._is_valid_register(reg_name):
             raise KeyError("Register {} is not valid".format(reg_name))
 
-        return self.values.get(reg_name)
+        return self.values[register_index(reg_name)]
 
     def __setitem__(self, reg_name, value):
-        if type(reg_name) is not str:
+        if not isinstance(reg_name, str):
             raise KeyError("Register name must be a string")
 
         reg_name = reg_name.upper()
@@ -115,7 +130,17 @@ class RegisterFile:
         if reg_name == "R0":
             raise KeyError("Cannot write register R0")
 
-        self.values[reg_name] = value
+        self.values[register_index(reg_name)] = value
+
+    def __getstate__(self):
+        # The environment and the logger are given back by the CPU which is restored
+        state = self.__dict__.copy()
+        del state["env"], state["_log"]
+        return state
+
+    def as_dict(self):
+        """Returns register name -> value (or reservation station)"""
+        return {name: self.values[register_index(name)] for name in self.names}
 
     def __repr__(self):
-        return ", ".join(["{}: {}".format(name, val) for name, val in self.values.items()])
+        return ", ".join(["{}: {}".format(name, self.values[register_index(name)]) for name in self.names])
@@ -1,33 +1,26 @@
-from ..instruction import AluInstruction
-from ..instruction import BitwiseInstruction
-from ..instruction import BranchInstruction
-from ..instruction import ControlFlowInstruction
-from ..instruction import FloatingInstruction
-from ..instruction import IntegerInstruction
-from ..instruction import JumpInstruction
-from ..instruction import LogicInstruction
+from ..decoder import Opcode
+from ..instruction.register import PC
 from .reservation_station import ReservationStation
 
 
 class ALUReservationStation(ReservationStation):
     kind = "AluRS"
-    incremental_id = 1
 
-    def __init__(self, env, cpu, fu_store, rs_store):
-        super().__init__(env, cpu, fu_store, rs_store)
+    def __init__(self, env, cpu, number, fu_store, rs_store):
+        super().__init__(env, cpu, number, fu_store, rs_store)
         self.OP1_read = None
         self.OP2_read = None
         self.OP1_val = None
         self.OP2_val = None
 
     def _decode_operands(self):
-        if isinstance(self.instruction, (IntegerInstruction, LogicInstruction, BitwiseInstruction,
-                                         BranchInstruction, FloatingInstruction)):
-            self.OP1_read = self._read_operand(self.instruction.OP1)
-            self.OP2_read = self._read_operand(self.instruction.OP2)
+        # OP1 and OP2, except for jumps
+        reads = [self._read_operand(operand) for _, operand in self.decoded.operands]
+        if reads:
+            self.OP1_read, self.OP2_read = reads
 
         # Associate destination register with this reservation station in the RF
-        if isinstance(self.instruction, (IntegerInstruction, LogicInstruction, BitwiseInstruction, FloatingInstruction)):
+        if self.decoded.dst_index is not None:
             self.cpu.reg_file.associate_rs_with_reg(self, self.instruction.dst_reg)
 
     def _wait_for_dependencies(self):
@@ -52,34 +45,35 @@ class ALUReservationStation(ReservationStation):
         self.FU = results[fu_request]
 
     def _execute(self):
-        if isinstance(self.instruction, ControlFlowInstruction):
+        if self.decoded.is_control_flow:
             yield self.env.process(self._execute_control_flow_instruction())
-        elif isinstance(self.instruction, AluInstruction):
+        elif self.decoded.opcode is Opcode.ALU:
             yield self.env.process(self._execute_alu_instruction())
         else:
             raise ValueError("Instruction type unsupported: {}".format(type(self.instruction)))
 
     def _execute_alu_instruction(self):
-        yield self.env.timeout(self._execution_latency())
-        self.result = self.instruction.result(self.OP1_val, self.OP2_val)
+        yield self.env.timeout(self.decoded.latency)
+        self.result = self.decoded.result(self.OP1_val, self.OP2_val)
 
     def _execute_control_flow_instruction(self):
-        if isinstance(self.instruction, JumpInstruction):
+        if self.decoded.opcode is Opcode.JUMP:
             yield self.env.process(self._execute_jump_instruction())
-        elif isinstance(self.instruction, BranchInstruction):
+        elif self.decoded.opcode is Opcode.BRANCH:
             yield self.env.process(self._execute_branch_instruction())
         else:
             raise NotImplementedError()
 
     def _execute_jump_instruction(self):
         # TODO: support indirect jumps like JMP R1
-        yield self.env.timeout(self._execution_latency())
-        self.result = self.instruction.address
+        yield self.env.timeout(self.decoded.latency)
+        self.result = self.decoded.base
 
     def _execute_branch_instruction(self):
-        yield self.env.timeout(self._execution_latency())
-        self.result = self.instruction.result(self.OP1_val, self.OP2_val, self.cpu.reg_file["PC"])
-        if self.result != self.cpu.reg_file["PC"]:
+        yield self.env.timeout(self.decoded.latency)
+        pc = self.cpu.reg_file.values[PC]
+        self.result = self.decoded.result(self.OP1_val, self.OP2_val, pc)
+        if self.result != pc:
             self._log("{} TAKEN, new PC is {}", self.instruction, self.result)
         else:
             self._log("{} NOT TAKEN", self.instruction)
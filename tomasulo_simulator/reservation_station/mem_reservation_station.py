@@ -1,13 +1,12 @@
-from tomasulo_simulator.instruction import StoreInstruction, LoadInstruction
+from tomasulo_simulator.decoder import Opcode
 from .reservation_station import ReservationStation
 
 
 class MemReservationStation(ReservationStation):
     kind = "MemRS"
-    incremental_id = 1
 
-    def __init__(self, env, cpu, fu_store, rs_store):
-        super().__init__(env, cpu, fu_store, rs_store)
+    def __init__(self, env, cpu, number, fu_store, rs_store):
+        super().__init__(env, cpu, number, fu_store, rs_store)
         self.offset_read = None
         self.src_read = None
         self.offset_val = None
@@ -15,13 +14,15 @@ class MemReservationStation(ReservationStation):
         self.address = None
 
     def _decode_operands(self):
-        if isinstance(self.instruction, StoreInstruction):
-            self.src_read = self._read_operand(self.instruction.src_reg)
-
-        self.offset_read = self._read_operand(self.instruction.offset_reg)
+        # The source register of stores (1) is read before the offset register (0)
+        for index, operand in self.decoded.operands:
+            if index == 0:
+                self.offset_read = self._read_operand(operand)
+            else:
+                self.src_read = self._read_operand(operand)
 
         # Associate destination register with this reservation station in the RF
-        if isinstance(self.instruction, LoadInstruction):
+        if self.decoded.dst_index is not None:
             self.cpu.reg_file.associate_rs_with_reg(self, self.instruction.dst_reg)
 
     def _wait_for_dependencies(self):
@@ -44,20 +45,24 @@ class MemReservationStation(ReservationStation):
 
         self.FU = results[fu_request]
 
-        self.address = self.offset_val + self.instruction.base
+        self.address = self.offset_val + self.decoded.base
         yield self.env.process(self.cpu.memory.address_resolution_complete(self))
 
-        if isinstance(self.instruction, LoadInstruction):
+        if self.decoded.opcode is Opcode.LOAD:
             yield self.env.process(self.cpu.memory.wait_for_other_stores(self))
         else:
             yield self.env.process(self.cpu.memory.wait_for_other_accesses(self))
 
     def _execute(self):
-        yield self.env.timeout(self._execution_latency())
+        opcode = self.decoded.opcode
+        latency = self.decoded.latency
+        if self.cpu.caches is not None:
+            latency, self.trace.served_by = self.cpu.caches.access(self.address, opcode is Opcode.STORE)
+        yield self.env.timeout(latency)
 
-        if isinstance(self.instruction, LoadInstruction):
+        if opcode is Opcode.LOAD:
             self.result = self.cpu.memory._memory[self.address]
-        elif isinstance(self.instruction, StoreInstruction):
+        elif opcode is Opcode.STORE:
             self.cpu.memory._memory[self.address] = self.src_val
         else:
             raise ValueError("Unrecognized instruction")
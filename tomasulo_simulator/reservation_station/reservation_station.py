@@ -7,32 +7,36 @@ from tomasulo_simulator.log_utils import get_logger
 
 class ReservationStation(ABC):
     kind = "RS"
-    incremental_id = 1
 
-    def __init__(self, env, cpu, fu_store, rs_store):
-        self.id = self.__class__.kind + str(self.__class__.incremental_id)
-        self.__class__.incremental_id += 1
+    def __init__(self, env, cpu, number, fu_store, rs_store):
+        """number tells apart the reservation stations of the same kind in the CPU (e.g. AluRS2)"""
+        self.id = self.__class__.kind + str(number)
 
         self.env = env
         self.cpu = cpu
 
+        # Static instruction, its DecodedInstruction (see decoder.py) and its dynamic instance
         self.instruction = None
+        self.decoded = None
+        self.trace = None
         self.FU = None
         self.result = None
 
         self.fu_store = fu_store
         self.rs_store = rs_store
 
-        self._log = get_logger(env, self.id)
+        self._log = get_logger(env, self.id, config=cpu.log_config)
 
-    def issue(self, instruction):
-        """Issues an instruction to the reservation station,
+    def issue(self, trace, decoded):
+        """Issues a dynamic instruction to the reservation station,
         and returns a process which terminates when execution is complete"""
-        self.instruction = instruction
+        self.instruction = trace.instruction
+        self.decoded = decoded
+        self.trace = trace
 
         # Log instruction issue
-        instruction.stats.issued = self.env.now
-        instruction.stats.rs = self
+        trace.issued = self.env.now
+        trace.rs = self
 
         # Immediately decode the operands
         self._decode_operands()
@@ -67,17 +71,17 @@ class ReservationStation(ABC):
 
         # Log start of execution
         self._log("Starting execution phase of {}", self.instruction)
-        self.instruction.stats.start_execution = self.env.now
-        self.instruction.stats.fu = self.FU
+        self.trace.start_execution = self.env.now
+        self.trace.fu = self.FU
         yield self.env.process(self._execute())
 
         self._log("End execution of {}, starting writeback phase", self.instruction)
         yield self.env.process(self._writeback())
 
-        self.instruction.stats.written_result = self.env.now
+        self.trace.written_result = self.env.now
 
         # Append the instruction to the execution trace list
-        self.cpu.executed_instructions.append(self.instruction)
+        self.cpu.executed_instructions.append(self.trace)
 
         fu = self.FU
         # Reset RS before releasing it
@@ -113,7 +117,7 @@ class ReservationStation(ABC):
 
         if hazard:
             self._log("Structural hazard solved: obtained {} for {}", obtained_fu, self.instruction)
-            self.instruction.stats.hazards.append(etrace.FUUnavailableHazard(store_req_start, self.env.now, obtained_fu))
+            self.trace.hazards.append(etrace.FUUnavailableHazard(store_req_start, self.env.now, obtained_fu))
 
         return obtained_fu
 
@@ -130,27 +134,12 @@ class ReservationStation(ABC):
         raise NotImplementedError()
 
     def _writeback(self):
-        self.instruction.stats.write_result = self.env.now
+        self.trace.write_result = self.env.now
         if self.result is not None:
             yield self.cpu.CDB.write_with_conflict_detection(self, self.result, self)
         else:
             yield self.env.timeout(1)
 
-    def _execution_latency(self):
-        instruction_latency = self.instruction.latency(self.cpu.config)
-        if instruction_latency is not None:
-            return instruction_latency
-
-        for c in self.__class__.__mro__:
-            if c is ReservationStation:
-                raise Exception("Latency not defined for instruction {}".format(self.instruction.mnemonic))
-
-            latency = self.cpu.config[self.kind.lower() + "_execution_latency"]
-            if latency is not None:
-                return latency
-
-        raise Exception("Latency not defined for instruction {}".format(self.instruction.mnemonic))
-
     def _return_to_cpu(self, fu):
         """Returns itself and the functional unit to the CPU after execution is complete"""
         return self.env.all_of([self.fu_store.put(fu), self.rs_store.put(self)])
@@ -158,6 +147,8 @@ class ReservationStation(ABC):
     @abstractmethod
     def _reset(self):
         self.instruction = None
+        self.decoded = None
+        self.trace = None
         self.FU = None
         self.result = None
 
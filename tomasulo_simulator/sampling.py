@@ -0,0 +1,125 @@
+"""Sampled simulation (SMARTS): estimates the CPI of a long program by simulating in detail only short
+windows of it, spread periodically over the whole execution.
+
+The program is executed by the functional simulator (see functional.py). Every period instructions, a
+detailed CPU is started from the functional state: it simulates warmup instructions, to fill the
+reservation stations, the memory access queue and the reorder buffer (and to train the branch predictor),
+then the window whose CPI is measured. The functional simulator executes the same instructions and goes on
+to the next sample, so the detailed CPUs only measure timings and never change the architectural state.
+
+The CPI of the program is estimated as the mean CPI of the samples, with a confidence interval from their
+standard deviation (central limit theorem). If the interval is too wide, sample more often."""
+import math
+import statistics
+import time
+from collections import namedtuple
+
+from simpy.core import EmptySchedule
+
+from tomasulo_simulator import ENGINES
+from tomasulo_simulator.cpu_config import CpuConfig
+from tomasulo_simulator.functional import FunctionalCPU, COUNT_REACHED
+
+DEFAULT_WINDOW = 1000
+DEFAULT_WARMUP = 2000
+DEFAULT_CONFIDENCE = 0.95
+
+# cpi_low/cpi_high bound the confidence interval of the CPI (None with less than two samples),
+# error is its half-width relative to the CPI, speedup is the estimated speed-up over a detailed simulation
+SamplingResult = namedtuple("SamplingResult", "instructions samples detailed_instructions cpi cpi_low cpi_high "
+                                              "ipc ipc_low ipc_high confidence error cycles wall_time speedup")
+
+
+def sampled_simulation(instructions, config: CpuConfig, period, window=DEFAULT_WINDOW, warmup=DEFAULT_WARMUP,
+                       engine="cycle", confidence=DEFAULT_CONFIDENCE):
+    """Executes the program, simulating in detail a window of instructions (after warmup ones) every period
+    instructions, and returns the estimated CPI and IPC (SamplingResult).
+    Samples cut short by the end of the program are discarded"""
+    if window < 1 or warmup < 0:
+        raise ValueError("The sampling window must have at least one instruction")
+    if period < warmup + window:
+        raise ValueError("The sampling period ({}) must be at least warmup + window ({})"
+                         .format(period, warmup + window))
+    if not 0 < confidence < 1:
+        raise ValueError("The confidence must be between 0 and 1")
+
+    environment_class, cpu_class = ENGINES[engine]
+    functional = FunctionalCPU(instructions, config)
+    cpis = []
+    detailed_instructions = 0
+    detailed_time = 0
+    start = time.perf_counter()
+
+    while functional.run(max_instructions=period - warmup - window, until_breakpoint=False) == COUNT_REACHED:
+        detailed_start = time.perf_counter()
+        env = environment_class()
+        cpu = cpu_class(env, instructions, config)
+        functional.hand_off(cpu)
+        env.process(cpu.run())
+        cpi, retired = _measure(env, cpu, warmup, window)
+        detailed_time += time.perf_counter() - detailed_start
+        detailed_instructions += retired
+        if cpi is not None:
+            cpis.append(cpi)
+
+        if functional.run(max_instructions=warmup + window, until_breakpoint=False) != COUNT_REACHED:
+            break
+
+    wall_time = time.perf_counter() - start
+    return _estimate(cpis, functional.executed_instructions, detailed_instructions, detailed_time,
+                     wall_time, confidence)
+
+
+def _measure(env, cpu, warmup, window):
+    """Runs the detailed CPU until warmup + window instructions have retired.
+    Returns the CPI of the window (None if the program ended before) and the instructions retired"""
+    traces = cpu.executed_instructions
+    window_start = None
+    try:
+        while len(traces) < warmup:
+            env.step()
+        window_start = (env.now, len(traces))
+        while len(traces) < warmup + window:
+            env.step()
+    except EmptySchedule:
+        return None, len(traces)
+
+    start_cycle, start_count = window_start
+    return (env.now - start_cycle) / (len(traces) - start_count), len(traces)
+
+
+def _estimate(cpis, instructions, detailed_instructions, detailed_time, wall_time, confidence):
+    speedup = None
+    if detailed_instructions and wall_time:
+        # Time a detailed simulation of the whole program would take, at the speed of the samples
+        speedup = instructions * detailed_time / detailed_instructions / wall_time
+
+    if not cpis:
+        return SamplingResult(instructions, 0, detailed_instructions, None, None, None, None, None, None,
+                              confidence, None, None, wall_time, speedup)
+
+    cpi = statistics.mean(cpis)
+    cpi_low = cpi_high = ipc_low = ipc_high = error = None
+    if len(cpis) > 1:
+        z = _normal_quantile((1 + confidence) / 2)
+        half_width = z * statistics.stdev(cpis) / math.sqrt(len(cpis))
+        cpi_low, cpi_high = max(cpi - half_width, 0), cpi + half_width
+        ipc_low = 1 / cpi_high
+        ipc_high = 1 / cpi_low if cpi_low else math.inf
+        error = half_width / cpi
+    return SamplingResult(instructions, len(cpis), detailed_instructions, cpi, cpi_low, cpi_high,
+                          1 / cpi, ipc_low, ipc_high, confidence, error, round(cpi * instructions),
+                          wall_time, speedup)
+
+
+def _normal_quantile(p):
+    """The z such that a standard normal variable is below it with probability p (0 < p < 1),
+    by bisection of its CDF"""
+    low, high = -40.0, 40.0
+    for _ in range(100):
+        z = (low + high) / 2
+        if (1 + math.erf(z / math.sqrt(2))) / 2 < p:
+            low = z
+        else:
+            high = z
+    return (low + high) / 2
@@ -0,0 +1,84 @@
+"""In-process simulation of a program, for running many simulations in the same interpreter:
+
+    result = simulate(source, {"alu_rs": 2}, SimulationOptions(engine="cycle"))
+    print(result.ipc, result.cpu.reg_file["R1"])
+
+Every simulation has its own environment and CPU, whose reservation stations and functional units are numbered
+from 1 (e.g. AluRS1, MEM1), and its own log configuration, off unless one is given: nothing is printed and no
+global state is changed, so simulations can run one after the other or in concurrent threads."""
+from collections import namedtuple
+
+from tomasulo_simulator import ENGINES
+from tomasulo_simulator import log_utils
+from tomasulo_simulator.cpu_config import CpuConfig
+from tomasulo_simulator.program_cache import load_program
+
+# stopped is True if the simulation was stopped after max_cycles, with instructions still in flight
+SimulationResult = namedtuple("SimulationResult", "cycles instructions ipc cpi stopped traces cpu")
+
+
+class SimulationOptions:
+    def __init__(self, engine="cycle", max_cycles=None, log_config=None, breakpoint_handler=None, trace_sink=None,
+                 cache_dir=None):
+        """engine is a key of ENGINES. max_cycles, if given, stops the simulation after that many cycles.
+        log_config is the LogConfig of the components (none of them logs if not given), trace_sink where the
+        execution traces are streamed (see trace_sink.py). Sources are parsed and assembled in cache_dir
+        if given (see program_cache.py)"""
+        if engine not in ENGINES:
+            raise ValueError("Unknown engine {} (available: {})".format(engine, ", ".join(ENGINES)))
+        self.engine = engine
+        self.max_cycles = max_cycles
+        self.log_config = log_config
+        self.breakpoint_handler = breakpoint_handler
+        self.trace_sink = trace_sink
+        self.cache_dir = cache_dir
+
+
+def simulate(source_or_program, config=None, options=None):
+    """Simulates a program and returns its SimulationResult.
+
+    source_or_program is the source code of the program, its directives and assembled instructions (as returned
+    by program_cache.load_program) or just the instructions. config is a CpuConfig, used as is, or a dict of
+    directives overriding those of the program"""
+    if options is None:
+        options = SimulationOptions()
+    if isinstance(source_or_program, str):
+        directives, instructions = load_program(source_or_program, options.cache_dir)
+    elif isinstance(source_or_program, tuple):
+        directives, instructions = source_or_program
+    else:
+        directives, instructions = {}, source_or_program
+
+    if not isinstance(config, CpuConfig):
+        overrides = config
+        config = CpuConfig(directives)
+        if overrides:
+            config.apply_config(overrides)
+
+    log_config = options.log_config
+    if log_config is None:
+        log_config = log_utils.LogConfig(log_utils.OFF, sinks=[])
+
+    environment_class, cpu_class = ENGINES[options.engine]
+    env = environment_class()
+    cpu = cpu_class(env, instructions, config, breakpoint_handler=options.breakpoint_handler,
+                    trace_sink=options.trace_sink, log_config=log_config)
+    env.process(cpu.run())
+    stopped = _run(env, options.max_cycles)
+
+    cycles = options.max_cycles if stopped else env.now
+    instructions = len(cpu.executed_instructions)
+    return SimulationResult(cycles, instructions, instructions / cycles if cycles else None,
+                            cycles / instructions if instructions else None, stopped, cpu.executed_instructions, cpu)
+
+
+def _run(env, until):
+    """Runs the simulation until its end, or until the cycle until. Returns True if it was stopped there.
+    Unlike env.run(until), which moves the SimPy clock to until, the clock stays at the end of the simulation
+    if it ends earlier"""
+    if until is None:
+        env.run()
+        return False
+    while env.peek() < until:
+        env.step()
+    return env.peek() != float("inf")
@@ -0,0 +1,257 @@
+"""Design-space sweeps: the same program simulated with many CpuConfig overrides, in parallel.
+
+The program is parsed and assembled once, and sent once to each worker process.
+Every completed run is appended to a journal (<output>.partial, JSON lines), so an interrupted
+sweep can be resumed: the configurations found in the journal are not simulated again.
+With sampling, the CPI of each configuration is estimated by a sampled simulation (see sampling.py),
+for programs too long to be simulated in detail."""
+import csv
+import importlib.util
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from tomasulo_simulator import execution_trace as etrace
+from tomasulo_simulator import log_utils
+from tomasulo_simulator.cpu_config import CpuConfig
+from tomasulo_simulator.sampling import sampled_simulation
+from tomasulo_simulator.simulation import simulate, SimulationOptions
+
+# Hazard type -> column counting them
+HAZARD_COLUMNS = {
+    etrace.RAWHazard: "raw_hazards",
+    etrace.RSUnavailableHazard: "rs_hazards",
+    etrace.FUUnavailableHazard: "fu_hazards",
+    etrace.CDBUnavailableHazard: "cdb_hazards",
+    etrace.MemQueueSlotUnavailableHazard: "mem_queue_hazards",
+    etrace.ROBFullHazard: "rob_hazards",
+    etrace.BranchMispredictionHazard: "mispredictions",
+    etrace.FetchStallHazard: "fetch_stalls",
+    etrace.BusContentionHazard: "bus_stalls",
+}
+
+RESULT_COLUMNS = ["cycles", "instructions", "ipc", "cpi"] + list(HAZARD_COLUMNS.values()) + ["error"]
+# Confidence interval of the CPI of sampled simulations (hazards aren't counted)
+SAMPLING_COLUMNS = ["samples", "cpi_low", "cpi_high"]
+# Miss rates of the cache hierarchy (see cache.py), of the configurations which have one
+CACHE_COLUMNS = ["l1_miss_rate", "l2_miss_rate"]
+
+OUTPUT_FORMATS = ("csv", "json", "parquet")
+# Libraries pandas can write parquet files with, one of them is needed for parquet results
+PARQUET_ENGINES = ("pyarrow", "fastparquet")
+
+
+def expand_grid(grid):
+    """Returns the list of overrides (dicts) for every combination of the values in the grid.
+    E.g. {"alu_rs": [1, 2], "cdb_width": [1, 2]} gives 4 configurations"""
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def simulate_config(instructions, directives, overrides, engine="cycle", max_cycles=None, sampling=None):
+    """Simulates the program with the directives of the program, updated with the overrides,
+    and returns a row of the results table.
+    max_cycles, if given, stops the simulation at that cycle: the row reports an error only if the program
+    hadn't ended yet (see simulation.simulate).
+    sampling, if given, holds the arguments of sampled_simulation (period, window, warmup)"""
+    row = dict(overrides)
+    row.update((column, None) for column in RESULT_COLUMNS)
+    if sampling is not None:
+        config = CpuConfig(directives)
+        config.apply_config(overrides)
+        return _simulate_sampled(instructions, config, engine, sampling, row)
+    try:
+        result = simulate((directives, instructions), overrides, SimulationOptions(engine, max_cycles))
+    except Exception as e:
+        row["error"] = "{}: {}".format(type(e).__name__, e)
+        return row
+
+    row["cycles"] = result.cycles
+    row["instructions"] = result.instructions
+    row["ipc"] = result.ipc
+    row["cpi"] = result.cpi
+    for hazard_type, count in result.traces.hazards.count_by_type().items():
+        row[HAZARD_COLUMNS[hazard_type]] = count
+    caches = result.cpu.caches
+    if caches is not None:
+        row["l1_miss_rate"] = _miss_rate(caches.levels[0])
+        row["l2_miss_rate"] = _miss_rate(caches.levels[1]) if len(caches.levels) > 1 else None
+    if result.stopped:
+        row["error"] = "Stopped after {} cycles".format(max_cycles)
+    return row
+
+
+def _miss_rate(level):
+    accesses = level.hits + level.misses
+    return level.misses / accesses if accesses else None
+
+
+def _simulate_sampled(instructions, config, engine, sampling, row):
+    row.update((column, None) for column in SAMPLING_COLUMNS)
+    try:
+        result = sampled_simulation(instructions, config, engine=engine, **sampling)
+    except Exception as e:
+        row["error"] = "{}: {}".format(type(e).__name__, e)
+        return row
+
+    row["instructions"] = result.instructions
+    row["samples"] = result.samples
+    if result.cpi is None:
+        row["error"] = "The program is too short to take a sample"
+        return row
+    row["cycles"] = result.cycles
+    row["ipc"] = result.ipc
+    row["cpi"] = result.cpi
+    row["cpi_low"] = result.cpi_low
+    row["cpi_high"] = result.cpi_high
+    return row
+
+
+# Program and settings of the sweep, set once in each worker process
+_worker_args = None
+
+
+def _init_worker(instructions, directives, engine, max_cycles, sampling):
+    global _worker_args
+    log_utils.configure(log_utils.OFF)
+    _worker_args = (instructions, directives, engine, max_cycles, sampling)
+
+
+def _run_in_worker(index, overrides):
+    instructions, directives, engine, max_cycles, sampling = _worker_args
+    return index, simulate_config(instructions, directives, overrides, engine, max_cycles, sampling)
+
+
+def config_key(overrides):
+    return json.dumps(overrides, sort_keys=True)
+
+
+def run_sweep(instructions, directives, configs, engine="cycle", workers=None, output=None,
+              resume=False, max_cycles=None, progress=None, sampling=None):
+    """Simulates the program once for each configuration (dict of CpuConfig overrides)
+    and returns the results, one row (dict) per configuration, in the same order.
+
+    If output is given the results table is written there, in the format given by its extension,
+    and the completed runs are journaled to output + ".partial" until the sweep is over.
+    With resume=True the runs already in the journal are reused.
+    progress, if given, is called with (completed runs, total runs) after each run.
+    sampling, if given, holds the arguments of sampled_simulation (period, window, warmup): the results
+    are then estimated, and max_cycles is ignored."""
+    configs = [dict(overrides) for overrides in configs]
+    # Fail early on unknown directives, instead of once per run
+    for overrides in configs:
+        try:
+            CpuConfig(directives).apply_config(overrides)
+        except Exception as e:
+            raise ValueError(str(e))
+
+    # Fail before simulating anything if the results can't be written
+    if output is not None and output_format(output) == "parquet":
+        check_parquet_engine()
+    journal_path = output + ".partial" if output is not None else None
+
+    done = {}
+    if resume and journal_path is not None and os.path.exists(journal_path):
+        done = read_journal(journal_path)
+
+    rows = [None] * len(configs)
+    pending = []
+    for index, overrides in enumerate(configs):
+        row = done.get(config_key(overrides))
+        if row is not None:
+            rows[index] = row
+        else:
+            pending.append(index)
+
+    completed = len(configs) - len(pending)
+    if progress is not None:
+        progress(completed, len(configs))
+
+    journal = None
+    if journal_path is not None:
+        # Rewritten from scratch, dropping what was left of an interrupted write
+        journal = open(journal_path, "w")
+        for key, row in done.items():
+            journal.write(json.dumps({"key": key, "row": row}) + "\n")
+        journal.flush()
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(instructions, directives, engine, max_cycles, sampling)) as executor:
+            futures = [executor.submit(_run_in_worker, index, configs[index]) for index in pending]
+            for future in as_completed(futures):
+                index, row = future.result()
+                rows[index] = row
+                if journal is not None:
+                    journal.write(json.dumps({"key": config_key(configs[index]), "row": row}) + "\n")
+                    journal.flush()
+                completed += 1
+                if progress is not None:
+                    progress(completed, len(configs))
+    finally:
+        if journal is not None:
+            journal.close()
+
+    if output is not None:
+        write_results(rows, output)
+        os.remove(journal_path)
+    return rows
+
+
+def read_journal(path):
+    """Reads the completed runs of an interrupted sweep, ignoring a truncated last line"""
+    done = {}
+    with open(path) as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            done[entry["key"]] = entry["row"]
+    return done
+
+
+def output_format(path):
+    extension = os.path.splitext(path)[1].lstrip(".").lower()
+    if extension not in OUTPUT_FORMATS:
+        raise ValueError("Unsupported results format {} (use one of: {})".format(path, ", ".join(OUTPUT_FORMATS)))
+    return extension
+
+
+def check_parquet_engine():
+    if not any(importlib.util.find_spec(engine) for engine in PARQUET_ENGINES):
+        raise ValueError("Writing parquet results requires {} (pip install pyarrow)".format(
+            " or ".join(PARQUET_ENGINES)))
+
+
+def result_columns(rows):
+    """The overridden directives, in order of appearance, followed by the results"""
+    columns = []
+    sampled = False
+    cached = False
+    for row in rows:
+        for column in row:
+            if column in SAMPLING_COLUMNS:
+                sampled = True
+            elif column in CACHE_COLUMNS:
+                cached = True
+            elif column not in RESULT_COLUMNS and column not in columns:
+                columns.append(column)
+    return (columns + RESULT_COLUMNS + (SAMPLING_COLUMNS if sampled else [])
+            + (CACHE_COLUMNS if cached else []))
+
+
+def write_results(rows, path):
+    extension = output_format(path)
+    columns = result_columns(rows)
+    if extension == "csv":
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, columns)
+            writer.writeheader()
+            writer.writerows(rows)
+    elif extension == "json":
+        with open(path, "w") as f:
+            json.dump([{column: row.get(column) for column in columns} for row in rows], f, indent=1)
+    else:
+        import pandas as pd
+        pd.DataFrame(rows, columns=columns).to_parquet(path)
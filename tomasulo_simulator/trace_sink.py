@@ -0,0 +1,220 @@
+"""Streaming output of the execution traces.
+
+A trace sink takes the place of the ExecutionTraceStore of the CPU: every retired instruction is
+appended to a bounded buffer, which is written to the file (as a chunk) whenever it is full, so the
+memory used doesn't grow with the length of the program. Two formats are available:
+ - JSON lines (.jsonl): one object per instruction
+ - binary (.bin): chunks of fixed size records, with the strings (instructions, RS, FU, registers)
+   written once, the first time they are used
+
+read_traces() iterates lazily over a file of either format, yielding one dict per instruction."""
+import json
+import struct
+
+from tomasulo_simulator import execution_trace as etrace
+from tomasulo_simulator.trace_store import NONE as _NONE, _or_none, _to_none
+
+DEFAULT_BUFFER_SIZE = 4096
+
+BINARY_MAGIC = b"TOMTRACE3\n"
+
+# Chunk header: number of records, number of new strings
+_CHUNK = struct.Struct("<II")
+_STRING_LENGTH = struct.Struct("<I")
+# seq, pc, issued, start_execution, write_result, written_result, committed, instruction, rs, fu, served_by,
+# number of hazards
+_RECORD = struct.Struct("<qqqqqqqiiibH")
+# type, detected_at, solved_at, register, resource
+_HAZARD = struct.Struct("<bqqii")
+
+
+def hazard_to_dict(hazard):
+    """Converts a hazard namedtuple to a dict, with its type and the RS and FU as ids"""
+    d = {"type": type(hazard).__name__}
+    for field, value in zip(hazard._fields, hazard):
+        d[field] = value if value is None or isinstance(value, (int, str)) else str(value)
+    return d
+
+
+class TraceSink:
+    """Base class of the sinks: buffers up to buffer_size records, then writes them"""
+    def __init__(self, path, buffer_size=DEFAULT_BUFFER_SIZE):
+        self.path = path
+        self.buffer_size = buffer_size
+        self._buffer = []
+        self._count = 0
+        self._file = open(path, "wb")
+
+    def append(self, trace):
+        self._buffer.append(trace)
+        self._count += 1
+        if len(self._buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            self._write_chunk(self._buffer)
+            self._buffer = []
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+    def __len__(self):
+        """Number of instructions written (or buffered) so far"""
+        return self._count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _write_chunk(self, traces):
+        raise NotImplementedError()
+
+
+class JsonlTraceSink(TraceSink):
+    def _write_chunk(self, traces):
+        lines = []
+        for trace in traces:
+            d = trace.to_dict()
+            d["hazards"] = [hazard_to_dict(hazard) for hazard in trace.hazards]
+            lines.append(json.dumps(d))
+        lines.append("")
+        self._file.write("\n".join(lines).encode())
+
+
+class BinaryTraceSink(TraceSink):
+    def __init__(self, path, buffer_size=DEFAULT_BUFFER_SIZE):
+        super().__init__(path, buffer_size)
+        self._file.write(BINARY_MAGIC)
+        self._strings = {}
+        self._new_strings = []
+        # The string of each static instruction, by PC
+        self._instruction_codes = {}
+
+    def _intern(self, obj):
+        if obj is None:
+            return _NONE
+        string = str(obj)
+        code = self._strings.get(string)
+        if code is None:
+            code = self._strings[string] = len(self._strings)
+            self._new_strings.append(string)
+        return code
+
+    def _write_chunk(self, traces):
+        records = []
+        for trace in traces:
+            instruction = self._instruction_codes.get(trace.pc)
+            if instruction is None:
+                instruction = self._instruction_codes[trace.pc] = self._intern(trace.instruction)
+            records.append(_RECORD.pack(
+                _or_none(trace.seq), _or_none(trace.pc), _or_none(trace.issued), _or_none(trace.start_execution),
+                _or_none(trace.write_result), _or_none(trace.written_result), _or_none(trace.committed),
+                instruction, self._intern(trace.rs), self._intern(trace.fu), _or_none(trace.served_by),
+                len(trace.hazards)))
+            for hazard in trace.hazards:
+                hazard_type = type(hazard)
+                register = resource = _NONE
+                if hazard_type is etrace.RAWHazard:
+                    register, resource = self._intern(hazard.register), self._intern(hazard.source_rs)
+                elif len(hazard) > 2:
+                    resource = self._intern(hazard[2])
+                records.append(_HAZARD.pack(etrace.HAZARD_TYPE_INDEX[hazard_type], hazard.detected_at, hazard.solved_at,
+                                            register, resource))
+
+        strings = []
+        for string in self._new_strings:
+            encoded = string.encode()
+            strings.append(_STRING_LENGTH.pack(len(encoded)))
+            strings.append(encoded)
+
+        self._file.write(_CHUNK.pack(len(traces), len(self._new_strings)))
+        self._file.write(b"".join(strings))
+        self._file.write(b"".join(records))
+        self._new_strings = []
+
+
+SINKS = {
+    ".jsonl": JsonlTraceSink,
+    ".bin": BinaryTraceSink,
+}
+
+
+def open_trace_sink(path, buffer_size=DEFAULT_BUFFER_SIZE):
+    """Opens the sink for the format given by the extension of the path (JSON lines if unknown)"""
+    for extension, sink_class in SINKS.items():
+        if path.endswith(extension):
+            return sink_class(path, buffer_size)
+    return JsonlTraceSink(path, buffer_size)
+
+
+def read_traces(path):
+    """Iterates over the instructions in a trace file, reading one chunk at a time"""
+    with open(path, "rb") as f:
+        magic = f.read(len(BINARY_MAGIC))
+        if magic == BINARY_MAGIC:
+            yield from _read_binary(f)
+        elif magic.startswith(b"TOMTRACE"):
+            raise ValueError("{} was written by another version of the simulator".format(path))
+        else:
+            f.seek(0)
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def _read_binary(f):
+    strings = []
+
+    def read(size):
+        data = f.read(size)
+        if len(data) != size:
+            raise EOFError("Truncated trace file")
+        return data
+
+    def string(code):
+        return strings[code] if code != _NONE else None
+
+    while True:
+        header = f.read(_CHUNK.size)
+        if not header:
+            return
+        if len(header) != _CHUNK.size:
+            raise EOFError("Truncated trace file")
+        records, new_strings = _CHUNK.unpack(header)
+        for _ in range(new_strings):
+            length, = _STRING_LENGTH.unpack(read(_STRING_LENGTH.size))
+            strings.append(read(length).decode())
+
+        for _ in range(records):
+            (seq, pc, issued, start_execution, write_result, written_result, committed,
+             instruction, rs, fu, served_by, hazard_count) = _RECORD.unpack(read(_RECORD.size))
+            hazards = []
+            for _ in range(hazard_count):
+                hazard_type, detected_at, solved_at, register, resource = _HAZARD.unpack(read(_HAZARD.size))
+                hazard_type = etrace.HAZARD_TYPES[hazard_type]
+                fields = [detected_at, solved_at]
+                if hazard_type is etrace.RAWHazard:
+                    fields += [string(register), string(resource)]
+                elif len(hazard_type._fields) > 2:
+                    fields.append(string(resource))
+                hazards.append(hazard_to_dict(hazard_type(*fields)))
+            yield {
+                "seq": _to_none(seq),
+                "pc": _to_none(pc),
+                "instruction": string(instruction),
+                "hazards": hazards,
+                "issued": _to_none(issued),
+                "start_execution": _to_none(start_execution),
+                "write_result": _to_none(write_result),
+                "written_result": _to_none(written_result),
+                "committed": _to_none(committed),
+                "rs": string(rs),
+                "fu": string(fu),
+                "served_by": _to_none(served_by),
+            }
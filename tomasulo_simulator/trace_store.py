@@ -0,0 +1,225 @@
+"""Columnar storage of the execution traces of the retired instructions.
+
+Each field of ExecutionTrace is a typed array, with one integer per instruction: reservation
+stations and functional units are interned and stored as small indices, and the hazards go in a
+table of their own. The ExecutionTrace objects themselves are not kept: indexing or iterating over
+the store rebuilds them, so code written for a list of traces keeps working."""
+from array import array
+
+from tomasulo_simulator import execution_trace as etrace
+
+# Stored in place of a missing value
+NONE = -1
+
+
+class _Interner:
+    """Maps objects (RS, FU, register names) to consecutive indices"""
+    def __init__(self):
+        self.objects = []
+        self._indices = {}
+
+    def __call__(self, obj):
+        if obj is None:
+            return NONE
+        index = self._indices.get(obj)
+        if index is None:
+            index = self._indices[obj] = len(self.objects)
+            self.objects.append(obj)
+        return index
+
+    def get(self, index):
+        return self.objects[index] if index != NONE else None
+
+    def names(self):
+        return [str(obj) for obj in self.objects]
+
+
+class HazardTable:
+    """The hazards of all the stored instructions, in the order they were stored"""
+    COLUMNS = ("row", "type", "detected_at", "solved_at", "register", "resource")
+
+    def __init__(self, resources):
+        self.resources = resources
+        self.registers = _Interner()
+        # Row of the instruction in the ExecutionTraceStore, index in etrace.HAZARD_TYPES
+        self.row = array("q")
+        self.type = array("b")
+        self.detected_at = array("q")
+        self.solved_at = array("q")
+        # Interned register (RAW hazards) and RS or FU (RS, FU and RAW hazards)
+        self.register = array("i")
+        self.resource = array("i")
+
+    def append(self, row, hazard):
+        hazard_type = type(hazard)
+        self.row.append(row)
+        self.type.append(etrace.HAZARD_TYPE_INDEX[hazard_type])
+        self.detected_at.append(hazard.detected_at)
+        self.solved_at.append(hazard.solved_at)
+        if hazard_type is etrace.RAWHazard:
+            self.register.append(self.registers(hazard.register))
+            self.resource.append(self.resources(hazard.source_rs))
+        else:
+            self.register.append(NONE)
+            if hazard_type is etrace.RSUnavailableHazard:
+                self.resource.append(self.resources(hazard.assigned_rs))
+            elif hazard_type is etrace.FUUnavailableHazard:
+                self.resource.append(self.resources(hazard.assigned_fu))
+            else:
+                self.resource.append(NONE)
+
+    def __len__(self):
+        return len(self.row)
+
+    def __getitem__(self, index):
+        """Rebuilds the hazard namedtuple"""
+        hazard_type = etrace.HAZARD_TYPES[self.type[index]]
+        detected_at, solved_at = self.detected_at[index], self.solved_at[index]
+        if hazard_type is etrace.RAWHazard:
+            return hazard_type(detected_at, solved_at, self.registers.get(self.register[index]),
+                               self.resources.get(self.resource[index]))
+        if hazard_type is etrace.RSUnavailableHazard or hazard_type is etrace.FUUnavailableHazard:
+            return hazard_type(detected_at, solved_at, self.resources.get(self.resource[index]))
+        return hazard_type(detected_at, solved_at)
+
+    def count_by_type(self):
+        """Number of hazards of each type (including the types which never occurred)"""
+        counts = [0] * len(etrace.HAZARD_TYPES)
+        for type_index in self.type:
+            counts[type_index] += 1
+        return {hazard_type: count for hazard_type, count in zip(etrace.HAZARD_TYPES, counts)}
+
+    def nbytes(self):
+        return sum(len(column) * column.itemsize for column in self._columns())
+
+    def _columns(self):
+        return [getattr(self, name) for name in self.COLUMNS]
+
+    def to_numpy(self):
+        """Returns a dict column name -> NumPy array sharing the memory of the table"""
+        import numpy as np
+        return {name: np.frombuffer(column, dtype=column.typecode) for name, column in zip(self.COLUMNS, self._columns())}
+
+    def to_dataframe(self):
+        """Returns the table as a pandas DataFrame. Numeric columns are not copied (where pandas allows it),
+        types, registers and resources are categoricals built from the interned codes"""
+        import pandas as pd
+        columns = self.to_numpy()
+        columns["type"] = pd.Categorical.from_codes(columns["type"], [t.__name__ for t in etrace.HAZARD_TYPES])
+        columns["register"] = pd.Categorical.from_codes(columns["register"], self.registers.names())
+        columns["resource"] = pd.Categorical.from_codes(columns["resource"], self.resources.names())
+        return pd.DataFrame(columns, copy=False)
+
+
+class ExecutionTraceStore:
+    """Execution traces of the retired instructions, in retirement order.
+
+    The NumPy and pandas views share the memory of the arrays, which can't grow while they exist:
+    take them when the simulation is over."""
+    COLUMNS = ("seq", "pc", "issued", "start_execution", "write_result", "written_result", "committed", "rs", "fu",
+               "served_by")
+
+    def __init__(self, instructions):
+        # Static program, to find the instruction of each trace from its PC
+        self.instructions = instructions
+        self.resources = _Interner()
+
+        self.seq = array("q")
+        self.pc = array("q")
+        self.issued = array("q")
+        self.start_execution = array("q")
+        self.write_result = array("q")
+        self.written_result = array("q")
+        self.committed = array("q")
+        # Interned RS and FU
+        self.rs = array("i")
+        self.fu = array("i")
+        # Level of the cache hierarchy which served loads and stores
+        self.served_by = array("b")
+        # Index of the first hazard of each instruction in the hazard table
+        self.hazard_start = array("q")
+
+        self.hazards = HazardTable(self.resources)
+
+    def append(self, trace):
+        row = len(self.seq)
+        self.seq.append(_or_none(trace.seq))
+        self.pc.append(_or_none(trace.pc))
+        self.issued.append(_or_none(trace.issued))
+        self.start_execution.append(_or_none(trace.start_execution))
+        self.write_result.append(_or_none(trace.write_result))
+        self.written_result.append(_or_none(trace.written_result))
+        self.committed.append(_or_none(trace.committed))
+        self.rs.append(self.resources(trace.rs))
+        self.fu.append(self.resources(trace.fu))
+        self.served_by.append(_or_none(trace.served_by))
+        self.hazard_start.append(len(self.hazards))
+        for hazard in trace.hazards:
+            self.hazards.append(row, hazard)
+
+    def __len__(self):
+        return len(self.seq)
+
+    def __getitem__(self, row):
+        """Rebuilds the ExecutionTrace of the instruction stored at the given row"""
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError("execution trace index out of range")
+
+        pc = self.pc[row]
+        trace = etrace.ExecutionTrace(self.instructions[pc] if pc != NONE else None, _to_none(self.seq[row]), _to_none(pc))
+        trace.issued = _to_none(self.issued[row])
+        trace.start_execution = _to_none(self.start_execution[row])
+        trace.write_result = _to_none(self.write_result[row])
+        trace.written_result = _to_none(self.written_result[row])
+        trace.committed = _to_none(self.committed[row])
+        trace.rs = self.resources.get(self.rs[row])
+        trace.fu = self.resources.get(self.fu[row])
+        trace.served_by = _to_none(self.served_by[row])
+        end = self.hazard_start[row + 1] if row + 1 < len(self) else len(self.hazards)
+        trace.hazards = [self.hazards[index] for index in range(self.hazard_start[row], end)]
+        return trace
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield self[row]
+
+    def nbytes(self):
+        """Memory used by the arrays (the interned objects are shared with the simulation and not counted)"""
+        columns = self._columns() + [self.hazard_start]
+        return sum(len(column) * column.itemsize for column in columns) + self.hazards.nbytes()
+
+    def bytes_per_instruction(self):
+        return self.nbytes() / len(self) if len(self) else 0
+
+    def _columns(self):
+        return [getattr(self, name) for name in self.COLUMNS]
+
+    def to_numpy(self):
+        """Returns a dict column name -> NumPy array sharing the memory of the store"""
+        import numpy as np
+        return {name: np.frombuffer(column, dtype=column.typecode) for name, column in zip(self.COLUMNS, self._columns())}
+
+    def to_dataframe(self):
+        """Returns the traces as a pandas DataFrame, one row per instruction.
+        Timings are not copied (where pandas allows it), instructions, RS and FU are categoricals
+        built from the PC and the interned codes. Missing timings are -1"""
+        import numpy as np
+        import pandas as pd
+        columns = self.to_numpy()
+        # The same instruction may appear at many PCs. The last code is for a missing PC (-1)
+        names = {}
+        codes = np.array([names.setdefault(str(i), len(names)) for i in self.instructions] + [NONE])
+        columns["instruction"] = pd.Categorical.from_codes(codes[columns["pc"]], list(names))
+        columns["rs"] = pd.Categorical.from_codes(columns["rs"], self.resources.names())
+        columns["fu"] = pd.Categorical.from_codes(columns["fu"], self.resources.names())
+        return pd.DataFrame(columns, copy=False)
+
+
+def _or_none(value):
+    return NONE if value is None else value
+
+
+def _to_none(value):
+    return None if value == NONE else value